@@ -0,0 +1,270 @@
+"""
+Benchmark cases: one per ``Query`` and ``Mutation`` field in ``config/schema.py``.
+
+Each case declares a query-count budget: the most SQL statements the
+operation may run, whatever the size of the dataset. The batching in
+``config.loaders`` keeps these constant, so exceeding one means an N+1 has
+crept back in. ``benchmarks.suite`` times the cases against a seeded
+database and fails when a budget is exceeded; ``config.tests`` checks the
+budgets on a small fixture.
+
+Variables are built from ``fixtures``, a dict of ids picked from the data
+(see ``pick_fixtures``). Mutations run in a transaction that is rolled back,
+so the dataset is left unchanged; ``setup`` creates rows a mutation needs
+(e.g. a task to delete) inside that transaction, outside the measurement.
+"""
+from django.db.models import Count
+
+from organizations.models import Organization
+from projects.models import Project
+from task_comments.models import TaskComment
+from tasks.models import Task
+
+
+class Case:
+    def __init__(self, field, query, budget, variables=None, setup=None, name=None):
+        self.field = field
+        self.name = name or field
+        self.query = query
+        self.budget = budget
+        self.variables = variables or (lambda fixtures: {})
+        self.setup = setup
+
+    @property
+    def is_mutation(self):
+        return self.query.lstrip().startswith('mutation')
+
+
+def pick_fixtures():
+    """Ids for the benchmarks: the largest tenant, its largest project and busiest task."""
+    organization = (
+        Organization.objects.annotate(projects_total=Count('projects')).order_by('-projects_total', 'id').first()
+    )
+    if organization is None:
+        return None
+    project = (
+        Project.objects.filter(organization=organization)
+        .annotate(tasks_total=Count('tasks')).order_by('-tasks_total', 'id').first()
+    )
+    tasks = Task.objects.filter(project__organization=organization)
+    task = tasks.annotate(comments_total=Count('comments')).order_by('-comments_total', 'id').first()
+    return {
+        'slug': organization.slug,
+        'organization_id': organization.id,
+        'project_id': project.id if project else None,
+        'task_id': task.id if task else None,
+        'task_ids': list(tasks.filter(project=project).order_by('id').values_list('id', flat=True)[:100]),
+    }
+
+
+# ==================== SETUP ====================
+
+def create_organization(fixtures):
+    organization = Organization.objects.create(
+        name="Benchmark", slug="benchmark-delete", contact_email="admin@benchmark.example.com"
+    )
+    return {'id': organization.id}
+
+
+def create_project(fixtures):
+    project = Project.objects.create(organization_id=fixtures['organization_id'], name="Benchmark")
+    return {'id': project.id}
+
+
+def create_task(fixtures):
+    task = Task.objects.create(project_id=fixtures['project_id'], title="Benchmark")
+    TaskComment.objects.create(task=task, content="Benchmark", author_email="bench@example.com")
+    return {'id': task.id}
+
+
+# ==================== CASES ====================
+
+TASK_FIELDS = "id title status dueDate isOverdue commentCount"
+
+CASES = [
+    Case('hello', '{ hello }', budget=0),
+    Case(
+        'allOrganizations',
+        '''query { allOrganizations(first: 20) { totalCount edges { node {
+            name slug projectCount stats { totalProjects totalTasks completedTasks }
+        } } } }''',
+        budget=4,
+    ),
+    Case(
+        'organization',
+        '''query ($slug: String!) { organization(slug: $slug) {
+            name stats { totalProjects totalTasks } projects { name status taskCount }
+        } }''',
+        budget=3,
+        variables=lambda f: {'slug': f['slug']},
+    ),
+    Case(
+        'projectsByOrganization',
+        '''query ($slug: String!) { projectsByOrganization(organizationSlug: $slug, first: 20) {
+            totalCount edges { node { name status dueDate taskCount
+                stats { totalTasks completedTasks overdueTasks completionPercentage } } }
+        } }''',
+        budget=5,
+        variables=lambda f: {'slug': f['slug']},
+    ),
+    Case(
+        'project',
+        '''query ($id: Int!, $slug: String!) { project(id: $id, organizationSlug: $slug) {
+            name stats { totalTasks completedTasks } tasks { %s comments { content authorEmail } }
+        } }''' % TASK_FIELDS,
+        budget=5,
+        variables=lambda f: {'id': f['project_id'], 'slug': f['slug']},
+    ),
+    Case(
+        'projectWithStats',
+        '''query ($id: Int!, $slug: String!) { projectWithStats(id: $id, organizationSlug: $slug) {
+            name taskCount stats { totalTasks completedTasks inProgressTasks todoTasks overdueTasks totalComments }
+        } }''',
+        budget=3,
+        variables=lambda f: {'id': f['project_id'], 'slug': f['slug']},
+    ),
+    Case(
+        'tasksByProject',
+        '''query ($id: Int!, $slug: String!) { tasksByProject(projectId: $id, organizationSlug: $slug, first: 50) {
+            edges { node { %s comments { content authorEmail } } }
+        } }''' % TASK_FIELDS,
+        budget=2,
+        variables=lambda f: {'id': f['project_id'], 'slug': f['slug']},
+    ),
+    Case(
+        'task',
+        '''query ($id: Int!, $slug: String!) { task(id: $id, organizationSlug: $slug) {
+            %s project { name } comments { content authorEmail createdAt }
+        } }''' % TASK_FIELDS,
+        budget=2,
+        variables=lambda f: {'id': f['task_id'], 'slug': f['slug']},
+    ),
+    Case(
+        'overdueTasks',
+        '''query ($slug: String!) { overdueTasks(organizationSlug: $slug, first: 20) {
+            totalCount edges { node { title dueDate project { name } } }
+        } }''',
+        budget=2,
+        variables=lambda f: {'slug': f['slug']},
+    ),
+    Case(
+        'commentsByTask',
+        '''query ($id: Int!, $slug: String!) { commentsByTask(taskId: $id, organizationSlug: $slug, first: 50) {
+            totalCount edges { node { content authorEmail task { title } } }
+        } }''',
+        budget=2,
+        variables=lambda f: {'id': f['task_id'], 'slug': f['slug']},
+    ),
+    Case(
+        'deletionJob',
+        '''query ($id: Int!, $slug: String!) { deletionJob(id: $id, organizationSlug: $slug) {
+            status progress deletedTasks totalTasks
+        } }''',
+        budget=1,
+        variables=lambda f: {'id': 0, 'slug': f['slug']},
+    ),
+
+    Case(
+        'createOrganization',
+        '''mutation { createOrganization(name: "Benchmark", slug: "benchmark-new",
+            contactEmail: "admin@benchmark.example.com") { success organization { id } } }''',
+        budget=1,
+    ),
+    Case(
+        'updateOrganization',
+        '''mutation ($id: ID!) { updateOrganization(id: $id, contactEmail: "ops@benchmark.example.com") {
+            success organization { name } } }''',
+        budget=1,
+        variables=lambda f: {'id': f['organization_id']},
+    ),
+    Case(
+        'deleteOrganization',
+        'mutation ($id: ID!) { deleteOrganization(id: $id) { success } }',
+        budget=2,
+        setup=create_organization,
+    ),
+    Case(
+        'createProject',
+        '''mutation ($slug: String!) { createProject(organizationSlug: $slug, name: "Benchmark") {
+            success project { id } } }''',
+        budget=2,
+        variables=lambda f: {'slug': f['slug']},
+    ),
+    Case(
+        'updateProject',
+        '''mutation ($id: ID!, $slug: String!) { updateProject(id: $id, organizationSlug: $slug, status: "ON_HOLD") {
+            success project { status } } }''',
+        budget=1,
+        variables=lambda f: {'id': f['project_id'], 'slug': f['slug']},
+    ),
+    Case(
+        'deleteProject',
+        'mutation ($id: ID!, $slug: String!) { deleteProject(id: $id, organizationSlug: $slug) { success } }',
+        budget=4,
+        variables=lambda f: {'slug': f['slug']},
+        setup=create_project,
+    ),
+    Case(
+        'createTask',
+        '''mutation ($projectId: Int!, $slug: String!) { createTask(organizationSlug: $slug, projectId: $projectId,
+            title: "Benchmark", status: "IN_PROGRESS") { success task { id } } }''',
+        budget=3,
+        variables=lambda f: {'projectId': f['project_id'], 'slug': f['slug']},
+    ),
+    Case(
+        'updateTask',
+        '''mutation ($id: ID!, $slug: String!) { updateTask(id: $id, organizationSlug: $slug, status: "DONE") {
+            success task { status } } }''',
+        budget=3,
+        variables=lambda f: {'id': f['task_id'], 'slug': f['slug']},
+    ),
+    Case(
+        'updateTask',
+        '''mutation ($id: ID!, $slug: String!) { updateTask(id: $id, organizationSlug: $slug, title: "Benchmark") {
+            success task { title } } }''',
+        budget=1,
+        variables=lambda f: {'id': f['task_id'], 'slug': f['slug']},
+        name='updateTask (title)',
+    ),
+    Case(
+        'deleteTask',
+        'mutation ($id: ID!, $slug: String!) { deleteTask(id: $id, organizationSlug: $slug) { success } }',
+        budget=3,
+        variables=lambda f: {'slug': f['slug']},
+        setup=create_task,
+    ),
+    Case(
+        'addComment',
+        '''mutation ($id: Int!, $slug: String!) { addComment(organizationSlug: $slug, taskId: $id,
+            content: "Benchmark", authorEmail: "bench@example.com") { success comment { id } } }''',
+        budget=3,
+        variables=lambda f: {'id': f['task_id'], 'slug': f['slug']},
+    ),
+    Case(
+        'bulkCreateTasks',
+        '''mutation ($slug: String!, $tasks: [TaskInput!]!) { bulkCreateTasks(organizationSlug: $slug, tasks: $tasks) {
+            success tasks { id } } }''',
+        budget=3,
+        variables=lambda f: {'slug': f['slug'], 'tasks': [
+            {'projectId': f['project_id'], 'title': f"Benchmark {n}", 'status': 'TODO'} for n in range(100)
+        ]},
+    ),
+    Case(
+        'bulkUpdateTasks',
+        '''mutation ($slug: String!, $tasks: [TaskUpdateInput!]!) { bulkUpdateTasks(organizationSlug: $slug, tasks: $tasks) {
+            success tasks { status } } }''',
+        budget=3,
+        variables=lambda f: {'slug': f['slug'], 'tasks': [
+            {'id': task_id, 'status': 'IN_PROGRESS'} for task_id in f['task_ids']
+        ]},
+    ),
+    Case(
+        'bulkAddComments',
+        '''mutation ($slug: String!, $comments: [CommentInput!]!) { bulkAddComments(organizationSlug: $slug,
+            comments: $comments) { success comments { id } } }''',
+        budget=3,
+        variables=lambda f: {'slug': f['slug'], 'comments': [
+            {'taskId': task_id, 'content': "Benchmark", 'authorEmail': "bench@example.com"} for task_id in f['task_ids']
+        ]},
+    ),
+]
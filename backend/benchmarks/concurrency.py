@@ -0,0 +1,163 @@
+"""
+Concurrency benchmark: the sync GraphQLView (WSGI) vs AsyncGraphQLView (ASGI).
+
+Run from backend/ against a seeded database:
+
+    python -m benchmarks.concurrency --requests 400 --concurrency 100 --threads 8 --latency 50
+
+Every SQL statement is delayed by ``--latency`` milliseconds to stand in for
+slow queries or a distant database server. ``--concurrency`` clients send
+requests back to back:
+
+- wsgi: requests are served by a pool of ``--threads`` worker threads, as
+  under gunicorn's gthread workers; a client waits until a thread is free.
+- asgi: every request runs on one event loop, as under uvicorn, each in its
+  own ``ThreadSensitiveContext`` like Django's ASGI handler.
+
+Requests are dispatched to the views in-process (no HTTP server, no
+middleware), so the numbers compare the two execution paths, not servers.
+Connections are released after every request: returned to the pool on
+PostgreSQL, closed otherwise (see ``benchmarks.pooling``).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+from django.test import AsyncRequestFactory, RequestFactory  # noqa: E402
+
+from config.views import AsyncGraphQLView, GraphQLView  # noqa: E402
+from projects.models import Project  # noqa: E402
+
+
+DEFAULT_QUERY = """
+query ($projectId: Int!, $slug: String!) {
+    tasksByProject(projectId: $projectId, organizationSlug: $slug, first: 20) {
+        edges { node { id title status commentCount comments { id content } project { name } } }
+    }
+}
+"""
+
+
+def add_latency(latency):
+    """Delay every SQL statement on every connection opened from now on."""
+    def delay(execute, sql, params, many, context):
+        time.sleep(latency)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+
+
+def run_wsgi(body, requests, concurrency, threads):
+    view = GraphQLView.as_view()
+    workers = threading.Semaphore(threads)
+    counter = iter(range(requests))
+    lock = threading.Lock()
+    results = []
+
+    def client():
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            start = time.perf_counter()
+            with workers:
+                request = RequestFactory().post('/graphql/', body, content_type='application/json')
+                response = view(request)
+                connections.close_all()
+            with lock:
+                results.append((time.perf_counter() - start, response.status_code == 200))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(client) for _ in range(concurrency)]:
+            future.result()
+    return results
+
+
+def run_asgi(body, requests, concurrency):
+    view = AsyncGraphQLView.as_view()
+    counter = iter(range(requests))
+    results = []
+
+    async def client():
+        while next(counter, None) is not None:
+            start = time.perf_counter()
+            async with ThreadSensitiveContext():
+                request = AsyncRequestFactory().post('/graphql/', body, content_type='application/json')
+                response = await view(request)
+                await sync_to_async(connections.close_all)()
+            results.append((time.perf_counter() - start, response.status_code == 200))
+
+    async def main():
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    asyncio.run(main())
+    return results
+
+
+def summarize(name, results, elapsed):
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    errors = sum(1 for _, ok in results if not ok)
+    print(
+        f"{name:<6}{len(results):>10}{elapsed:>10.2f}{len(results) / elapsed:>10.1f}"
+        f"{statistics.median(latencies):>10.1f}{p95:>10.1f}{errors:>8}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=400, help="Total requests per path")
+    parser.add_argument('--concurrency', type=int, default=100, help="Concurrent clients")
+    parser.add_argument('--threads', type=int, default=8, help="WSGI worker threads")
+    parser.add_argument('--latency', type=float, default=50, help="Added latency per SQL statement, in ms")
+    parser.add_argument('--query', help="GraphQL query to send (defaults to tasksByProject with comments)")
+    args = parser.parse_args()
+
+    project = Project.objects.select_related('organization').order_by('id').first()
+    if args.query:
+        payload = {'query': args.query}
+    elif project is None:
+        parser.error("The database has no projects; seed some data first.")
+    else:
+        payload = {
+            'query': DEFAULT_QUERY,
+            'variables': {'projectId': project.id, 'slug': project.organization.slug},
+        }
+    body = json.dumps(payload)
+    connections.close_all()
+    add_latency(args.latency / 1000)
+
+    print(
+        f"{args.requests} requests, {args.concurrency} clients, {args.threads} WSGI threads, "
+        f"{args.latency:g} ms per SQL statement\n"
+    )
+    print(f"{'path':<6}{'requests':>10}{'wall s':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+
+    start = time.perf_counter()
+    results = run_wsgi(body, args.requests, args.concurrency, args.threads)
+    summarize('wsgi', results, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    results = run_asgi(body, args.requests, args.concurrency)
+    summarize('asgi', results, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
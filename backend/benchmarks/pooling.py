@@ -0,0 +1,170 @@
+"""
+Connection pool benchmark: per-request latency with and without the pool.
+
+Run from backend/ against a seeded PostgreSQL database:
+
+    python -m benchmarks.pooling --requests 2000 --threads 8
+
+Each of ``--threads`` threads sends requests back to back to the sync view
+(as a WSGI worker thread would) and ``--concurrency`` clients do the same
+on the async view (as under an ASGI server). Connections are released after
+every request like Django does when a request finishes: without the pool
+they are closed, so every request connects again (``CONN_MAX_AGE = 0``);
+with it they go back to the pool. Use ``--host`` to point at a server over
+the network, where connecting costs more.
+
+Requests are dispatched to the views in-process (no HTTP server), so the
+difference between the two runs is the cost of connecting.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async  # noqa: E402
+from django.db import close_old_connections, connections  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+from django.test import AsyncRequestFactory, RequestFactory  # noqa: E402
+
+from config.views import AsyncGraphQLView, GraphQLView  # noqa: E402
+from projects.models import Project  # noqa: E402
+
+
+DEFAULT_QUERY = """
+query ($projectId: Int!, $slug: String!) {
+    project(id: $projectId, organizationSlug: $slug) { name taskCount }
+}
+"""
+
+# Connections made by Django, across threads (without the pool, each is a new one)
+opened = []
+connection_created.connect(lambda sender, connection, **kwargs: opened.append(1), weak=False)
+
+
+def run_wsgi(body, requests, threads):
+    view = GraphQLView.as_view()
+    counter = iter(range(requests))
+    lock = threading.Lock()
+    results = []
+
+    def worker():
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            start = time.perf_counter()
+            response = view(RequestFactory().post('/graphql/', body, content_type='application/json'))
+            # What the request_finished signal does
+            close_old_connections()
+            with lock:
+                results.append((time.perf_counter() - start, response.status_code == 200))
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(worker) for _ in range(threads)]:
+            future.result()
+    return results
+
+
+def run_asgi(body, requests, concurrency):
+    view = AsyncGraphQLView.as_view()
+    counter = iter(range(requests))
+    results = []
+
+    async def client():
+        while next(counter, None) is not None:
+            start = time.perf_counter()
+            async with ThreadSensitiveContext():
+                request = AsyncRequestFactory().post('/graphql/', body, content_type='application/json')
+                response = await view(request)
+                await sync_to_async(close_old_connections)()
+            results.append((time.perf_counter() - start, response.status_code == 200))
+
+    async def main():
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    asyncio.run(main())
+    return results
+
+
+def summarize(name, results, elapsed, connects):
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    errors = sum(1 for _, ok in results if not ok)
+    print(
+        f"{name:<12}{len(results):>10}{len(results) / elapsed:>10.1f}{statistics.mean(latencies):>10.2f}"
+        f"{statistics.median(latencies):>10.2f}{p95:>10.2f}{connects:>10}{errors:>8}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=2000, help="Requests per run")
+    parser.add_argument('--threads', type=int, default=8, help="WSGI worker threads")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent ASGI clients")
+    parser.add_argument('--host', help="Database host to connect to instead of DB_HOST")
+    args = parser.parse_args()
+
+    settings_dict = connections.settings['default']
+    if settings_dict['ENGINE'] != 'django.db.backends.postgresql':
+        parser.error("The pool needs PostgreSQL; unset DB_ENGINE.")
+    pool_options = settings_dict['OPTIONS'].get('pool')
+    if not pool_options:
+        parser.error("The pool is disabled; set DB_POOL_MAX_SIZE.")
+    if args.host:
+        settings_dict['HOST'] = args.host
+
+    project = Project.objects.select_related('organization').order_by('id').first()
+    if project is None:
+        parser.error("The database has no projects; seed some data first.")
+    body = json.dumps({
+        'query': DEFAULT_QUERY,
+        'variables': {'projectId': project.id, 'slug': project.organization.slug},
+    })
+
+    print(
+        f"{args.requests} requests per run, {args.threads} WSGI threads, {args.concurrency} ASGI clients, "
+        f"pool of {pool_options.get('min_size', 4)}-{pool_options.get('max_size')}\n"
+    )
+    print(
+        f"{'run':<12}{'requests':>10}{'req/s':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'connects':>10}{'errors':>8}"
+    )
+    for pooled in (False, True):
+        # Connection wrappers read OPTIONS whenever they connect
+        connections.close_all()
+        connections['default'].close_pool()
+        if pooled:
+            settings_dict['OPTIONS']['pool'] = pool_options
+            connections['default'].pool.wait()
+        else:
+            settings_dict['OPTIONS'].pop('pool', None)
+        label = 'pool' if pooled else 'no pool'
+
+        for path in ('wsgi', 'asgi'):
+            opened.clear()
+            if pooled:
+                connections['default'].pool.pop_stats()
+            start = time.perf_counter()
+            if path == 'wsgi':
+                results = run_wsgi(body, args.requests, args.threads)
+            else:
+                results = run_asgi(body, args.requests, args.concurrency)
+            elapsed = time.perf_counter() - start
+            # Connections opened to the server
+            connects = connections['default'].pool.get_stats().get('connections_num', 0) if pooled else len(opened)
+            summarize(f'{label} {path}', results, elapsed, connects)
+
+    connections['default'].close_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""
+GraphQL benchmark suite: every query and mutation with a query-count budget.
+
+Run from backend/ against a seeded database, PostgreSQL or SQLite:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --compare results.json
+
+    DB_ENGINE=django.db.backends.sqlite3 DB_NAME=/tmp/bench.sqlite3 python manage.py migrate
+    DB_ENGINE=django.db.backends.sqlite3 DB_NAME=/tmp/bench.sqlite3 python -m benchmarks.suite --seed
+
+Each case in ``benchmarks.cases`` is sent ``--iterations`` times through
+GraphQLView (in-process, no middleware) after a warm-up request, and the
+suite reports the p50/p95 latency, the SQL statements run and the rows
+fetched per request, and the peak memory allocated by one request (measured
+in a separate run under tracemalloc, which slows execution). Mutations are
+rolled back after every request.
+
+The run fails (exit status 1) when an operation returns errors, when it runs
+more SQL statements than its budget, or when a schema field has no case.
+``--output`` writes the results as JSON; ``--compare`` prints the change
+against such a file, e.g. one written on the main branch.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.db.backends.utils import CursorWrapper  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from benchmarks.cases import CASES, pick_fixtures  # noqa: E402
+from config.schema import schema  # noqa: E402
+from config.views import GraphQLView  # noqa: E402
+from organizations.models import Organization  # noqa: E402
+from projects.models import Project  # noqa: E402
+from task_comments.models import TaskComment  # noqa: E402
+from tasks.models import Task  # noqa: E402
+
+
+class Counts:
+    queries = 0
+    rows = 0
+
+
+@contextmanager
+def count_sql():
+    """Count the statements run and the rows fetched on the default connection."""
+    counts = Counts()
+
+    def count_query(execute, sql, params, many, context):
+        # Savepoints come from the transaction the suite wraps requests in
+        if 'SAVEPOINT' not in sql:
+            counts.queries += 1
+        return execute(sql, params, many, context)
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        counts.rows += row is not None
+        return row
+
+    def fetchmany(self, *args):
+        rows = self.cursor.fetchmany(*args)
+        counts.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self.cursor.fetchall()
+        counts.rows += len(rows)
+        return rows
+
+    # CursorWrapper forwards fetch* to the driver cursor through __getattr__
+    patched = {'fetchone': fetchone, 'fetchmany': fetchmany, 'fetchall': fetchall}
+    for name, method in patched.items():
+        setattr(CursorWrapper, name, method)
+    try:
+        with connection.execute_wrapper(count_query):
+            yield counts
+    finally:
+        for name in patched:
+            delattr(CursorWrapper, name)
+
+
+def missing_cases():
+    """Query and Mutation fields of the schema that have no benchmark case."""
+    covered = {case.field for case in CASES}
+    fields = set(schema.graphql_schema.query_type.fields) | set(schema.graphql_schema.mutation_type.fields)
+    return sorted(fields - covered)
+
+
+def run_case(view, case, fixtures):
+    """Send one request for ``case``; return ``(seconds, counts, errors)``."""
+    with transaction.atomic():
+        variables = case.variables(fixtures)
+        if case.setup:
+            variables.update(case.setup(fixtures))
+        body = json.dumps({'query': case.query, 'variables': variables})
+        request = RequestFactory().post('/graphql/', body, content_type='application/json')
+        with count_sql() as counts:
+            start = time.perf_counter()
+            response = view(request)
+            elapsed = time.perf_counter() - start
+        transaction.set_rollback(True)
+
+    result = json.loads(response.content)
+    errors = [error['message'] for error in result.get('errors') or []]
+    data = result.get('data') or {}
+    for value in data.values():
+        # Mutations report failures in their payload rather than in "errors"
+        if isinstance(value, dict) and value.get('success') is False:
+            errors.append(f"{case.field} returned success: false")
+    return elapsed, counts, errors
+
+
+def peak_memory(view, case, fixtures):
+    tracemalloc.start()
+    try:
+        run_case(view, case, fixtures)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(view, case, fixtures, iterations):
+    run_case(view, case, fixtures)
+    latencies = []
+    for _ in range(iterations):
+        elapsed, counts, errors = run_case(view, case, fixtures)
+        latencies.append(elapsed * 1000)
+    latencies.sort()
+    return {
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p95_ms': round(latencies[math.ceil(len(latencies) * 0.95) - 1], 3),
+        'queries': counts.queries,
+        'budget': case.budget,
+        'rows': counts.rows,
+        'peak_kb': round(peak_memory(view, case, fixtures) / 1024, 1),
+        'errors': errors,
+    }
+
+
+def metadata():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'rows': {
+            'organizations': Organization.objects.count(),
+            'projects': Project.objects.count(),
+            'tasks': Task.objects.count(),
+            'comments': TaskComment.objects.count(),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--iterations', type=int, default=20, help="Timed requests per case")
+    parser.add_argument('--case', action='append', help="Only run the named case (repeatable)")
+    parser.add_argument('--seed', action='store_true',
+                        help="Load a dataset with seed_scale (prefix 'bench') before running")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Print the change against results written by --output")
+    args = parser.parse_args()
+
+    if args.seed:
+        call_command(
+            'seed_scale', organizations=20, projects=10, tasks=30, comments=3,
+            prefix='bench', seed=1, clear=True
+        )
+    fixtures = pick_fixtures()
+    if fixtures is None or fixtures['task_id'] is None:
+        parser.error("The database has no tasks; seed some data first (see --seed).")
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+
+    view = GraphQLView.as_view()
+    cases = [case for case in CASES if not args.case or case.name in args.case]
+    meta = metadata()
+    print(f"{meta['database']} @ {meta['commit']}, {meta['rows']}, {args.iterations} iterations\n")
+    print(
+        f"{'case':<24}{'p50 ms':>9}{'p95 ms':>9}{'queries':>9}{'budget':>8}{'rows':>7}{'peak KB':>9}"
+        + (f"{'Δ p50':>9}{'Δ queries':>11}" if baseline else "")
+    )
+
+    results = {}
+    failures = []
+    for case in cases:
+        result = results[case.name] = benchmark(view, case, fixtures, args.iterations)
+        line = (
+            f"{case.name:<24}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['queries']:>9}"
+            f"{case.budget:>8}{result['rows']:>7}{result['peak_kb']:>9.1f}"
+        )
+        previous = baseline.get(case.name)
+        if previous:
+            change = (result['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] * 100 if previous['p50_ms'] else 0
+            line += f"{change:>+8.0f}%{result['queries'] - previous['queries']:>+11}"
+        print(line)
+        if result['queries'] > case.budget:
+            failures.append(f"{case.name}: {result['queries']} queries, budget is {case.budget}")
+        failures.extend(f"{case.name}: {error}" for error in result['errors'])
+
+    if not args.case:
+        failures.extend(f"{field}: no benchmark case" for field in missing_cases())
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+
+    if failures:
+        print("\nFAILED")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,10 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run it with an ASGI server (``uvicorn config.asgi:application``) and set
+``GRAPHQL_ASYNC = True`` so /graphql/ is served by the async GraphQL view.
+WebSocket connections to /graphql/ serve GraphQL subscriptions.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -13,4 +17,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Needs the app registry, so imported after Django is set up
+from .subscriptions import GraphQLWebSocketApp  # noqa: E402
+
+graphql_ws_application = GraphQLWebSocketApp(path='/graphql/')
+
+
+async def application(scope, receive, send):
+    """HTTP goes to Django; WebSocket connections to /graphql/ carry GraphQL subscriptions."""
+    if scope['type'] == 'websocket':
+        await graphql_ws_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,123 @@
+"""
+Publish/subscribe broker for GraphQL subscriptions.
+
+Mutations publish small JSON-serializable events after their transaction
+commits (``publish_on_commit``), and subscription resolvers iterate over a
+channel with ``get_broker().subscribe(channel)``.
+
+``InMemoryBroker`` delivers events within one process, which is enough when
+the same ASGI server handles both mutations and subscriptions. With several
+processes, point ``GRAPHQL_SUBSCRIPTION_BROKER`` at ``RedisBroker`` (or any
+other ``Broker`` subclass).
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+def task_channel(project_id):
+    return f"tasks:{project_id}"
+
+
+def comment_channel(task_id):
+    return f"comments:{task_id}"
+
+
+class Broker:
+    """Interface for subscription brokers."""
+
+    def publish(self, channel, message):
+        """Send ``message`` to every subscriber of ``channel``; callable from any thread."""
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Async iterator over the messages published to ``channel`` from now on."""
+        raise NotImplementedError
+
+
+class InMemoryBroker(Broker):
+    """Process-local broker backed by one asyncio queue per subscriber."""
+
+    # Events kept for a subscriber that is not reading; the oldest are dropped beyond this
+    max_queued = 100
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, message)
+            except RuntimeError:
+                # The subscriber's event loop has been closed
+                pass
+
+    def _put(self, queue, message):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    async def subscribe(self, channel):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(self.max_queued))
+        with self._lock:
+            self._subscribers[channel].add(subscriber)
+        try:
+            while True:
+                yield await subscriber[1].get()
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(subscriber)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+
+class RedisBroker(Broker):
+    """Broker on Redis pub/sub, for running several server processes."""
+
+    def __init__(self, url=None):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImproperlyConfigured("RedisBroker requires the 'redis' package.") from e
+        self.url = url or getattr(settings, 'GRAPHQL_SUBSCRIPTION_REDIS_URL', 'redis://localhost:6379/0')
+        self._client = redis.Redis.from_url(self.url)
+
+    def publish(self, channel, message):
+        self._client.publish(channel, json.dumps(message))
+
+    async def subscribe(self, channel):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            async for item in pubsub.listen():
+                if item['type'] == 'message':
+                    yield json.loads(item['data'])
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+            await client.aclose()
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(
+        getattr(settings, 'GRAPHQL_SUBSCRIPTION_BROKER', 'config.broker.InMemoryBroker')
+    )()
+
+
+def publish_on_commit(channel, message):
+    """Publish once the current transaction commits, so subscribers never see rolled-back writes."""
+    transaction.on_commit(lambda: get_broker().publish(channel, message), robust=True)
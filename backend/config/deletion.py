@@ -0,0 +1,96 @@
+"""
+Background deletion of organizations and projects.
+
+``project.delete()`` makes Django load and cascade every task and comment in
+one transaction, which holds locks for as long as the largest tenants take
+to delete. ``request_deletion()`` instead marks the target (and, for an
+organization, all its projects) with ``deletion_requested_at``, which hides
+it from the default managers, and therefore from every query and mutation,
+at once. It then records a ``DeletionJob``. The worker
+(``manage.py process_deletions``) calls ``run_job()``, which deletes
+comments, then tasks, then projects, then the organization, at most
+``DELETION_BATCH_SIZE`` rows per transaction. It updates the job's counters
+as it goes, so ``deletionJob`` in GraphQL reports progress.
+
+Running a job again continues where it stopped, so a worker that dies
+mid-job simply picks it up on restart.
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from organizations.models import DeletionJob, Organization
+from projects.models import Project
+from task_comments.models import TaskComment
+from tasks.models import ProjectTaskStats, Task
+
+from .response_cache import invalidate_organization
+from .tenants import forget_organization
+
+
+def request_deletion(organization, project=None):
+    """Hide ``project`` (or the whole ``organization``) now and queue its deletion."""
+    now = timezone.now()
+    with transaction.atomic():
+        if project is None:
+            Organization.objects.filter(pk=organization.pk).update(deletion_requested_at=now)
+            forget_organization(organization.slug)
+            projects = Project.all_objects.filter(organization=organization)
+        else:
+            projects = Project.all_objects.filter(pk=project.pk)
+        projects.update(deletion_requested_at=now)
+        totals = ProjectTaskStats.objects.filter(project__in=projects).aggregate(
+            tasks=Sum('total_tasks'), comments=Sum('total_comments')
+        )
+        job = DeletionJob.objects.create(
+            organization_id=organization.pk,
+            organization_slug=organization.slug,
+            project_id=project.pk if project else None,
+            name=(project or organization).name,
+            total_tasks=totals['tasks'] or 0,
+            total_comments=totals['comments'] or 0,
+        )
+        invalidate_organization(organization.slug)
+    return job
+
+
+def pending_jobs():
+    return DeletionJob.objects.exclude(status=DeletionJob.Status.DONE).order_by('id')
+
+
+def run_job(job, batch_size=None, pause=0):
+    """Delete everything ``job`` covers, ``batch_size`` rows per transaction."""
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    if job.project_id is None:
+        project_ids = list(Project.all_objects.filter(organization_id=job.organization_id).values_list('id', flat=True))
+    else:
+        project_ids = [job.project_id]
+    DeletionJob.objects.filter(pk=job.pk).update(status=DeletionJob.Status.RUNNING)
+
+    steps = [
+        (TaskComment.objects.filter(task__project_id__in=project_ids), 'deleted_comments'),
+        (Task.objects.filter(project_id__in=project_ids), 'deleted_tasks'),
+        (Project.all_objects.filter(id__in=project_ids), 'deleted_projects'),
+    ]
+    for queryset, counter in steps:
+        while True:
+            with transaction.atomic():
+                ids = list(queryset.order_by().values_list('id', flat=True)[:batch_size])
+                if not ids:
+                    break
+                queryset.model._base_manager.filter(id__in=ids).delete()
+                DeletionJob.objects.filter(pk=job.pk).update(**{counter: F(counter) + len(ids)})
+                invalidate_organization(job.organization_slug)
+            if pause:
+                time.sleep(pause)
+
+    with transaction.atomic():
+        if job.project_id is None:
+            Organization.all_objects.filter(pk=job.organization_id).delete()
+        DeletionJob.objects.filter(pk=job.pk).update(status=DeletionJob.Status.DONE, finished_at=timezone.now())
+        invalidate_organization(job.organization_slug)
+    job.refresh_from_db()
+    return job
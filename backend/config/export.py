@@ -0,0 +1,144 @@
+"""
+Streaming exports of an organization's tasks and comments, as CSV or NDJSON.
+
+    GET /export/<org_slug>/tasks.csv?project=<id>&status=TODO
+    GET /export/<org_slug>/comments.ndjson?project=<id>
+
+Rows are read with ``QuerySet.iterator()`` (a server-side cursor on
+PostgreSQL) and written to a ``StreamingHttpResponse`` a chunk at a time, so
+memory stays flat however large the tenant is and the first rows are sent
+before the last ones are read. Under ASGI the chunks are produced through
+``sync_to_async`` rather than buffered by Django.
+"""
+import csv
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from projects.models import Project
+from task_comments.models import TaskComment
+from tasks.models import Task
+
+from .tenants import organization_id
+
+
+TASK_COLUMNS = [
+    ('id', 'id'),
+    ('project_id', 'project_id'),
+    ('project', 'project__name'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('status', 'status'),
+    ('assignee_email', 'assignee_email'),
+    ('due_date', 'due_date'),
+    ('created_at', 'created_at'),
+]
+
+COMMENT_COLUMNS = [
+    ('id', 'id'),
+    ('task_id', 'task_id'),
+    ('project_id', 'task__project_id'),
+    ('content', 'content'),
+    ('author_email', 'author_email'),
+    ('created_at', 'created_at'),
+]
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def encode_csv(names, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        [value.isoformat() if hasattr(value, 'isoformat') else value for value in row] for row in rows
+    )
+    return buffer.getvalue()
+
+
+def encode_ndjson(names, rows):
+    return ''.join(json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n' for row in rows)
+
+
+def render(queryset, columns, format):
+    """Yield the export a chunk of rows at a time."""
+    names = [name for name, _ in columns]
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    encode = encode_csv if format == 'csv' else encode_ndjson
+    if format == 'csv':
+        yield encode_csv(names, [names])
+
+    chunk = []
+    for row in queryset.values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield encode(names, chunk)
+            chunk = []
+    if chunk:
+        yield encode(names, chunk)
+
+
+async def render_async(chunks):
+    """Produce ``chunks`` on the sync thread, where its cursor lives, one chunk at a time."""
+    sentinel = object()
+    try:
+        while (chunk := await sync_to_async(next)(chunks, sentinel)) is not sentinel:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def stream(request, queryset, columns, format, filename):
+    chunks = render(queryset, columns, format)
+    if isinstance(request, ASGIRequest):
+        # Django would read a sync iterator to the end before sending anything
+        chunks = render_async(chunks)
+    response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{format}"'
+    return response
+
+
+def filtered_projects(request, org_slug):
+    """Apply ``?project=`` to the organization's projects; 404 for another tenant's project."""
+    organization = organization_id(org_slug)
+    if organization is None:
+        raise Http404("Organization not found")
+    project_id = request.GET.get('project')
+    if project_id is None:
+        return organization, None
+    if not project_id.isdigit() or not Project.objects.filter(id=project_id, organization_id=organization).exists():
+        raise Http404("Project not found in this organization")
+    return organization, int(project_id)
+
+
+@require_GET
+def export_tasks(request, org_slug, format):
+    organization, project_id = filtered_projects(request, org_slug)
+    tasks = Task.objects.filter(project__organization_id=organization, project__deletion_requested_at=None)
+    if project_id is not None:
+        tasks = tasks.filter(project_id=project_id)
+    status = request.GET.get('status')
+    if status is not None:
+        if status.upper() not in Task.Status.values:
+            return HttpResponseBadRequest(f"Invalid status. Must be one of: {', '.join(Task.Status.values)}")
+        tasks = tasks.filter(status=status.upper())
+    return stream(request, tasks.order_by('id'), TASK_COLUMNS, format, f"{org_slug}-tasks")
+
+
+@require_GET
+def export_comments(request, org_slug, format):
+    organization, project_id = filtered_projects(request, org_slug)
+    comments = TaskComment.objects.filter(
+        task__project__organization_id=organization, task__project__deletion_requested_at=None
+    )
+    if project_id is not None:
+        comments = comments.filter(task__project_id=project_id)
+    return stream(request, comments.order_by('id'), COMMENT_COLUMNS, format, f"{org_slug}-comments")
@@ -0,0 +1,333 @@
+"""
+Bulk import of tasks (and their comments) into an organization, from CSV or NDJSON.
+
+Used by ``manage.py import_tasks`` and by the upload endpoint:
+
+    POST /import/<org_slug>/tasks.csv       (body: the file, Authorization: Bearer <IMPORT_AUTH_TOKEN>)
+    POST /import/<org_slug>/tasks.ndjson?skip=20000
+
+Each row is a task: ``project_id`` or ``project`` (name), ``title``, and
+optionally ``description``, ``status``, ``assignee_email``, ``due_date`` and
+``created_at``. NDJSON rows may also carry ``comments``, a list of objects
+with ``content``, ``author_email`` and optionally ``created_at``.
+
+The input is parsed as it is read. Project names and ids are resolved once
+for the organization. Rows that fail validation are reported (by 1-based row
+number) and skipped; the rest are written in batches, each in its own
+transaction with the project counters, using COPY on PostgreSQL and
+``bulk_create()`` elsewhere. After a batch commits, everything up to it is
+done: ``processed`` is the checkpoint to resume from by skipping that many
+rows.
+"""
+import codecs
+import csv
+import hmac
+import json
+from collections import Counter, defaultdict
+from datetime import datetime, time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DatabaseError, connection, transaction
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from organizations.models import Organization
+from projects.models import Project
+from task_comments.models import TaskComment
+from tasks.models import ProjectTaskStats, Task
+
+from .bulk import BatchWriter, reserve_ids
+from .response_cache import invalidate_organization
+
+
+TASK_FIELDS = ['id', 'project', 'title', 'description', 'status', 'assignee_email', 'due_date', 'created_at']
+COMMENT_FIELDS = ['task', 'content', 'author_email', 'created_at']
+
+
+class ImportFormatError(Exception):
+    """The input as a whole can't be read, e.g. a CSV file without a title column."""
+
+
+class RowError(Exception):
+    def __init__(self, field, message):
+        super().__init__(message)
+        self.field = field
+        self.message = message
+
+
+# ==================== PARSING ====================
+
+def read_rows(stream, format):
+    """Yield each row of a text stream as a dict, or a RowError for a line that isn't an object."""
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        if reader.fieldnames is None:
+            return
+        if 'title' not in reader.fieldnames:
+            raise ImportFormatError("The CSV header has no 'title' column.")
+        for row in reader:
+            # Empty cells are missing values
+            yield {key: value for key, value in row.items() if key is not None and value != ''}
+        return
+
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield RowError(None, f"Invalid JSON: {exc}")
+            continue
+        yield row if isinstance(row, dict) else RowError(None, "Each line must be a JSON object")
+
+
+def text(row, field, required=False, max_length=None):
+    value = row.get(field)
+    if value is None or value == '':
+        if required:
+            raise RowError(field, "This field is required")
+        return ""
+    if not isinstance(value, str):
+        raise RowError(field, "Must be a string")
+    value = value.strip()
+    if max_length and len(value) > max_length:
+        raise RowError(field, f"At most {max_length} characters")
+    return value
+
+
+@lru_cache(maxsize=4096)
+def is_valid_email(value):
+    # The same few assignees and authors recur on most rows
+    try:
+        validate_email(value)
+    except ValidationError:
+        return False
+    return True
+
+
+def email(row, field, required=False):
+    value = text(row, field, required)
+    if value and not is_valid_email(value):
+        raise RowError(field, "Invalid email address")
+    return value
+
+
+def moment(row, field):
+    """An ISO 8601 date or datetime; naive values are in the current time zone."""
+    value = row.get(field)
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str):
+        raise RowError(field, "Must be an ISO 8601 date or datetime")
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None and (day := parse_date(value)) is not None:
+            parsed = datetime.combine(day, time())
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise RowError(field, "Must be an ISO 8601 date or datetime")
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+# ==================== IMPORT ====================
+
+class TaskImporter:
+    """
+    Validates rows and writes them to ``organization`` in batches.
+
+    ``on_batch(importer, errors)`` is called after each batch commits, with the
+    ``{'row', 'field', 'message'}`` errors of the rows it covers, so a caller can
+    record ``importer.processed`` as a checkpoint.
+    """
+
+    def __init__(self, organization, batch_size=None, use_copy=None, skip=0, on_batch=None):
+        self.organization = organization
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        if use_copy is None:
+            use_copy = connection.vendor == 'postgresql'
+        self.use_copy = use_copy
+        self.skip = skip
+        self.on_batch = on_batch
+        self.processed = skip
+        self.tasks = self.comments = self.rejected = 0
+        self.batch = []
+        self.errors = []
+
+        projects = Project.objects.filter(organization=organization).values_list('id', 'name')
+        self.project_ids = set()
+        self.project_names = {}
+        for project_id, name in projects:
+            self.project_ids.add(project_id)
+            # A name shared by several projects is ambiguous
+            self.project_names[name] = None if name in self.project_names else project_id
+
+    def run(self, stream, format):
+        number = 0
+        for number, row in enumerate(read_rows(stream, format), 1):
+            if number <= self.skip:
+                continue
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                self.batch.append(self.clean(row))
+            except RowError as error:
+                self.errors.append({'row': number, 'field': error.field, 'message': error.message})
+            if len(self.batch) >= self.batch_size:
+                self.flush(number)
+        self.flush(max(number, self.skip))
+        return self
+
+    def clean(self, row):
+        """Validate one row; returns ``(task values, comment values)`` without ids."""
+        project_id = self.project(row)
+        status = text(row, 'status').upper() or Task.Status.TODO
+        if status not in Task.Status.values:
+            raise RowError('status', f"Invalid status. Must be one of: {', '.join(Task.Status.values)}")
+        task = {
+            'project': project_id,
+            'title': text(row, 'title', required=True, max_length=Task._meta.get_field('title').max_length),
+            'description': text(row, 'description'),
+            'status': status,
+            'assignee_email': email(row, 'assignee_email'),
+            'due_date': moment(row, 'due_date'),
+            'created_at': moment(row, 'created_at'),
+        }
+
+        comments = row.get('comments') or []
+        if not isinstance(comments, list):
+            raise RowError('comments', "Must be a list of comments")
+        cleaned = []
+        for index, comment in enumerate(comments):
+            if not isinstance(comment, dict):
+                raise RowError(f'comments[{index}]', "Must be an object")
+            try:
+                cleaned.append({
+                    'content': text(comment, 'content', required=True),
+                    'author_email': email(comment, 'author_email', required=True),
+                    'created_at': moment(comment, 'created_at'),
+                })
+            except RowError as error:
+                raise RowError(f'comments[{index}].{error.field}', error.message)
+        return task, cleaned
+
+    def project(self, row):
+        project_id = row.get('project_id')
+        if project_id not in (None, ''):
+            if isinstance(project_id, str) and project_id.strip().isdigit():
+                project_id = int(project_id)
+            if not isinstance(project_id, int) or project_id not in self.project_ids:
+                raise RowError('project_id', "Project not found in this organization")
+            return project_id
+        name = text(row, 'project', required=True)
+        if name not in self.project_names:
+            raise RowError('project', "Project not found in this organization")
+        if self.project_names[name] is None:
+            raise RowError('project', "Several projects have this name; use project_id")
+        return self.project_names[name]
+
+    def flush(self, processed):
+        """Write the batch and its counters in one transaction; rows up to ``processed`` are then done."""
+        batch, self.batch = self.batch, []
+        if batch:
+            with transaction.atomic():
+                comments = self.write(batch)
+                deltas = defaultdict(Counter)
+                for task, task_comments in batch:
+                    counters = deltas[task['project']]
+                    counters.update(ProjectTaskStats.status_deltas(task['status'], 1))
+                    counters['total_comments'] += len(task_comments)
+                for project_id, counters in deltas.items():
+                    ProjectTaskStats.apply(project_id, **counters)
+                invalidate_organization(self.organization.slug)
+            self.tasks += len(batch)
+            self.comments += comments
+
+        errors, self.errors = self.errors, []
+        self.rejected += len(errors)
+        self.processed = processed
+        if self.on_batch:
+            self.on_batch(self, errors)
+
+    def write(self, batch):
+        now = timezone.now()
+        if self.use_copy:
+            ids = reserve_ids(Task, len(batch))
+            tasks = BatchWriter(Task, TASK_FIELDS, use_copy=True)
+            for task_id, (task, _) in zip(ids, batch):
+                tasks.add(task_id, *[task[field] for field in TASK_FIELDS[1:-1]], task['created_at'] or now)
+            tasks.flush()
+        else:
+            created = Task.objects.bulk_create([
+                Task(**{field if field != 'project' else 'project_id': task[field] for field in TASK_FIELDS[1:-1]})
+                for task, _ in batch
+            ])
+            # bulk_create() stamps created_at with now(); keep the imported values
+            dated = []
+            for created_task, (task, _) in zip(created, batch):
+                if task['created_at']:
+                    created_task.created_at = task['created_at']
+                    dated.append(created_task)
+            if dated:
+                Task.objects.bulk_update(dated, ['created_at'], batch_size=1000)
+            ids = [created_task.id for created_task in created]
+
+        comments = BatchWriter(TaskComment, COMMENT_FIELDS, self.use_copy)
+        for task_id, (_, task_comments) in zip(ids, batch):
+            for comment in task_comments:
+                comments.add(task_id, comment['content'], comment['author_email'], comment['created_at'] or now)
+        comments.flush()
+        return comments.written
+
+
+# ==================== UPLOAD ====================
+
+@csrf_exempt
+@require_POST
+def import_tasks_view(request, org_slug, format):
+    """Import an uploaded CSV/NDJSON body; requires ``Authorization: Bearer <IMPORT_AUTH_TOKEN>``."""
+    token = getattr(settings, 'IMPORT_AUTH_TOKEN', None)
+    if not token:
+        return HttpResponse("Imports are disabled; set IMPORT_AUTH_TOKEN.", status=403)
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return HttpResponse(status=401)
+    try:
+        organization = Organization.objects.get(slug=org_slug)
+    except Organization.DoesNotExist:
+        raise Http404("Organization not found")
+    skip = request.GET.get('skip', '0')
+    if not skip.isdigit():
+        return JsonResponse({'error': "skip must be a number of rows"}, status=400)
+
+    errors = []
+    max_errors = settings.IMPORT_MAX_REPORTED_ERRORS
+
+    def report(importer, batch_errors):
+        errors.extend(batch_errors[:max_errors - len(errors)])
+
+    importer = TaskImporter(organization, skip=int(skip), on_batch=report)
+    # The body is read as it is parsed, not loaded into memory first
+    stream = codecs.getreader('utf-8-sig')(request)
+    status = 200
+    try:
+        importer.run(stream, format)
+    except ImportFormatError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    except UnicodeDecodeError:
+        return JsonResponse({'error': "The file must be UTF-8 encoded"}, status=400)
+    except DatabaseError:
+        # Batches up to importer.processed are committed; resume with ?skip=processed
+        status = 500
+    return JsonResponse({
+        'processed': importer.processed,
+        'tasks': importer.tasks,
+        'comments': importer.comments,
+        'error_count': importer.rejected,
+        'errors': errors,
+    }, status=status)
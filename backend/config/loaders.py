@@ -0,0 +1,269 @@
+"""
+Request-scoped batch loaders for nested GraphQL resolvers.
+
+Every object a resolver hands back to GraphQL is registered with the
+request's ``RequestLoaders``. When a nested field is resolved for one parent,
+its loader fetches the relation for *every* registered parent that has not
+been loaded yet in a single query, so the number of queries depends on the
+shape of the operation rather than on the number of rows returned.
+
+``AsyncRequestLoaders`` is the same for the async view: loads return
+awaitables, concurrent loads of one batch share a single query, and the
+queries themselves run through ``sync_to_async`` so they never block the
+event loop. Resolvers that post-process a loaded value use ``then()`` so they
+work with either.
+"""
+import asyncio
+import inspect
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count
+from django.utils import timezone
+
+from organizations.models import Organization
+from projects.models import Project
+from tasks.models import Task
+from task_comments.models import TaskComment
+
+from . import stats
+
+
+def then(value, callback):
+    """``callback(value)``, waiting for ``value`` first if a loader returned an awaitable."""
+    if inspect.isawaitable(value):
+        async def chained():
+            return callback(await value)
+        return chained()
+    return callback(value)
+
+
+class BatchLoader:
+    """Loads values keyed by parent id, batching over all registered parents."""
+
+    def __init__(self, registry, source, batch_load_fn, default=None):
+        # source is (model, attribute) describing where candidate keys live,
+        # e.g. (Task, 'id') for loaders keyed by task id.
+        self.registry = registry
+        self.source = source
+        self.batch_load_fn = batch_load_fn
+        self.default = default
+        self._cache = {}
+
+    def load(self, key):
+        if key is None:
+            return self._default()
+        if key not in self._cache:
+            keys = self.registry.keys_for(*self.source) - self._cache.keys()
+            keys.add(key)
+            results = self.batch_load_fn(keys)
+            for k in keys:
+                self._cache[k] = results.get(k, self._default())
+        return self._cache[key]
+
+    def _default(self):
+        return self.default() if callable(self.default) else self.default
+
+
+class AsyncBatchLoader(BatchLoader):
+    """``BatchLoader`` whose ``load`` returns an awaitable unless the value is already cached."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending = {}
+
+    def load(self, key):
+        if key is None:
+            return self._default()
+        if key in self._cache:
+            return self._cache[key]
+        return self._load(key)
+
+    async def _load(self, key):
+        batch = self._pending.get(key)
+        if batch is None:
+            keys = self.registry.keys_for(*self.source) - self._cache.keys() - self._pending.keys()
+            keys.add(key)
+            batch = asyncio.ensure_future(self._load_batch(keys))
+            for k in keys:
+                self._pending[k] = batch
+        await batch
+        return self._cache[key]
+
+    async def _load_batch(self, keys):
+        try:
+            results = await sync_to_async(self.batch_load_fn)(keys)
+            for k in keys:
+                self._cache[k] = results.get(k, self._default())
+        finally:
+            for k in keys:
+                self._pending.pop(k, None)
+
+
+class RequestLoaders:
+    """All batch loaders for a single GraphQL request."""
+
+    loader_class = BatchLoader
+
+    def __init__(self):
+        self._instances = defaultdict(dict)
+        # Batch functions may register rows from a worker thread (see AsyncRequestLoaders)
+        self._lock = threading.RLock()
+        # One clock reading per request keeps overdue counts consistent across parents
+        self.now = timezone.now()
+
+        self.comments_by_task = self.loader_class(self, (Task, 'id'), self._load_comments_by_task, list)
+        self.comment_count_by_task = self.loader_class(self, (Task, 'id'), self._load_comment_count_by_task, 0)
+        self.tasks_by_project = self.loader_class(self, (Project, 'id'), self._load_tasks_by_project, list)
+        self.task_count_by_project = self.loader_class(self, (Project, 'id'), self._load_task_count_by_project, 0)
+        self.projects_by_organization = self.loader_class(
+            self, (Organization, 'id'), self._load_projects_by_organization, list
+        )
+        self.project_count_by_organization = self.loader_class(
+            self, (Organization, 'id'), self._load_project_count_by_organization, 0
+        )
+
+        self.project_stats = self.loader_class(
+            self, (Project, 'id'), lambda keys: stats.project_stats(keys, self.now), dict
+        )
+        self.organization_stats = self.loader_class(self, (Organization, 'id'), stats.organization_stats, dict)
+
+        # Forward foreign keys that were not fetched with select_related()
+        self.task = self.loader_class(self, (TaskComment, 'task_id'), self._load_by_id(Task))
+        self.project = self.loader_class(self, (Task, 'project_id'), self._load_by_id(Project))
+        self.organization = self.loader_class(self, (Project, 'organization_id'), self._load_by_id(Organization))
+
+    # ==================== REGISTRY ====================
+
+    def register(self, instances):
+        """Record instances (and anything fetched along with them) as batch candidates."""
+        instances = list(instances)
+        with self._lock:
+            for instance in instances:
+                if instance is None:
+                    continue
+                registered = self._instances[instance._meta.concrete_model]
+                if registered.get(instance.pk) is instance:
+                    continue
+                registered[instance.pk] = instance
+                # Rows pulled in by select_related() / prefetch_related()
+                self.register(instance._state.fields_cache.values())
+                prefetched = getattr(instance, '_prefetched_objects_cache', None)
+                if prefetched:
+                    for related in prefetched.values():
+                        self.register(related)
+        return instances
+
+    def register_one(self, instance):
+        if instance is not None:
+            self.register([instance])
+        return instance
+
+    def related(self, instance, field_name):
+        """Resolve a forward foreign key without a query per instance."""
+        descriptor = getattr(type(instance), field_name)
+        if descriptor.is_cached(instance):
+            return getattr(instance, field_name)
+        field = descriptor.field
+        key = getattr(instance, field.attname)
+        related = self._instances[field.related_model].get(key)
+        if related is None:
+            related = getattr(self, field_name).load(key)
+
+        def cache(related):
+            if related is not None:
+                field.set_cached_value(instance, related)
+            return related
+        return then(related, cache)
+
+    def keys_for(self, model, attr):
+        with self._lock:
+            return {
+                key for key in (getattr(obj, attr) for obj in self._instances[model].values())
+                if key is not None
+            }
+
+    # ==================== ROOT QUERYSETS ====================
+
+    def fetch(self, queryset):
+        """Evaluate a root queryset, registering its rows."""
+        return self.register(queryset)
+
+    def fetch_one(self, queryset):
+        return self.register_one(queryset.first())
+
+    def count(self, queryset):
+        return queryset.count()
+
+    # ==================== BATCH FUNCTIONS ====================
+
+    def _group(self, rows, attr):
+        grouped = defaultdict(list)
+        for row in self.register(rows):
+            grouped[getattr(row, attr)].append(row)
+        return grouped
+
+    def _load_comments_by_task(self, keys):
+        return self._group(
+            TaskComment.objects.filter(task_id__in=keys).order_by('created_at', 'id'),
+            'task_id'
+        )
+
+    def _load_comment_count_by_task(self, keys):
+        return self._counts(TaskComment.objects.filter(task_id__in=keys), 'task_id')
+
+    def _load_tasks_by_project(self, keys):
+        return self._group(
+            Task.objects.filter(project_id__in=keys).order_by('-created_at', '-id'),
+            'project_id'
+        )
+
+    def _load_task_count_by_project(self, keys):
+        return self._counts(Task.objects.filter(project_id__in=keys), 'project_id')
+
+    def _load_projects_by_organization(self, keys):
+        return self._group(
+            Project.objects.filter(organization_id__in=keys).order_by('-created_at', '-id'),
+            'organization_id'
+        )
+
+    def _load_project_count_by_organization(self, keys):
+        return self._counts(Project.objects.filter(organization_id__in=keys), 'organization_id')
+
+    @staticmethod
+    def _counts(queryset, attr):
+        rows = queryset.order_by().values(attr).annotate(total=Count('id'))
+        return {row[attr]: row['total'] for row in rows}
+
+    def _load_by_id(self, model):
+        def batch_load(keys):
+            return {obj.pk: obj for obj in self.register(model.objects.filter(pk__in=keys))}
+        return batch_load
+
+
+class AsyncRequestLoaders(RequestLoaders):
+    """Request loaders for the async view; root querysets use Django's async ORM API."""
+
+    loader_class = AsyncBatchLoader
+
+    async def fetch(self, queryset):
+        return self.register([instance async for instance in queryset])
+
+    async def fetch_one(self, queryset):
+        return self.register_one(await queryset.afirst())
+
+    async def count(self, queryset):
+        return await queryset.acount()
+
+
+def get_loaders(info):
+    """Return the loaders attached to this request, creating them on first use."""
+    context = info.context
+    if context is None:
+        return RequestLoaders()
+    loaders = getattr(context, 'loaders', None)
+    if loaders is None:
+        loaders = RequestLoaders()
+        context.loaders = loaders
+    return loaders
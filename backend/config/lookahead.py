@@ -0,0 +1,161 @@
+"""
+Selection-set lookahead for building querysets.
+
+``selected_fields(info)`` turns the fields requested under the current
+resolver (following fragments and honouring @skip/@include) into a nested
+dict keyed by snake_case field name. ``optimize()`` uses that tree to add
+exactly the ``select_related``, ``prefetch_related``, count annotations and
+``only()`` columns the operation needs, so ORM work (and the size of each
+row) is proportional to what the client asked for. Anything not handled here
+is still batched by the request loaders.
+"""
+from django.db.models import Count, Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLIncludeDirective,
+    GraphQLSkipDirective,
+    InlineFragmentNode,
+)
+from graphql.execution.values import get_directive_values
+
+from organizations.models import Organization
+from projects.models import Project
+from tasks.models import Task
+from task_comments.models import TaskComment
+
+
+# Per model: forward foreign keys, and reverse relations as
+# (related model, count field on the GraphQL type, ordering)
+RELATIONS = {
+    Organization: {
+        'fk': {},
+        'to_many': {
+            'projects': (Project, 'project_count', ('-created_at', '-id')),
+        },
+    },
+    Project: {
+        'fk': {'organization': Organization},
+        'to_many': {
+            'tasks': (Task, 'task_count', ('-created_at', '-id')),
+        },
+    },
+    Task: {
+        'fk': {'project': Project},
+        'to_many': {
+            'comments': (TaskComment, 'comment_count', ('created_at', 'id')),
+        },
+    },
+    TaskComment: {
+        'fk': {'task': Task},
+        'to_many': {},
+    },
+}
+
+
+# Computed GraphQL fields and the columns they read
+COLUMN_DEPENDENCIES = {
+    Task: {'is_overdue': ('due_date', 'status')},
+}
+
+
+# ==================== SELECTION WALKING ====================
+
+def selected_fields(info):
+    """Fields selected under the field being resolved, as ``{name: {sub-selections}}``."""
+    fields = {}
+    for field_node in info.field_nodes:
+        _collect(field_node.selection_set, info, fields)
+    return fields
+
+
+def connection_node_fields(fields):
+    """Selections made on ``edges { node { ... } }`` of a connection field."""
+    return fields.get('edges', {}).get('node', {})
+
+
+def _collect(selection_set, info, fields):
+    if selection_set is None:
+        return
+    for selection in selection_set.selections:
+        if not _included(selection, info):
+            continue
+        if isinstance(selection, FieldNode):
+            name = selection.name.value
+            if name.startswith('__'):
+                continue
+            _collect(selection.selection_set, info, fields.setdefault(to_snake_case(name), {}))
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = info.fragments.get(selection.name.value)
+            if fragment is not None:
+                _collect(fragment.selection_set, info, fields)
+        elif isinstance(selection, InlineFragmentNode):
+            _collect(selection.selection_set, info, fields)
+
+
+def _included(node, info):
+    skip = get_directive_values(GraphQLSkipDirective, node, info.variable_values)
+    if skip and skip['if']:
+        return False
+    include = get_directive_values(GraphQLIncludeDirective, node, info.variable_values)
+    return not (include and not include['if'])
+
+
+# ==================== QUERYSET BUILDING ====================
+
+def optimize(queryset, fields, annotate_counts=True):
+    """
+    Apply the joins, prefetches, annotations and columns ``fields`` needs to ``queryset``.
+
+    Paginated resolvers pass ``annotate_counts=False``: a COUNT annotation adds
+    a GROUP BY that stops the keyset index from serving ORDER BY ... LIMIT, and
+    the loaders count children for the whole page in one query anyway.
+    """
+    select, prefetch, annotations, columns = _plan(queryset.model, fields, '', annotate_counts)
+    queryset = queryset.only(*columns)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if annotations:
+        queryset = queryset.annotate(**annotations)
+    return queryset
+
+
+def _plan(model, fields, prefix, annotate_counts):
+    select, prefetch, annotations = [], [], {}
+    columns = [prefix + name for name in _columns(model, fields)]
+    relations = RELATIONS[model]
+
+    for name, related_model in relations['fk'].items():
+        if name in fields:
+            select.append(prefix + name)
+            nested_select, nested_prefetch, _, nested_columns = _plan(
+                related_model, fields[name], f"{prefix}{name}__", False
+            )
+            select += nested_select
+            prefetch += nested_prefetch
+            columns += nested_columns
+
+    for name, (related_model, count_field, ordering) in relations['to_many'].items():
+        if name in fields:
+            children = optimize(related_model.objects.order_by(*ordering), fields[name])
+            prefetch.append(Prefetch(prefix + name, queryset=children))
+        elif count_field in fields and annotate_counts and not prefix:
+            annotations[f"{count_field}_annotated"] = Count(name)
+
+    return select, prefetch, annotations, columns
+
+
+def _columns(model, fields):
+    """Model fields to load for ``fields``; large text columns stay deferred unless selected."""
+    names = set()
+    for field in model._meta.concrete_fields:
+        # Keys are always needed for joins, prefetches and the loaders
+        if field.primary_key or field.is_relation or field.name in fields:
+            names.add(field.name)
+    for name, dependencies in COLUMN_DEPENDENCIES.get(model, {}).items():
+        if name in fields:
+            names.update(dependencies)
+    return sorted(names)
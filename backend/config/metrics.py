@@ -0,0 +1,497 @@
+"""
+Prometheus metrics for the GraphQL API, served at /metrics.
+
+Metrics are recorded without locks: every thread writes to its own shard of
+plain dicts, and shards are only summed when /metrics is scraped.
+
+Under a pre-fork server (gunicorn with several workers) each process only
+sees its own requests. Set ``METRICS_MULTIPROCESS_DIR`` to a directory
+shared by the workers (and emptied on deploy): every process then writes a
+snapshot of its metrics there once a second, and /metrics adds up the
+snapshots of all processes. Gauges of processes that have exited are
+dropped; their counters and histograms are kept, as Prometheus expects.
+
+Collected by ``GraphQLMetricsMiddleware`` (requests in flight) and the
+GraphQL view (per-operation latency, SQL queries, errors and cache lookups).
+Database connection pool metrics are read from the pools when collected.
+"""
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Distinct operation names kept as label values per process; others become "other"
+MAX_OPERATION_NAMES = 100
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ==================== REGISTRY ====================
+
+class Registry:
+    """Metric definitions plus the per-thread shards holding their values."""
+
+    def __init__(self):
+        self.metrics = {}
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._flusher_pid = None
+        self.collectors = []
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector):
+        """Call ``collector()``, returning ``{(metric name, label values): value}``, on every collection."""
+        self.collectors.append(collector)
+        return collector
+
+    def shard(self):
+        """This thread's ``{(metric name, label values): value}`` dict."""
+        self._dirty = True
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append(values)
+            if self._flusher_pid != os.getpid() and get_multiprocess_dir():
+                self._start_flusher()
+            return values
+
+    def _reset(self):
+        # A forked worker starts from zero rather than with its parent's values
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+
+    def collect(self):
+        """This process's values, summed over threads."""
+        with self._lock:
+            shards = list(self._shards)
+        totals = {}
+        for shard in shards:
+            for key, value in shard.copy().items():
+                total = totals.get(key)
+                if isinstance(value, list):
+                    value = list(value)
+                    totals[key] = value if total is None else [a + b for a, b in zip(total, value)]
+                else:
+                    totals[key] = value if total is None else total + value
+        for collector in self.collectors:
+            totals.update(collector())
+        return totals
+
+    # ==================== MULTIPROCESS ====================
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_periodically, name='metrics-flusher', daemon=True).start()
+
+    def _flush_periodically(self):
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0))
+            if self._dirty:
+                self.flush()
+
+    def flush(self):
+        """Write this process's snapshot to the multiprocess directory."""
+        directory = get_multiprocess_dir()
+        if not directory:
+            return
+        self._dirty = False
+        snapshot = {
+            'pid': os.getpid(),
+            'values': [[name, list(labels), value] for (name, labels), value in self.collect().items()],
+        }
+        fd, path = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(path, os.path.join(directory, f'metrics-{os.getpid()}.json'))
+
+    def collect_all(self):
+        """Values of every process sharing the multiprocess directory (or just this one)."""
+        directory = get_multiprocess_dir()
+        if not directory:
+            return self.collect()
+        self.flush()
+        totals = {}
+        for filename in os.listdir(directory):
+            if not (filename.startswith('metrics-') and filename.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _is_alive(snapshot['pid'])
+            for name, labels, value in snapshot['values']:
+                metric = self.metrics.get(name)
+                if metric is None or (metric.type == 'gauge' and not alive):
+                    continue
+                key = (name, tuple(labels))
+                total = totals.get(key)
+                if isinstance(value, list):
+                    totals[key] = value if total is None else [a + b for a, b in zip(total, value)]
+                else:
+                    totals[key] = value if total is None else total + value
+        return totals
+
+    # ==================== EXPOSITION ====================
+
+    def render(self):
+        values = self.collect_all()
+        by_metric = {}
+        for (name, labels), value in sorted(values.items(), key=lambda item: (item[0][0], item[0][1])):
+            by_metric.setdefault(name, []).append((labels, value))
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            for labels, value in by_metric.get(name, []):
+                lines.extend(metric.samples(labels, value))
+        return '\n'.join(lines) + '\n'
+
+
+def _is_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def get_multiprocess_dir():
+    return getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+
+
+registry = Registry()
+
+
+# ==================== METRIC TYPES ====================
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def samples(self, labels, value):
+        return [f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}']
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labels, amount=1):
+        values = registry.shard()
+        key = (self.name, labels)
+        values[key] = values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def inc(self, *labels, amount=1):
+        values = registry.shard()
+        key = (self.name, labels)
+        values[key] = values.get(key, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """Histogram with fixed buckets; stored as per-bucket counts followed by the sum."""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels, value):
+        values = registry.shard()
+        key = (self.name, labels)
+        counts = values.get(key)
+        if counts is None:
+            counts = values[key] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def samples(self, labels, value):
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float('inf')), value[:-1]):
+            cumulative += count
+            lines.append(
+                f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", _number(bound))])} {cumulative}'
+            )
+        lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(value[-1])}')
+        lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+# ==================== GRAPHQL METRICS ====================
+
+OPERATION_DURATION = Histogram(
+    'graphql_operation_duration_seconds',
+    "Time to parse, validate and execute a GraphQL operation.",
+    ['operation_name', 'operation_type'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+OPERATION_SQL_QUERIES = Histogram(
+    'graphql_operation_sql_queries',
+    "SQL statements run per GraphQL operation.",
+    ['operation_name', 'operation_type'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+RESOLVER_ERRORS = Counter(
+    'graphql_resolver_errors_total',
+    "Errors raised while resolving a field, by field name.",
+    ['field'],
+)
+OPERATION_ERRORS = Counter(
+    'graphql_operation_errors_total',
+    "Operations rejected before execution (syntax, validation, cost, persisted query).",
+    ['operation_type'],
+)
+CACHE_REQUESTS = Counter(
+    'graphql_cache_requests_total',
+    "Lookups in the document, persisted query and response caches.",
+    ['cache', 'result'],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'graphql_requests_in_flight',
+    "GraphQL HTTP requests currently being served.",
+)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache, 'hit' if hit else 'miss')
+
+
+_operation_names = set()
+
+
+def operation_label(name):
+    if not name:
+        return 'anonymous'
+    if name in _operation_names:
+        return name
+    if len(_operation_names) >= MAX_OPERATION_NAMES:
+        return 'other'
+    _operation_names.add(name)
+    return name
+
+
+# ==================== CONNECTION POOL ====================
+
+POOL_CONNECTIONS = Gauge(
+    'db_pool_connections',
+    "Connections open in the database connection pool, by state.",
+    ['database', 'state'],
+)
+POOL_MAX_CONNECTIONS = Gauge(
+    'db_pool_max_connections',
+    "Most connections the pool may open (DB_POOL_MAX_SIZE).",
+    ['database'],
+)
+POOL_REQUESTS_WAITING = Gauge(
+    'db_pool_requests_waiting',
+    "Requests waiting for a free connection.",
+    ['database'],
+)
+POOL_REQUESTS = Counter(
+    'db_pool_requests_total',
+    "Connections handed out by the pool.",
+    ['database'],
+)
+POOL_WAIT = Counter(
+    'db_pool_wait_seconds_total',
+    "Time spent waiting for a free connection.",
+    ['database'],
+)
+POOL_TIMEOUTS = Counter(
+    'db_pool_timeouts_total',
+    "Requests that got no connection within DB_POOL_TIMEOUT.",
+    ['database'],
+)
+POOL_BAD_CONNECTIONS = Counter(
+    'db_pool_bad_connections_total',
+    "Connections discarded because the health check failed or they were returned broken.",
+    ['database'],
+)
+
+
+def database_pools():
+    """``(alias, pool)`` for every database using a connection pool."""
+    for alias in connections:
+        connection = connections[alias]
+        if connection.vendor == 'postgresql' and connection.settings_dict['OPTIONS'].get('pool'):
+            yield alias, connection.pool
+
+
+@registry.add_collector
+def pool_metrics():
+    values = {}
+    for alias, pool in database_pools():
+        # psycopg_pool only reports the counters that are not zero
+        stats = pool.get_stats()
+        size, available = stats.get('pool_size', 0), stats.get('pool_available', 0)
+        values[(POOL_CONNECTIONS.name, (alias, 'idle'))] = available
+        values[(POOL_CONNECTIONS.name, (alias, 'in_use'))] = size - available
+        values[(POOL_MAX_CONNECTIONS.name, (alias,))] = stats.get('pool_max', 0)
+        values[(POOL_REQUESTS_WAITING.name, (alias,))] = stats.get('requests_waiting', 0)
+        values[(POOL_REQUESTS.name, (alias,))] = stats.get('requests_num', 0)
+        values[(POOL_WAIT.name, (alias,))] = stats.get('requests_wait_ms', 0) / 1000
+        values[(POOL_TIMEOUTS.name, (alias,))] = stats.get('requests_errors', 0)
+        values[(POOL_BAD_CONNECTIONS.name, (alias,))] = (
+            stats.get('connections_lost', 0) + stats.get('returns_bad', 0)
+        )
+    return values
+
+
+# ==================== SQL COUNT ====================
+
+class OperationStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+
+
+current_operation = ContextVar('graphql_operation_stats', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    stats = current_operation.get()
+    if stats is not None:
+        stats.queries += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counters():
+    """Add the counting wrapper to this thread's connections (new ones get it on creation)."""
+    for alias in connections:
+        wrappers = connections[alias].execute_wrappers
+        if count_queries not in wrappers:
+            wrappers.append(count_queries)
+
+
+def _connection_created(sender, connection, **kwargs):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+connection_created.connect(_connection_created, dispatch_uid='config.metrics')
+
+
+def start_operation():
+    """Start timing an operation; returns ``(stats, token)`` for ``finish_operation``."""
+    stats = OperationStats()
+    return stats, current_operation.set(stats)
+
+
+def finish_operation(stats, token, operation_name, operation_type, execution_result):
+    current_operation.reset(token)
+    name = operation_label(operation_name)
+    operation_type = operation_type or 'unknown'
+    OPERATION_DURATION.observe(name, operation_type, value=time.perf_counter() - stats.started)
+    OPERATION_SQL_QUERIES.observe(name, operation_type, value=stats.queries)
+    if execution_result is None or not execution_result.errors:
+        return
+    for error in execution_result.errors:
+        path = getattr(error, 'path', None)
+        if path:
+            RESOLVER_ERRORS.inc(next((key for key in reversed(path) if isinstance(key, str)), ''))
+    if all(not getattr(error, 'path', None) for error in execution_result.errors):
+        OPERATION_ERRORS.inc(operation_type)
+
+
+# ==================== HTTP ====================
+
+class GraphQLMetricsMiddleware:
+    """Counts requests in flight for the GraphQL endpoint."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = getattr(settings, 'METRICS_GRAPHQL_PATH', '/graphql/')
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not request.path.startswith(self.prefix):
+            return self.get_response(request)
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            return self.get_response(request)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+
+    async def __acall__(self, request):
+        if not request.path.startswith(self.prefix):
+            return await self.get_response(request)
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            return await self.get_response(request)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+
+
+def metrics_view(request):
+    """Prometheus text exposition; requires ``Authorization: Bearer <METRICS_AUTH_TOKEN>`` when that is set."""
+    token = getattr(settings, 'METRICS_AUTH_TOKEN', None)
+    if token:
+        expected = f'Bearer {token}'.encode()
+        if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected):
+            return HttpResponse(status=401)
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,30 @@
+"""
+Migration operations for indexes on large tables.
+
+A plain ``AddIndex`` runs ``CREATE INDEX``, which blocks writes to the table
+until the index is built. ``AddIndexConcurrently`` builds it with
+``CREATE INDEX CONCURRENTLY`` on PostgreSQL, so the app keeps writing, and
+falls back to ``AddIndex`` on other databases (SQLite, for tests and
+benchmarks). Migrations using it must set ``atomic = False``.
+
+If a concurrent build fails, PostgreSQL leaves an INVALID index behind; drop
+it and run the migration again.
+"""
+from django.contrib.postgres import operations
+from django.db.migrations import AddIndex
+
+
+class AddIndexConcurrently(operations.AddIndexConcurrently):
+    """``CREATE INDEX CONCURRENTLY`` on PostgreSQL, a plain ``AddIndex`` elsewhere."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
@@ -0,0 +1,128 @@
+"""
+Keyset (cursor) pagination for Relay connections.
+
+Cursors encode the values of the ordering columns of the last row seen, and
+pages are fetched with a ``WHERE (created_at, id) < (?, ?)`` style predicate
+instead of OFFSET, so every page costs the same as the first one.
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from graphene.relay import PageInfo
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError
+
+from .loaders import then
+
+
+def _serialize(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(instance, ordering):
+    values = [_serialize(getattr(instance, name.lstrip('-'))) for name in ordering]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, model, ordering):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(ordering) or None in values:
+            # Paginated columns are never NULL (overdueTasks only has tasks with a due date)
+            raise ValueError
+        return [
+            model._meta.get_field(name.lstrip('-')).to_python(value)
+            for name, value in zip(ordering, values)
+        ]
+    except (ValueError, TypeError, UnicodeError, ValidationError) as e:
+        raise GraphQLError(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_filter(ordering, values, forward=True):
+    """Rows strictly after (or before) ``values`` in ``ordering``."""
+    condition = Q()
+    equal = Q()
+    for name, value in zip(ordering, values):
+        field = name.lstrip('-')
+        descending = name.startswith('-')
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= equal & Q(**{f"{field}__{lookup}": value})
+        equal &= Q(**{field: value})
+    return condition
+
+
+def paginate(queryset, connection_type, ordering, first=None, after=None, last=None,
+             before=None, fetch=list):
+    """
+    Build a ``connection_type`` page from ``queryset`` ordered by ``ordering``.
+
+    ``ordering`` must end with a unique column (normally ``id``) so cursors are
+    unambiguous. ``fetch`` evaluates the sliced queryset; resolvers pass their
+    request loaders' ``fetch`` so the page's rows take part in batching. If
+    ``fetch`` returns an awaitable (async view), so does ``paginate``.
+    """
+    max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+    for name, value in (('first', first), ('last', last)):
+        if value is not None and value < 0:
+            raise GraphQLError(f"Argument '{name}' must be a non-negative integer.")
+        if value is not None and value > max_limit:
+            raise GraphQLError(f"Requesting {value} records exceeds the '{name}' limit of {max_limit} records.")
+    if first is None and last is None:
+        first = max_limit
+
+    model = queryset.model
+    total = queryset
+    queryset = queryset.order_by(*ordering)
+    loaded, deferred = queryset.query.deferred_loading
+    if not deferred:
+        # only() is in effect: cursors are built from the ordering columns
+        queryset = queryset.only(*loaded, *(name.lstrip('-') for name in ordering))
+    if after:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(after, model, ordering), forward=True))
+    if before:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(before, model, ordering), forward=False))
+
+    if first is not None:
+        rows = fetch(queryset[:first + 1])
+    else:
+        rows = fetch(queryset.reverse()[:last + 1])
+
+    def build(rows):
+        return _connection(rows, total, connection_type, ordering, first, after, last, before)
+    return then(rows, build)
+
+
+def _connection(rows, total, connection_type, ordering, first, after, last, before):
+    if first is not None:
+        has_next_page = len(rows) > first
+        rows = rows[:first]
+        has_previous_page = bool(after)
+        if last is not None and len(rows) > last:
+            rows = rows[len(rows) - last:]
+            has_previous_page = True
+    else:
+        has_previous_page = len(rows) > last
+        rows = rows[:last][::-1]
+        has_next_page = bool(before)
+
+    edges = [
+        connection_type.Edge(node=row, cursor=encode_cursor(row, ordering))
+        for row in rows
+    ]
+    connection = connection_type(
+        edges=edges,
+        page_info=PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=has_previous_page,
+            has_next_page=has_next_page,
+        )
+    )
+    # Unsliced queryset, used by totalCount when a client asks for it
+    connection.iterable = total
+    return connection
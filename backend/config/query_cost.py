@@ -0,0 +1,209 @@
+"""
+Query cost analysis and depth limits.
+
+``TaskCommentType.task``, ``TaskType.project`` and ``ProjectType.organization``
+make the schema cyclic, so a small document can ask for every row in the
+database many times over. Before executing an operation, its selection set is
+walked to estimate how many objects it can materialize:
+
+- a connection field returns ``first``/``last`` rows (``RELAY_CONNECTION_MAX_LIMIT``
+  when neither is given);
+- a plain list field (``projects``, ``tasks``, ``comments``) is assumed to
+  return ``LIST_SIZE`` rows;
+- every object costs its type's weight (``TYPE_WEIGHTS``, 1 by default)
+  times the number of rows of all enclosing lists; scalars are free, except
+  the fields in ``FIELD_WEIGHTS``, which cost a query of their own.
+
+Operations deeper than ``GRAPHQL_MAX_QUERY_DEPTH`` or costlier than
+``GRAPHQL_MAX_QUERY_COST`` are rejected. Both limits can be raised or
+lowered per organization in ``GRAPHQL_QUERY_LIMITS``. Introspection fields
+are not counted.
+
+Cost depends on the variables and the organization, so unlike the rest of
+validation it is not cached with the document; it runs on every request.
+"""
+from django.conf import settings
+from graphene_django.settings import graphene_settings
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    InlineFragmentNode,
+    IntValueNode,
+    VariableNode,
+    get_named_type,
+    get_nullable_type,
+    is_list_type,
+    is_object_type,
+)
+from graphql.validation import ValidationRule
+
+from .response_cache import ALL_ORGANIZATIONS
+
+
+# Rows assumed for a list field that takes no pagination arguments
+LIST_SIZE = 20
+
+# Object type -> cost of each object; unlisted object types cost 1
+TYPE_WEIGHTS = {
+    'PageInfo': 0,
+    'ErrorType': 0,
+}
+
+# Connection and edge wrappers hold no rows of their own
+WRAPPER_SUFFIXES = ('Connection', 'Edge')
+
+# Scalar fields answered by a query of their own
+FIELD_WEIGHTS = {
+    'totalCount': 1,
+}
+
+
+def get_limits(scopes):
+    """
+    ``(max_depth, max_cost)`` for an operation reading the organizations in
+    ``scopes`` (see ``response_cache.operation_scopes``): the strictest
+    limits of those organizations, or the defaults when it names none.
+    """
+    default = {
+        'max_depth': getattr(settings, 'GRAPHQL_MAX_QUERY_DEPTH', None),
+        'max_cost': getattr(settings, 'GRAPHQL_MAX_QUERY_COST', None),
+    }
+    overrides = getattr(settings, 'GRAPHQL_QUERY_LIMITS', {})
+    tenants = [
+        {**default, **overrides.get(scope, {})}
+        for scope in (scopes or ()) if scope != ALL_ORGANIZATIONS
+    ] or [default]
+    return tuple(
+        min((limits[name] for limits in tenants if limits[name] is not None), default=None)
+        for name in ('max_depth', 'max_cost')
+    )
+
+
+def type_weight(named_type):
+    if named_type.name in TYPE_WEIGHTS:
+        return TYPE_WEIGHTS[named_type.name]
+    if named_type.name.endswith(WRAPPER_SUFFIXES):
+        return 0
+    return 1 if is_object_type(named_type) else 0
+
+
+def page_size(field_node, variables):
+    """The ``first``/``last`` argument of a connection field, if given."""
+    for argument in field_node.arguments:
+        if argument.name.value not in ('first', 'last'):
+            continue
+        value = argument.value
+        if isinstance(value, IntValueNode):
+            return int(value.value)
+        if isinstance(value, VariableNode):
+            size = (variables or {}).get(value.name.value)
+            if isinstance(size, int):
+                return size
+    return None
+
+
+class QueryCost:
+    """Estimated cost and depth of one operation."""
+
+    def __init__(self, schema, fragments, variables):
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables
+
+    def measure(self, operation):
+        """``(cost, depth)`` of ``operation``."""
+        root_type = self.schema.get_root_type(operation.operation)
+        return self.selection_set(root_type, operation.selection_set, 1, 0, None, frozenset())
+
+    def selection_set(self, parent_type, selection_set, rows, depth, page, spreads):
+        """
+        Cost and depth of a selection set on ``rows`` objects of ``parent_type``.
+        ``page`` is the page size when ``parent_type`` is a connection, for its ``edges``.
+        """
+        cost, max_depth = 0, depth
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_cost, field_depth = self.field(parent_type, selection, rows, depth, page, spreads)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition is not None:
+                    fragment_type = self.schema.get_type(selection.type_condition.name.value) or parent_type
+                field_cost, field_depth = self.selection_set(
+                    fragment_type, selection.selection_set, rows, depth, page, spreads
+                )
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is None or name in spreads:
+                    continue
+                fragment_type = self.schema.get_type(fragment.type_condition.name.value) or parent_type
+                field_cost, field_depth = self.selection_set(
+                    fragment_type, fragment.selection_set, rows, depth, page, spreads | {name}
+                )
+            else:
+                continue
+            cost += field_cost
+            max_depth = max(max_depth, field_depth)
+        return cost, max_depth
+
+    def field(self, parent_type, node, rows, depth, page, spreads):
+        name = node.name.value
+        fields = getattr(parent_type, 'fields', None)
+        if name.startswith('__') or fields is None or name not in fields:
+            return 0, depth
+        field = fields[name]
+        named_type = get_named_type(field.type)
+
+        field_page = None
+        if 'first' in field.args or 'last' in field.args:
+            # The connection itself is one object; its page size applies to ``edges``
+            field_page = page_size(node, self.variables)
+            if field_page is None:
+                field_page = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        elif is_list_type(get_nullable_type(field.type)):
+            rows *= max(page if page is not None else LIST_SIZE, 0)
+
+        cost = rows * (FIELD_WEIGHTS.get(name, 0) or type_weight(named_type))
+        if node.selection_set is None:
+            return cost, depth + 1
+        child_cost, child_depth = self.selection_set(
+            named_type, node.selection_set, rows, depth + 1, field_page, spreads
+        )
+        return cost + child_cost, child_depth
+
+
+def query_cost_validator(operation, variables=None, max_depth=None, max_cost=None, callback=None):
+    """
+    Validation rule rejecting ``operation`` when it is deeper than
+    ``max_depth`` or costlier than ``max_cost``; ``callback(cost, depth)``
+    receives the estimate either way. Built per request, like graphene's
+    ``depth_limit_validator``.
+    """
+
+    class QueryCostValidator(ValidationRule):
+        def enter_operation_definition(self, node, *_args):
+            if node is not operation:
+                return self.SKIP
+            fragments = {
+                definition.name.value: definition
+                for definition in self.context.document.definitions
+                if definition.kind == 'fragment_definition'
+            }
+            cost, depth = QueryCost(self.context.schema, fragments, variables).measure(node)
+            if callback is not None:
+                callback(cost, depth)
+            if max_depth is not None and depth > max_depth:
+                self.report_error(GraphQLError(
+                    f"Query depth {depth} exceeds the maximum of {max_depth}.",
+                    node, extensions={'code': 'QUERY_TOO_DEEP'}
+                ))
+            if max_cost is not None and cost > max_cost:
+                self.report_error(GraphQLError(
+                    f"Query cost {cost} exceeds the maximum of {max_cost}. "
+                    "Request fewer rows with 'first'/'last' or select fewer nested lists.",
+                    node, extensions={'code': 'QUERY_TOO_COSTLY'}
+                ))
+            return self.SKIP
+
+    return QueryCostValidator
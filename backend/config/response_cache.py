@@ -0,0 +1,128 @@
+"""
+Tenant-scoped cache of GraphQL query results.
+
+A query result is cached under a key built from the operation's hash, its
+name and variables, and the current *version* of every organization it
+reads. Each organization has a version counter in the cache backend, and
+every mutation bumps the counter of the organization it wrote to, so all
+of that organization's cached results become unreachable in one O(1) write
+and simply expire. Because the organization slug is part of the key, a
+result cached for one tenant can never be served to another.
+
+Queries that are not scoped to one organization (``allOrganizations``,
+``organization(id: ...)``) read the ``*`` version, which every mutation
+bumps as well.
+
+Disabled unless ``GRAPHQL_RESPONSE_CACHE_TIMEOUT`` is set.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from graphql import FieldNode, StringValueNode, VariableNode
+
+from . import routers
+
+
+VERSION_KEY_PREFIX = 'graphql:org-version:'
+RESPONSE_KEY_PREFIX = 'graphql:response:'
+ALL_ORGANIZATIONS = '*'
+
+# Root fields that need no tenant at all
+UNSCOPED_FIELDS = {'hello', '__typename'}
+
+# Root field -> argument naming the organization it reads
+SCOPE_ARGUMENTS = {
+    'organization': 'slug',
+}
+DEFAULT_SCOPE_ARGUMENT = 'organizationSlug'
+
+
+def get_timeout():
+    return getattr(settings, 'GRAPHQL_RESPONSE_CACHE_TIMEOUT', None)
+
+
+def get_cache():
+    return caches[getattr(settings, 'GRAPHQL_RESPONSE_CACHE_ALIAS', 'default')]
+
+
+# ==================== VERSIONS ====================
+
+def get_versions(scopes):
+    cache = get_cache()
+    keys = [VERSION_KEY_PREFIX + scope for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from the clock, so a counter that was evicted never
+            # comes back at a value old results were cached under
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return {scope: versions[VERSION_KEY_PREFIX + scope] for scope in scopes}
+
+
+def bump_versions(*scopes):
+    cache = get_cache()
+    for scope in scopes:
+        key = VERSION_KEY_PREFIX + scope
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def invalidate_organization(*slugs):
+    """
+    Invalidate cached results for ``slugs`` once the current transaction
+    commits, and read them from the primary for a while (``config.routers``).
+    """
+    scopes = {slug for slug in slugs if slug} | {ALL_ORGANIZATIONS}
+
+    def committed():
+        bump_versions(*scopes)
+        routers.pin_primary(*scopes)
+
+    transaction.on_commit(committed)
+
+
+# ==================== KEYS ====================
+
+def operation_scopes(operation_ast, variables):
+    """
+    Organizations the operation's root fields read, or None if that can't
+    be determined (the result is then not cached).
+    """
+    scopes = set()
+    for selection in operation_ast.selection_set.selections:
+        if not isinstance(selection, FieldNode):
+            return None
+        name = selection.name.value
+        if name in UNSCOPED_FIELDS:
+            continue
+        arguments = {argument.name.value: argument.value for argument in selection.arguments}
+        value = arguments.get(SCOPE_ARGUMENTS.get(name, DEFAULT_SCOPE_ARGUMENT))
+        if isinstance(value, StringValueNode):
+            scopes.add(value.value)
+        elif isinstance(value, VariableNode):
+            slug = (variables or {}).get(value.name.value)
+            if not isinstance(slug, str):
+                return None
+            scopes.add(slug)
+        elif value is None:
+            scopes.add(ALL_ORGANIZATIONS)
+        else:
+            return None
+    return scopes
+
+
+def response_key(query_hash, operation_name, variables, scopes):
+    versions = get_versions(sorted(scopes))
+    payload = json.dumps(
+        [query_hash, operation_name, variables or {}, versions],
+        sort_keys=True,
+        default=str,
+    )
+    return RESPONSE_KEY_PREFIX + hashlib.sha256(payload.encode()).hexdigest()
@@ -0,0 +1,145 @@
+"""
+Read replicas for GraphQL queries.
+
+``PrimaryReplicaRouter`` sends every write, and every read outside a GraphQL
+query, to ``default`` (the primary). ``GraphQLView`` runs a query operation
+on a replica, chosen once per operation with ``replica_for()`` and made
+current with ``reading_from()``, unless:
+
+- one of the organizations it reads wrote in the last
+  ``REPLICA_PIN_SECONDS``. ``response_cache.invalidate_organization()``
+  calls ``pin_primary()`` when each write commits, so ``updateTask``
+  followed by ``tasksByProject`` reads its own write. The pin is kept in
+  the shared cache, so it holds for every worker;
+- the organizations it reads can't be determined from the operation;
+- no replica is healthy. Each replica is checked at most every
+  ``REPLICA_HEALTH_CHECK_INTERVAL`` seconds, and one that can't be reached or
+  lags more than ``REPLICA_MAX_LAG`` seconds is left out until its next check.
+  A query that fails to reach its replica is marked unhealthy and retried on
+  the primary.
+
+Replicas are configured with ``DB_REPLICAS`` (see settings); without any,
+everything runs on the primary.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, OperationalError, connections
+from django.utils.connection import ConnectionDoesNotExist
+
+
+logger = logging.getLogger(__name__)
+
+PIN_KEY_PREFIX = 'db:primary-pin:'
+
+# Replica the current operation reads from, or None for the primary
+current_replica = ContextVar('current_replica', default=None)
+
+# alias -> (checked at, healthy), shared by the threads of a process
+_health = {}
+_health_lock = threading.Lock()
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return current_replica.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+@contextmanager
+def reading_from(replica):
+    token = current_replica.set(replica)
+    try:
+        yield
+    finally:
+        current_replica.reset(token)
+
+
+# ==================== PINNING ====================
+
+def pin_primary(*scopes):
+    """Read ``scopes`` from the primary for the next ``REPLICA_PIN_SECONDS``."""
+    if settings.DATABASE_REPLICAS and settings.REPLICA_PIN_SECONDS:
+        cache.set_many({PIN_KEY_PREFIX + scope: 1 for scope in scopes}, settings.REPLICA_PIN_SECONDS)
+
+
+def replica_for(scopes):
+    """The replica to run a query reading ``scopes`` on, or None to use the primary."""
+    if not settings.DATABASE_REPLICAS or scopes is None:
+        return None
+    if scopes and cache.get_many([PIN_KEY_PREFIX + scope for scope in scopes]):
+        return None
+    return healthy_replica()
+
+
+# ==================== HEALTH ====================
+
+def healthy_replica():
+    replicas = [alias for alias in settings.DATABASE_REPLICAS if is_healthy(alias)]
+    return random.choice(replicas) if replicas else None
+
+
+def is_healthy(alias):
+    now = time.monotonic()
+    with _health_lock:
+        checked_at, healthy = _health.get(alias, (None, False))
+        if checked_at is not None and now - checked_at < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+            return healthy
+        # Other threads keep the last answer while this one checks
+        _health[alias] = (now, healthy)
+    healthy = check_replica(alias)
+    with _health_lock:
+        _health[alias] = (now, healthy)
+    return healthy
+
+
+def mark_unhealthy(alias):
+    with _health_lock:
+        _health[alias] = (time.monotonic(), False)
+    logger.warning("Replica %s failed; reading from the primary until its next health check", alias)
+
+
+def check_replica(alias):
+    try:
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            if connection.vendor != 'postgresql':
+                cursor.execute("SELECT 1")
+                return True
+            # Seconds behind the primary: 0 once everything received is
+            # replayed (and on a server that is not a standby)
+            cursor.execute(
+                "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+            )
+            lag = cursor.fetchone()[0]
+    except (ConnectionDoesNotExist, DatabaseError) as exc:
+        logger.warning("Replica %s is unavailable: %s", alias, exc)
+        return False
+    max_lag = settings.REPLICA_MAX_LAG
+    if max_lag is not None and lag > max_lag:
+        logger.warning("Replica %s is %.1fs behind the primary", alias, lag)
+        return False
+    return True
+
+
+def failed_on_replica(result):
+    """Whether an execution result has errors from losing the database connection."""
+    return any(
+        isinstance(getattr(error, 'original_error', None), OperationalError) for error in result.errors or []
+    )
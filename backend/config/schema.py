@@ -1,15 +1,29 @@
+from collections import Counter, defaultdict
+
 import graphene
+from asgiref.sync import sync_to_async
 from graphene_django import DjangoObjectType
+from django.conf import settings
 from django.db.models import Count, Q, Case, When, IntegerField, F
 from django.db.models.functions import Coalesce
 from django.utils import timezone
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from graphql import GraphQLError
 
-from organizations.models import Organization
+from organizations.models import DeletionJob, Organization
 from projects.models import Project
-from tasks.models import Task
+from tasks.models import Task, ProjectTaskStats
 from task_comments.models import TaskComment
 
+from .broker import comment_channel, get_broker, publish_on_commit, task_channel
+from .deletion import request_deletion
+from .loaders import AsyncRequestLoaders, get_loaders, then
+from .lookahead import connection_node_fields, optimize, selected_fields
+from .pagination import paginate
+from .response_cache import invalidate_organization
+from .tenants import forget_organization, organization_id
+from .writes import delete_returning, update_returning
+
 
 # ==================== CUSTOM ERROR TYPES ====================
 
@@ -29,6 +43,7 @@ class ProjectStatsType(graphene.ObjectType):
     todo_tasks = graphene.Int()
     overdue_tasks = graphene.Int()
     completion_percentage = graphene.Float()
+    total_comments = graphene.Int()
 
 
 class OrganizationStatsType(graphene.ObjectType):
@@ -40,6 +55,32 @@ class OrganizationStatsType(graphene.ObjectType):
     completed_tasks = graphene.Int()
 
 
+def project_stats_type(stats):
+    total = stats.get('total_tasks') or 0
+    completed = stats.get('completed_tasks') or 0
+    completion_percentage = (completed / total * 100) if total > 0 else 0.0
+    
+    return ProjectStatsType(
+        total_tasks=total,
+        completed_tasks=completed,
+        in_progress_tasks=stats.get('in_progress_tasks') or 0,
+        todo_tasks=stats.get('todo_tasks') or 0,
+        overdue_tasks=stats.get('overdue_tasks') or 0,
+        completion_percentage=round(completion_percentage, 2),
+        total_comments=stats.get('total_comments') or 0
+    )
+
+
+def organization_stats_type(stats):
+    return OrganizationStatsType(
+        total_projects=stats.get('total_projects') or 0,
+        active_projects=stats.get('active_projects') or 0,
+        completed_projects=stats.get('completed_projects') or 0,
+        total_tasks=stats.get('total_tasks') or 0,
+        completed_tasks=stats.get('completed_tasks') or 0
+    )
+
+
 # ==================== GRAPHQL TYPES ====================
 
 class TaskCommentType(DjangoObjectType):
@@ -48,6 +89,9 @@ class TaskCommentType(DjangoObjectType):
         model = TaskComment
         fields = ("id", "task", "content", "author_email", "created_at")
 
+    def resolve_task(self, info):
+        return get_loaders(info).related(self, 'task')
+
 
 class TaskType(DjangoObjectType):
     """GraphQL type for Task model."""
@@ -57,19 +101,26 @@ class TaskType(DjangoObjectType):
     
     class Meta:
         model = Task
-        fields = ("id", "project", "title", "description", "status", "assignee_email", "due_date", "created_at")
+        fields = (
+            "id", "project", "title", "description", "status", "assignee_email", "due_date", "created_at", "version"
+        )
 
     def resolve_comments(self, info):
         # Use prefetched data if available
         if hasattr(self, '_prefetched_objects_cache') and 'comments' in self._prefetched_objects_cache:
             return self.comments.all()
-        return self.comments.select_related('task').all()
+        return get_loaders(info).comments_by_task.load(self.id)
 
     def resolve_comment_count(self, info):
         # Use annotated value if available
         if hasattr(self, 'comment_count_annotated'):
             return self.comment_count_annotated
-        return self.comments.count()
+        if hasattr(self, '_prefetched_objects_cache') and 'comments' in self._prefetched_objects_cache:
+            return len(self._prefetched_objects_cache['comments'])
+        return get_loaders(info).comment_count_by_task.load(self.id)
+
+    def resolve_project(self, info):
+        return get_loaders(info).related(self, 'project')
 
     def resolve_is_overdue(self, info):
         if self.due_date and self.status != 'DONE':
@@ -85,42 +136,27 @@ class ProjectType(DjangoObjectType):
     
     class Meta:
         model = Project
-        fields = ("id", "organization", "name", "description", "status", "due_date", "created_at")
+        fields = ("id", "organization", "name", "description", "status", "due_date", "created_at", "version")
 
     def resolve_tasks(self, info):
         # Use prefetched data if available
         if hasattr(self, '_prefetched_objects_cache') and 'tasks' in self._prefetched_objects_cache:
             return self.tasks.all()
-        return self.tasks.select_related('project').prefetch_related('comments').all()
+        return get_loaders(info).tasks_by_project.load(self.id)
 
     def resolve_task_count(self, info):
         if hasattr(self, 'task_count_annotated'):
             return self.task_count_annotated
-        return self.tasks.count()
+        if hasattr(self, '_prefetched_objects_cache') and 'tasks' in self._prefetched_objects_cache:
+            return len(self._prefetched_objects_cache['tasks'])
+        return get_loaders(info).task_count_by_project.load(self.id)
+
+    def resolve_organization(self, info):
+        return get_loaders(info).related(self, 'organization')
 
     def resolve_stats(self, info):
-        """Compute project statistics using ORM annotations."""
-        now = timezone.now()
-        stats = Task.objects.filter(project=self).aggregate(
-            total_tasks=Count('id'),
-            completed_tasks=Count('id', filter=Q(status='DONE')),
-            in_progress_tasks=Count('id', filter=Q(status='IN_PROGRESS')),
-            todo_tasks=Count('id', filter=Q(status='TODO')),
-            overdue_tasks=Count('id', filter=Q(due_date__lt=now) & ~Q(status='DONE'))
-        )
-        
-        total = stats['total_tasks'] or 0
-        completed = stats['completed_tasks'] or 0
-        completion_percentage = (completed / total * 100) if total > 0 else 0.0
-        
-        return ProjectStatsType(
-            total_tasks=total,
-            completed_tasks=completed,
-            in_progress_tasks=stats['in_progress_tasks'] or 0,
-            todo_tasks=stats['todo_tasks'] or 0,
-            overdue_tasks=stats['overdue_tasks'] or 0,
-            completion_percentage=round(completion_percentage, 2)
-        )
+        """Project statistics from the maintained counters, batched across the operation."""
+        return then(get_loaders(info).project_stats.load(self.id), project_stats_type)
 
 
 class OrganizationType(DjangoObjectType):
@@ -136,34 +172,72 @@ class OrganizationType(DjangoObjectType):
     def resolve_projects(self, info):
         if hasattr(self, '_prefetched_objects_cache') and 'projects' in self._prefetched_objects_cache:
             return self.projects.all()
-        return self.projects.prefetch_related('tasks', 'tasks__comments').all()
+        return get_loaders(info).projects_by_organization.load(self.id)
 
     def resolve_project_count(self, info):
         if hasattr(self, 'project_count_annotated'):
             return self.project_count_annotated
-        return self.projects.count()
+        if hasattr(self, '_prefetched_objects_cache') and 'projects' in self._prefetched_objects_cache:
+            return len(self._prefetched_objects_cache['projects'])
+        return get_loaders(info).project_count_by_organization.load(self.id)
 
     def resolve_stats(self, info):
-        """Compute organization statistics using ORM annotations."""
-        project_stats = Project.objects.filter(organization=self).aggregate(
-            total_projects=Count('id'),
-            active_projects=Count('id', filter=Q(status='ACTIVE')),
-            completed_projects=Count('id', filter=Q(status='COMPLETED'))
-        )
-        
-        task_stats = Task.objects.filter(project__organization=self).aggregate(
-            total_tasks=Count('id'),
-            completed_tasks=Count('id', filter=Q(status='DONE'))
-        )
-        
-        return OrganizationStatsType(
-            total_projects=project_stats['total_projects'] or 0,
-            active_projects=project_stats['active_projects'] or 0,
-            completed_projects=project_stats['completed_projects'] or 0,
-            total_tasks=task_stats['total_tasks'] or 0,
-            completed_tasks=task_stats['completed_tasks'] or 0
+        """Organization statistics, batched across every organization in the operation."""
+        return then(get_loaders(info).organization_stats.load(self.id), organization_stats_type)
+
+
+class DeletionJobType(DjangoObjectType):
+    """Progress of a background deletion (deleteOrganization / deleteProject with background: true)."""
+    progress = graphene.Float(description="Share of the tasks and comments deleted so far, 0 to 100")
+
+    class Meta:
+        model = DeletionJob
+        fields = (
+            "id", "organization_slug", "project_id", "name", "status", "total_tasks", "total_comments",
+            "deleted_tasks", "deleted_comments", "deleted_projects", "requested_at", "finished_at"
         )
 
+    def resolve_progress(self, info):
+        if self.status == DeletionJob.Status.DONE:
+            return 100.0
+        total = self.total_tasks + self.total_comments
+        if not total:
+            return 0.0
+        return round(min(self.deleted_tasks + self.deleted_comments, total) * 100 / total, 1)
+
+
+# ==================== CONNECTIONS ====================
+
+class CountableConnection(graphene.relay.Connection):
+    """Relay connection that can report the size of the unpaginated result."""
+    total_count = graphene.Int()
+
+    class Meta:
+        abstract = True
+
+    def resolve_total_count(self, info):
+        return get_loaders(info).count(self.iterable)
+
+
+class OrganizationConnection(CountableConnection):
+    class Meta:
+        node = OrganizationType
+
+
+class ProjectConnection(CountableConnection):
+    class Meta:
+        node = ProjectType
+
+
+class TaskConnection(CountableConnection):
+    class Meta:
+        node = TaskType
+
+
+class TaskCommentConnection(CountableConnection):
+    class Meta:
+        node = TaskCommentType
+
 
 # ==================== QUERIES ====================
 
@@ -172,8 +246,8 @@ class Query(graphene.ObjectType):
     hello = graphene.String(default_value="GraphQL API is running")
     
     # Organization queries
-    all_organizations = graphene.List(
-        OrganizationType,
+    all_organizations = graphene.relay.ConnectionField(
+        OrganizationConnection,
         description="List all organizations with optimized prefetching"
     )
     organization = graphene.Field(
@@ -184,8 +258,8 @@ class Query(graphene.ObjectType):
     )
     
     # Project queries (multi-tenant)
-    projects_by_organization = graphene.List(
-        ProjectType,
+    projects_by_organization = graphene.relay.ConnectionField(
+        ProjectConnection,
         organization_slug=graphene.String(required=True),
         status=graphene.String(),
         description="List projects by organization with optional status filter"
@@ -204,8 +278,8 @@ class Query(graphene.ObjectType):
     )
     
     # Task queries (multi-tenant)
-    tasks_by_project = graphene.List(
-        TaskType, 
+    tasks_by_project = graphene.relay.ConnectionField(
+        TaskConnection,
         project_id=graphene.Int(required=True),
         organization_slug=graphene.String(required=True),
         status=graphene.String(),
@@ -217,169 +291,173 @@ class Query(graphene.ObjectType):
         organization_slug=graphene.String(required=True),
         description="Get task by ID within organization context"
     )
-    overdue_tasks = graphene.List(
-        TaskType,
+    overdue_tasks = graphene.relay.ConnectionField(
+        TaskConnection,
         organization_slug=graphene.String(required=True),
         description="List all overdue tasks in organization"
     )
     
     # Comment queries (multi-tenant)
-    comments_by_task = graphene.List(
-        TaskCommentType, 
+    comments_by_task = graphene.relay.ConnectionField(
+        TaskCommentConnection,
         task_id=graphene.Int(required=True),
         organization_slug=graphene.String(required=True),
         description="List comments for a task within organization"
     )
 
+    # Background deletions (multi-tenant)
+    deletion_job = graphene.Field(
+        DeletionJobType,
+        id=graphene.Int(required=True),
+        organization_slug=graphene.String(required=True),
+        description="Progress of a background organization or project deletion"
+    )
+
     # ==================== RESOLVERS ====================
 
-    def resolve_all_organizations(self, info):
-        """Optimized query with prefetching for nested data."""
-        return Organization.objects.prefetch_related(
-            'projects',
-            'projects__tasks',
-            'projects__tasks__comments'
-        ).annotate(
-            project_count_annotated=Count('projects')
-        ).all()
+    def resolve_all_organizations(self, info, **pagination):
+        """Paginated organizations, fetching only the nested data that was requested."""
+        queryset = optimize(
+            Organization.objects.all(),
+            connection_node_fields(selected_fields(info)),
+            annotate_counts=False
+        )
+        return paginate(
+            queryset, OrganizationConnection, ('-created_at', '-id'),
+            fetch=get_loaders(info).fetch, **pagination
+        )
 
     def resolve_organization(self, info, id=None, slug=None):
         """Get organization with validation."""
-        queryset = Organization.objects.prefetch_related(
-            'projects',
-            'projects__tasks'
-        )
+        queryset = optimize(Organization.objects.all(), selected_fields(info))
         if id:
-            return queryset.filter(id=id).first()
+            return get_loaders(info).fetch_one(queryset.filter(id=id))
         if slug:
-            return queryset.filter(slug=slug).first()
+            return get_loaders(info).fetch_one(queryset.filter(slug=slug))
         return None
 
-    def resolve_projects_by_organization(self, info, organization_slug, status=None):
+    def resolve_projects_by_organization(self, info, organization_slug, status=None, **pagination):
         """List projects with multi-tenant isolation and optional filtering."""
-        queryset = Project.objects.filter(
-            organization__slug=organization_slug
-        ).select_related(
-            'organization'
-        ).prefetch_related(
-            'tasks'
-        ).annotate(
-            task_count_annotated=Count('tasks')
+        queryset = optimize(
+            in_organization(Project.objects.all(), organization_slug),
+            connection_node_fields(selected_fields(info)),
+            annotate_counts=False
         )
         
         if status:
             queryset = queryset.filter(status=status.upper())
         
-        return queryset.order_by('-created_at')
+        return paginate(
+            queryset, ProjectConnection, ('-created_at', '-id'),
+            fetch=get_loaders(info).fetch, **pagination
+        )
 
     def resolve_project(self, info, id, organization_slug):
         """Get project with multi-tenant validation."""
-        return Project.objects.filter(
-            id=id,
-            organization__slug=organization_slug
-        ).select_related(
-            'organization'
-        ).prefetch_related(
-            'tasks',
-            'tasks__comments'
-        ).first()
+        return get_loaders(info).fetch_one(optimize(
+            in_organization(Project.objects.filter(id=id), organization_slug),
+            selected_fields(info)
+        ))
 
     def resolve_project_with_stats(self, info, id, organization_slug):
         """Get project with task statistics."""
-        return Project.objects.filter(
-            id=id,
-            organization__slug=organization_slug
-        ).select_related(
-            'organization'
-        ).prefetch_related(
-            'tasks'
-        ).first()
-
-    def resolve_tasks_by_project(self, info, project_id, organization_slug, status=None):
+        return get_loaders(info).fetch_one(optimize(
+            in_organization(Project.objects.filter(id=id), organization_slug),
+            selected_fields(info)
+        ))
+
+    def resolve_tasks_by_project(self, info, project_id, organization_slug, status=None, **pagination):
         """List tasks with multi-tenant isolation."""
-        queryset = Task.objects.filter(
-            project_id=project_id,
-            project__organization__slug=organization_slug
-        ).select_related(
-            'project',
-            'project__organization'
-        ).prefetch_related(
-            'comments'
-        ).annotate(
-            comment_count_annotated=Count('comments')
+        queryset = optimize(
+            in_organization(
+                Task.objects.filter(project_id=project_id, project__deletion_requested_at=None),
+                organization_slug, 'project__organization_id'
+            ),
+            connection_node_fields(selected_fields(info)),
+            annotate_counts=False
         )
         
         if status:
             queryset = queryset.filter(status=status.upper())
         
-        return queryset.order_by('-created_at')
+        return paginate(
+            queryset, TaskConnection, ('-created_at', '-id'),
+            fetch=get_loaders(info).fetch, **pagination
+        )
 
     def resolve_task(self, info, id, organization_slug):
         """Get task with multi-tenant validation."""
-        return Task.objects.filter(
-            id=id,
-            project__organization__slug=organization_slug
-        ).select_related(
-            'project',
-            'project__organization'
-        ).prefetch_related(
-            'comments'
-        ).first()
-
-    def resolve_overdue_tasks(self, info, organization_slug):
+        return get_loaders(info).fetch_one(optimize(
+            in_organization(
+                Task.objects.filter(id=id, project__deletion_requested_at=None),
+                organization_slug, 'project__organization_id'
+            ),
+            selected_fields(info)
+        ))
+
+    def resolve_overdue_tasks(self, info, organization_slug, **pagination):
         """List overdue tasks in organization using ORM filtering."""
-        now = timezone.now()
-        return Task.objects.filter(
-            project__organization__slug=organization_slug,
-            due_date__lt=now
-        ).exclude(
-            status='DONE'
-        ).select_related(
-            'project',
-            'project__organization'
-        ).order_by('due_date')
-
-    def resolve_comments_by_task(self, info, task_id, organization_slug):
+        loaders = get_loaders(info)
+        queryset = optimize(
+            in_organization(
+                Task.objects.filter(project__deletion_requested_at=None, due_date__lt=loaders.now),
+                organization_slug, 'project__organization_id'
+            ).exclude(
+                status='DONE'
+            ),
+            connection_node_fields(selected_fields(info)),
+            annotate_counts=False
+        )
+        return paginate(
+            queryset, TaskConnection, ('due_date', 'id'),
+            fetch=loaders.fetch, **pagination
+        )
+
+    def resolve_comments_by_task(self, info, task_id, organization_slug, **pagination):
         """List comments with multi-tenant validation."""
-        return TaskComment.objects.filter(
-            task_id=task_id,
-            task__project__organization__slug=organization_slug
-        ).select_related(
-            'task',
-            'task__project'
-        ).order_by('created_at')
+        queryset = optimize(
+            in_organization(
+                TaskComment.objects.filter(task_id=task_id, task__project__deletion_requested_at=None),
+                organization_slug, 'task__project__organization_id'
+            ),
+            connection_node_fields(selected_fields(info)),
+            annotate_counts=False
+        )
+        return paginate(
+            queryset, TaskCommentConnection, ('created_at', 'id'),
+            fetch=get_loaders(info).fetch, **pagination
+        )
+
+    def resolve_deletion_job(self, info, id, organization_slug):
+        """Deletion job with multi-tenant validation; still readable once the organization is gone."""
+        return get_loaders(info).fetch_one(DeletionJob.objects.filter(id=id, organization_slug=organization_slug))
 
 
 # ==================== VALIDATION HELPERS ====================
 
-def validate_organization(slug):
-    """Validate organization exists and return it."""
-    try:
-        return Organization.objects.get(slug=slug)
-    except Organization.DoesNotExist:
-        return None
+def in_organization(queryset, organization_slug, lookup='organization_id'):
+    """
+    Multi-tenant filter on the organization's id (resolved once per process,
+    see config/tenants.py), which spares the join to organizations; empty if
+    there is no such organization.
+    """
+    organization = organization_id(organization_slug)
+    if organization is None:
+        return queryset.none()
+    return queryset.filter(**{lookup: organization})
 
 
 def validate_project_in_org(project_id, organization_slug):
     """Validate project exists within organization."""
-    try:
-        return Project.objects.select_related('organization').get(
-            id=project_id,
-            organization__slug=organization_slug
-        )
-    except Project.DoesNotExist:
-        return None
+    return in_organization(Project.objects.filter(id=project_id), organization_slug).first()
 
 
 def validate_task_in_org(task_id, organization_slug):
     """Validate task exists within organization."""
-    try:
-        return Task.objects.select_related('project', 'project__organization').get(
-            id=task_id,
-            project__organization__slug=organization_slug
-        )
-    except Task.DoesNotExist:
-        return None
+    return in_organization(
+        Task.objects.select_related('project').filter(id=task_id, project__deletion_requested_at=None),
+        organization_slug, 'project__organization_id'
+    ).first()
 
 
 def validate_status_transition(current_status, new_status, valid_statuses):
@@ -389,6 +467,24 @@ def validate_status_transition(current_status, new_status, valid_statuses):
     return True, None
 
 
+def version_conflict(queryset, label):
+    """Conflict error for an update whose ``expectedVersion`` didn't match, or None if the row is gone."""
+    current = queryset.values_list('version', flat=True).first()
+    if current is None:
+        return None
+    return ErrorType(
+        field="expected_version",
+        message=f"{label} was changed by someone else (now version {current}); reload it and try again"
+    )
+
+
+def delete_project_rows(project_ids):
+    """Delete the comments, tasks and counters of deleted projects."""
+    delete_returning(TaskComment.objects.filter(task__project_id__in=project_ids))
+    delete_returning(Task.objects.filter(project_id__in=project_ids))
+    delete_returning(ProjectTaskStats.objects.filter(project_id__in=project_ids))
+
+
 # ==================== MUTATIONS ====================
 
 # Organization Mutations
@@ -404,28 +500,27 @@ class CreateOrganization(graphene.Mutation):
     errors = graphene.List(ErrorType)
 
     def mutate(self, info, name, slug, contact_email):
-        errors = []
-        
-        # Validate slug uniqueness
-        if Organization.objects.filter(slug=slug).exists():
-            errors.append(ErrorType(field="slug", message="Organization with this slug already exists"))
-            return CreateOrganization(organization=None, success=False, message="Validation failed", errors=errors)
-        
+        # The unique constraint on slug is the check (an organization being
+        # deleted keeps its slug until it is gone)
         try:
-            organization = Organization.objects.create(
-                name=name,
-                slug=slug,
-                contact_email=contact_email
-            )
-            return CreateOrganization(
-                organization=organization, 
-                success=True, 
-                message="Organization created successfully",
-                errors=[]
-            )
-        except IntegrityError as e:
-            errors.append(ErrorType(field="slug", message="Duplicate slug"))
-            return CreateOrganization(organization=None, success=False, message=str(e), errors=errors)
+            with transaction.atomic():
+                organization = Organization.objects.create(
+                    name=name,
+                    slug=slug,
+                    contact_email=contact_email
+                )
+        except IntegrityError:
+            errors = [ErrorType(field="slug", message="Organization with this slug already exists")]
+            return CreateOrganization(organization=None, success=False, message="Validation failed", errors=errors)
+        # Other processes may still map a slug that was freed to its old owner
+        forget_organization(slug)
+        invalidate_organization(slug)
+        return CreateOrganization(
+            organization=organization, 
+            success=True, 
+            message="Organization created successfully",
+            errors=[]
+        )
 
 
 class UpdateOrganization(graphene.Mutation):
@@ -440,28 +535,37 @@ class UpdateOrganization(graphene.Mutation):
     message = graphene.String()
     errors = graphene.List(ErrorType)
 
+    @transaction.atomic
     def mutate(self, info, id, name=None, slug=None, contact_email=None):
-        errors = []
-        
-        try:
-            organization = Organization.objects.get(pk=id)
-        except Organization.DoesNotExist:
-            errors.append(ErrorType(field="id", message="Organization not found"))
-            return UpdateOrganization(organization=None, success=False, message="Organization not found", errors=errors)
-
-        # Validate slug uniqueness if changing
-        if slug and slug != organization.slug:
-            if Organization.objects.filter(slug=slug).exists():
-                errors.append(ErrorType(field="slug", message="Slug already in use"))
-                return UpdateOrganization(organization=None, success=False, message="Validation failed", errors=errors)
-            organization.slug = slug
-
+        changes = {'updated_at': timezone.now()}
         if name is not None:
-            organization.name = name
+            changes['name'] = name
         if contact_email is not None:
-            organization.contact_email = contact_email
+            changes['contact_email'] = contact_email
+
+        previous_slug = None
+        if slug:
+            # Results cached under the old slug must be invalidated too
+            previous_slug = (
+                Organization.objects.select_for_update().filter(pk=id).values_list('slug', flat=True).first()
+            )
+            if previous_slug is not None and slug != previous_slug:
+                changes['slug'] = slug
 
-        organization.save()
+        try:
+            # The unique constraint on slug is the check
+            with transaction.atomic():
+                organization = next(iter(update_returning(Organization.objects.filter(pk=id), **changes)), None)
+        except IntegrityError:
+            errors = [ErrorType(field="slug", message="Slug already in use")]
+            return UpdateOrganization(organization=None, success=False, message="Validation failed", errors=errors)
+        if organization is None:
+            errors = [ErrorType(field="id", message="Organization not found")]
+            return UpdateOrganization(organization=None, success=False, message="Organization not found", errors=errors)
+
+        if 'slug' in changes:
+            forget_organization(previous_slug, organization.slug)
+        invalidate_organization(previous_slug, organization.slug)
         return UpdateOrganization(
             organization=organization, 
             success=True, 
@@ -473,18 +577,38 @@ class UpdateOrganization(graphene.Mutation):
 class DeleteOrganization(graphene.Mutation):
     class Arguments:
         id = graphene.ID(required=True)
+        background = graphene.Boolean(
+            default_value=False,
+            description="Hide the organization now and delete its data in batches (see deletionJob)"
+        )
 
     success = graphene.Boolean()
     message = graphene.String()
+    deletion_job = graphene.Field(DeletionJobType)
+
+    @transaction.atomic
+    def mutate(self, info, id, background=False):
+        if background:
+            try:
+                organization = Organization.objects.get(pk=id)
+            except Organization.DoesNotExist:
+                return DeleteOrganization(success=False, message="Organization not found")
+            job = request_deletion(organization)
+            return DeleteOrganization(
+                success=True, message=f"Organization '{organization.name}' scheduled for deletion", deletion_job=job
+            )
 
-    def mutate(self, info, id):
-        try:
-            organization = Organization.objects.get(pk=id)
-            name = organization.name
-            organization.delete()
-            return DeleteOrganization(success=True, message=f"Organization '{name}' deleted successfully")
-        except Organization.DoesNotExist:
+        deleted = delete_returning(Organization.objects.filter(pk=id), 'name', 'slug')
+        if not deleted:
             return DeleteOrganization(success=False, message="Organization not found")
+        (name, slug), = deleted
+        project_ids = [project_id for project_id, in delete_returning(Project.all_objects.filter(organization_id=id))]
+        if project_ids:
+            delete_project_rows(project_ids)
+        forget_organization(slug)
+        invalidate_organization(slug)
+        return DeleteOrganization(success=True, message=f"Organization '{name}' deleted successfully")
+
 
 
 # Project Mutations (Multi-tenant)
@@ -505,8 +629,8 @@ class CreateProject(graphene.Mutation):
         errors = []
         
         # Validate organization
-        organization = validate_organization(organization_slug)
-        if not organization:
+        organization_pk = organization_id(organization_slug)
+        if organization_pk is None:
             errors.append(ErrorType(field="organization_slug", message="Organization not found"))
             return CreateProject(project=None, success=False, message="Organization not found", errors=errors)
 
@@ -517,13 +641,16 @@ class CreateProject(graphene.Mutation):
             errors.append(ErrorType(field="status", message=error_msg))
             return CreateProject(project=None, success=False, message=error_msg, errors=errors)
 
-        project = Project.objects.create(
-            organization=organization,
-            name=name,
-            description=description,
-            status=status.upper() if status else 'ACTIVE',
-            due_date=due_date
-        )
+        with transaction.atomic():
+            project = Project.objects.create(
+                organization_id=organization_pk,
+                name=name,
+                description=description,
+                status=status.upper() if status else 'ACTIVE',
+                due_date=due_date
+            )
+            ProjectTaskStats.objects.create(project=project)
+        invalidate_organization(organization_slug)
         return CreateProject(
             project=project, 
             success=True, 
@@ -540,38 +667,50 @@ class UpdateProject(graphene.Mutation):
         description = graphene.String()
         status = graphene.String()
         due_date = graphene.Date()
+        expected_version = graphene.Int(description="Only update if the project is still at this version")
 
     project = graphene.Field(ProjectType)
     success = graphene.Boolean()
     message = graphene.String()
     errors = graphene.List(ErrorType)
 
-    def mutate(self, info, id, organization_slug, name=None, description=None, status=None, due_date=None):
+    def mutate(
+        self, info, id, organization_slug, name=None, description=None, status=None, due_date=None,
+        expected_version=None
+    ):
         errors = []
-        
-        # Multi-tenant validation
-        project = validate_project_in_org(id, organization_slug)
-        if not project:
-            errors.append(ErrorType(field="id", message="Project not found in this organization"))
-            return UpdateProject(project=None, success=False, message="Project not found", errors=errors)
+        changes = {'version': F('version') + 1}
 
         # Validate status
         if status:
             valid_statuses = ['ACTIVE', 'COMPLETED', 'ON_HOLD']
-            is_valid, error_msg = validate_status_transition(project.status, status, valid_statuses)
+            is_valid, error_msg = validate_status_transition(None, status, valid_statuses)
             if not is_valid:
                 errors.append(ErrorType(field="status", message=error_msg))
                 return UpdateProject(project=None, success=False, message=error_msg, errors=errors)
-            project.status = status.upper()
+            changes['status'] = status.upper()
 
         if name is not None:
-            project.name = name
+            changes['name'] = name
         if description is not None:
-            project.description = description
+            changes['description'] = description
         if due_date is not None:
-            project.due_date = due_date
-
-        project.save()
+            changes['due_date'] = due_date
+
+        # Multi-tenant validation and compare-and-swap, in the UPDATE itself
+        projects = in_organization(Project.objects.filter(id=id), organization_slug)
+        if expected_version is None:
+            updated = update_returning(projects, **changes)
+        else:
+            updated = update_returning(projects.filter(version=expected_version), **changes)
+            conflict = not updated and version_conflict(projects, "Project")
+            if conflict:
+                return UpdateProject(project=None, success=False, message="Version conflict", errors=[conflict])
+        if not updated:
+            errors.append(ErrorType(field="id", message="Project not found in this organization"))
+            return UpdateProject(project=None, success=False, message="Project not found", errors=errors)
+        project, = updated
+        invalidate_organization(organization_slug)
         return UpdateProject(
             project=project, 
             success=True, 
@@ -584,17 +723,32 @@ class DeleteProject(graphene.Mutation):
     class Arguments:
         id = graphene.ID(required=True)
         organization_slug = graphene.String(required=True)
+        background = graphene.Boolean(
+            default_value=False,
+            description="Hide the project now and delete its tasks in batches (see deletionJob)"
+        )
 
     success = graphene.Boolean()
     message = graphene.String()
+    deletion_job = graphene.Field(DeletionJobType)
+
+    @transaction.atomic
+    def mutate(self, info, id, organization_slug, background=False):
+        if background:
+            project = validate_project_in_org(id, organization_slug)
+            if not project:
+                return DeleteProject(success=False, message="Project not found in this organization")
+            job = request_deletion(project.organization, project)
+            return DeleteProject(
+                success=True, message=f"Project '{project.name}' scheduled for deletion", deletion_job=job
+            )
 
-    def mutate(self, info, id, organization_slug):
-        project = validate_project_in_org(id, organization_slug)
-        if not project:
+        deleted = delete_returning(in_organization(Project.objects.filter(id=id), organization_slug), 'id', 'name')
+        if not deleted:
             return DeleteProject(success=False, message="Project not found in this organization")
-        
-        name = project.name
-        project.delete()
+        (project_id, name), = deleted
+        delete_project_rows([project_id])
+        invalidate_organization(organization_slug)
         return DeleteProject(success=True, message=f"Project '{name}' deleted successfully")
 
 
@@ -630,14 +784,18 @@ class CreateTask(graphene.Mutation):
             errors.append(ErrorType(field="status", message=error_msg))
             return CreateTask(task=None, success=False, message=error_msg, errors=errors)
 
-        task = Task.objects.create(
-            project=project,
-            title=title,
-            description=description,
-            status=status.upper() if status else 'TODO',
-            assignee_email=assignee_email,
-            due_date=due_date
-        )
+        with transaction.atomic():
+            task = Task.objects.create(
+                project=project,
+                title=title,
+                description=description,
+                status=status.upper() if status else 'TODO',
+                assignee_email=assignee_email,
+                due_date=due_date
+            )
+            ProjectTaskStats.apply(project.id, **ProjectTaskStats.status_deltas(task.status, 1))
+        invalidate_organization(organization_slug)
+        publish_task_change('CREATED', task.id, task.project_id)
         return CreateTask(
             task=task, 
             success=True, 
@@ -655,40 +813,78 @@ class UpdateTask(graphene.Mutation):
         status = graphene.String()
         assignee_email = graphene.String()
         due_date = graphene.DateTime()
+        expected_version = graphene.Int(description="Only update if the task is still at this version")
 
     task = graphene.Field(TaskType)
     success = graphene.Boolean()
     message = graphene.String()
     errors = graphene.List(ErrorType)
 
-    def mutate(self, info, id, organization_slug, title=None, description=None, status=None, assignee_email=None, due_date=None):
+    @transaction.atomic
+    def mutate(
+        self, info, id, organization_slug, title=None, description=None, status=None, assignee_email=None,
+        due_date=None, expected_version=None
+    ):
         errors = []
-        
-        # Multi-tenant validation
-        task = validate_task_in_org(id, organization_slug)
-        if not task:
-            errors.append(ErrorType(field="id", message="Task not found in this organization"))
-            return UpdateTask(task=None, success=False, message="Task not found", errors=errors)
+        changes = {'version': F('version') + 1}
 
         # Validate status
         if status:
             valid_statuses = ['TODO', 'IN_PROGRESS', 'DONE']
-            is_valid, error_msg = validate_status_transition(task.status, status, valid_statuses)
+            is_valid, error_msg = validate_status_transition(None, status, valid_statuses)
             if not is_valid:
                 errors.append(ErrorType(field="status", message=error_msg))
                 return UpdateTask(task=None, success=False, message=error_msg, errors=errors)
-            task.status = status.upper()
+            changes['status'] = status.upper()
 
         if title is not None:
-            task.title = title
+            changes['title'] = title
         if description is not None:
-            task.description = description
+            changes['description'] = description
         if assignee_email is not None:
-            task.assignee_email = assignee_email
+            changes['assignee_email'] = assignee_email
         if due_date is not None:
-            task.due_date = due_date
+            changes['due_date'] = due_date
 
-        task.save()
+        # Multi-tenant validation and compare-and-swap, in the UPDATE itself
+        tasks = in_organization(
+            Task.objects.filter(id=id, project__deletion_requested_at=None),
+            organization_slug, 'project__organization_id'
+        )
+        expected = tasks if expected_version is None else tasks.filter(version=expected_version)
+        previous_status = None
+        updated = []
+        if 'status' not in changes:
+            updated = update_returning(expected, **changes)
+        else:
+            # The counters need the status being replaced. Instead of locking the
+            # row, update it only while it still has the version read with that
+            # status; if another update got there first, read it again.
+            while not updated:
+                current = expected.values_list('status', 'version').first()
+                if current is None:
+                    break
+                previous_status, version = current
+                updated = update_returning(tasks.filter(version=version), **changes)
+        if not updated and expected_version is not None:
+            conflict = version_conflict(tasks, "Task")
+            if conflict:
+                return UpdateTask(task=None, success=False, message="Version conflict", errors=[conflict])
+        if not updated:
+            errors.append(ErrorType(field="id", message="Task not found in this organization"))
+            return UpdateTask(task=None, success=False, message="Task not found", errors=errors)
+        task, = updated
+
+        if previous_status is not None and task.status != previous_status:
+            ProjectTaskStats.apply(
+                task.project_id,
+                **{
+                    ProjectTaskStats.STATUS_FIELDS[previous_status]: -1,
+                    ProjectTaskStats.STATUS_FIELDS[task.status]: 1,
+                }
+            )
+        invalidate_organization(organization_slug)
+        publish_task_change('UPDATED', task.id, task.project_id)
         return UpdateTask(
             task=task, 
             success=True, 
@@ -705,13 +901,27 @@ class DeleteTask(graphene.Mutation):
     success = graphene.Boolean()
     message = graphene.String()
 
+    @transaction.atomic
     def mutate(self, info, id, organization_slug):
-        task = validate_task_in_org(id, organization_slug)
-        if not task:
+        deleted = delete_returning(
+            in_organization(
+                Task.objects.filter(id=id, project__deletion_requested_at=None),
+                organization_slug, 'project__organization_id'
+            ),
+            'id', 'title', 'status', 'project'
+        )
+        if not deleted:
             return DeleteTask(success=False, message="Task not found in this organization")
-        
-        title = task.title
-        task.delete()
+
+        (task_id, title, status, project_id), = deleted
+        comment_count = len(delete_returning(TaskComment.objects.filter(task_id=task_id)))
+        ProjectTaskStats.apply(
+            project_id,
+            total_comments=-comment_count,
+            **ProjectTaskStats.status_deltas(status, -1)
+        )
+        invalidate_organization(organization_slug)
+        publish_task_change('DELETED', task_id, project_id)
         return DeleteTask(success=True, message=f"Task '{title}' deleted successfully")
 
 
@@ -742,11 +952,15 @@ class AddComment(graphene.Mutation):
             errors.append(ErrorType(field="content", message="Comment content cannot be empty"))
             return AddComment(comment=None, success=False, message="Validation failed", errors=errors)
 
-        comment = TaskComment.objects.create(
-            task=task,
-            content=content.strip(),
-            author_email=author_email
-        )
+        with transaction.atomic():
+            comment = TaskComment.objects.create(
+                task=task,
+                content=content.strip(),
+                author_email=author_email
+            )
+            ProjectTaskStats.apply(task.project_id, total_comments=1)
+        invalidate_organization(organization_slug)
+        publish_comment_added(comment)
         return AddComment(
             comment=comment, 
             success=True, 
@@ -755,6 +969,257 @@ class AddComment(graphene.Mutation):
         )
 
 
+
+# Bulk Mutations (Multi-tenant)
+#
+# Each item is validated first and every problem is reported as an ErrorType
+# whose field names the item, e.g. "tasks[3].status". Nothing is written
+# unless every item is valid; otherwise all rows are written with
+# bulk_create/bulk_update in one transaction.
+
+def bulk_size_error(field, items):
+    """Reject empty and oversized batches."""
+    max_items = getattr(settings, 'BULK_MUTATION_MAX_ITEMS', 1000)
+    if not items:
+        return ErrorType(field=field, message="At least one item is required")
+    if len(items) > max_items:
+        return ErrorType(field=field, message=f"At most {max_items} items can be sent at once")
+    return None
+
+
+def apply_counter_deltas(deltas):
+    """Apply ``{project_id: Counter(field=delta)}`` to the project counters."""
+    for project_id, counters in deltas.items():
+        ProjectTaskStats.apply(project_id, **counters)
+
+
+class TaskInput(graphene.InputObjectType):
+    project_id = graphene.Int(required=True)
+    title = graphene.String(required=True)
+    description = graphene.String()
+    status = graphene.String()
+    assignee_email = graphene.String()
+    due_date = graphene.DateTime()
+
+
+class TaskUpdateInput(graphene.InputObjectType):
+    id = graphene.ID(required=True)
+    title = graphene.String()
+    description = graphene.String()
+    status = graphene.String()
+    assignee_email = graphene.String()
+    due_date = graphene.DateTime()
+    expected_version = graphene.Int()
+
+
+class CommentInput(graphene.InputObjectType):
+    task_id = graphene.Int(required=True)
+    content = graphene.String(required=True)
+    author_email = graphene.String(required=True)
+
+
+class BulkCreateTasks(graphene.Mutation):
+    class Arguments:
+        organization_slug = graphene.String(required=True)
+        tasks = graphene.List(graphene.NonNull(TaskInput), required=True)
+
+    tasks = graphene.List(TaskType)
+    success = graphene.Boolean()
+    message = graphene.String()
+    errors = graphene.List(ErrorType)
+
+    def mutate(self, info, organization_slug, tasks):
+        size_error = bulk_size_error("tasks", tasks)
+        if size_error:
+            return BulkCreateTasks(tasks=[], success=False, message=size_error.message, errors=[size_error])
+
+        # Multi-tenant validation, once per project
+        projects = {
+            project_id: validate_project_in_org(project_id, organization_slug)
+            for project_id in {item.project_id for item in tasks}
+        }
+
+        errors = []
+        valid_statuses = ['TODO', 'IN_PROGRESS', 'DONE']
+        for index, item in enumerate(tasks):
+            if not projects[item.project_id]:
+                errors.append(ErrorType(field=f"tasks[{index}].project_id", message="Project not found in this organization"))
+            is_valid, error_msg = validate_status_transition(None, item.status, valid_statuses)
+            if not is_valid:
+                errors.append(ErrorType(field=f"tasks[{index}].status", message=error_msg))
+        if errors:
+            return BulkCreateTasks(tasks=[], success=False, message="Validation failed", errors=errors)
+
+        new_tasks = [
+            Task(
+                project=projects[item.project_id],
+                title=item.title,
+                description=item.description or "",
+                status=item.status.upper() if item.status else 'TODO',
+                assignee_email=item.assignee_email or "",
+                due_date=item.due_date
+            )
+            for item in tasks
+        ]
+        deltas = defaultdict(Counter)
+        for task in new_tasks:
+            deltas[task.project_id].update(ProjectTaskStats.status_deltas(task.status, 1))
+
+        with transaction.atomic():
+            created = Task.objects.bulk_create(new_tasks)
+            apply_counter_deltas(deltas)
+        invalidate_organization(organization_slug)
+        for task in created:
+            publish_task_change('CREATED', task.id, task.project_id)
+        return BulkCreateTasks(
+            tasks=created,
+            success=True,
+            message=f"{len(created)} tasks created successfully",
+            errors=[]
+        )
+
+
+class BulkUpdateTasks(graphene.Mutation):
+    class Arguments:
+        organization_slug = graphene.String(required=True)
+        tasks = graphene.List(graphene.NonNull(TaskUpdateInput), required=True)
+
+    tasks = graphene.List(TaskType)
+    success = graphene.Boolean()
+    message = graphene.String()
+    errors = graphene.List(ErrorType)
+
+    @transaction.atomic
+    def mutate(self, info, organization_slug, tasks):
+        size_error = bulk_size_error("tasks", tasks)
+        if size_error:
+            return BulkUpdateTasks(tasks=[], success=False, message=size_error.message, errors=[size_error])
+
+        ids = []
+        for item in tasks:
+            try:
+                ids.append(int(item.id))
+            except ValueError:
+                ids.append(None)
+
+        # Multi-tenant validation in one query (rows are locked so the counter deltas stay exact)
+        existing = in_organization(
+            Task.objects.select_for_update(of=('self',)).filter(project__deletion_requested_at=None),
+            organization_slug, 'project__organization_id'
+        ).in_bulk([task_id for task_id in ids if task_id is not None])
+
+        errors = []
+        seen = set()
+        valid_statuses = ['TODO', 'IN_PROGRESS', 'DONE']
+        for index, (task_id, item) in enumerate(zip(ids, tasks)):
+            if task_id is None:
+                errors.append(ErrorType(field=f"tasks[{index}].id", message="Invalid task ID"))
+            elif task_id in seen:
+                errors.append(ErrorType(field=f"tasks[{index}].id", message="Task appears more than once"))
+            elif task_id not in existing:
+                errors.append(ErrorType(field=f"tasks[{index}].id", message="Task not found in this organization"))
+            elif item.expected_version is not None and existing[task_id].version != item.expected_version:
+                errors.append(ErrorType(
+                    field=f"tasks[{index}].expected_version",
+                    message=f"Task was changed by someone else (now version {existing[task_id].version})"
+                ))
+            seen.add(task_id)
+            is_valid, error_msg = validate_status_transition(None, item.status, valid_statuses)
+            if not is_valid:
+                errors.append(ErrorType(field=f"tasks[{index}].status", message=error_msg))
+        if errors:
+            return BulkUpdateTasks(tasks=[], success=False, message="Validation failed", errors=errors)
+
+        updated = []
+        fields = {'version'}
+        deltas = defaultdict(Counter)
+        for task_id, item in zip(ids, tasks):
+            task = existing[task_id]
+            task.version += 1
+            if item.status:
+                new_status = item.status.upper()
+                if new_status != task.status:
+                    deltas[task.project_id].update({
+                        ProjectTaskStats.STATUS_FIELDS[task.status]: -1,
+                        ProjectTaskStats.STATUS_FIELDS[new_status]: 1,
+                    })
+                task.status = new_status
+                fields.add('status')
+            for field in ('title', 'description', 'assignee_email', 'due_date'):
+                value = getattr(item, field)
+                if value is not None:
+                    setattr(task, field, value)
+                    fields.add(field)
+            updated.append(task)
+
+        Task.objects.bulk_update(updated, sorted(fields))
+        apply_counter_deltas(deltas)
+        invalidate_organization(organization_slug)
+        for task in updated:
+            publish_task_change('UPDATED', task.id, task.project_id)
+        return BulkUpdateTasks(
+            tasks=updated,
+            success=True,
+            message=f"{len(updated)} tasks updated successfully",
+            errors=[]
+        )
+
+
+class BulkAddComments(graphene.Mutation):
+    class Arguments:
+        organization_slug = graphene.String(required=True)
+        comments = graphene.List(graphene.NonNull(CommentInput), required=True)
+
+    comments = graphene.List(TaskCommentType)
+    success = graphene.Boolean()
+    message = graphene.String()
+    errors = graphene.List(ErrorType)
+
+    def mutate(self, info, organization_slug, comments):
+        size_error = bulk_size_error("comments", comments)
+        if size_error:
+            return BulkAddComments(comments=[], success=False, message=size_error.message, errors=[size_error])
+
+        # Multi-tenant validation in one query
+        tasks = in_organization(
+            Task.objects.filter(project__deletion_requested_at=None),
+            organization_slug, 'project__organization_id'
+        ).in_bulk({item.task_id for item in comments})
+
+        errors = []
+        for index, item in enumerate(comments):
+            if item.task_id not in tasks:
+                errors.append(ErrorType(field=f"comments[{index}].task_id", message="Task not found in this organization"))
+            if not item.content.strip():
+                errors.append(ErrorType(field=f"comments[{index}].content", message="Comment content cannot be empty"))
+        if errors:
+            return BulkAddComments(comments=[], success=False, message="Validation failed", errors=errors)
+
+        new_comments = [
+            TaskComment(
+                task=tasks[item.task_id],
+                content=item.content.strip(),
+                author_email=item.author_email
+            )
+            for item in comments
+        ]
+        deltas = defaultdict(Counter)
+        for comment in new_comments:
+            deltas[comment.task.project_id]['total_comments'] += 1
+
+        with transaction.atomic():
+            created = TaskComment.objects.bulk_create(new_comments)
+            apply_counter_deltas(deltas)
+        invalidate_organization(organization_slug)
+        for comment in created:
+            publish_comment_added(comment)
+        return BulkAddComments(
+            comments=created,
+            success=True,
+            message=f"{len(created)} comments added successfully",
+            errors=[]
+        )
+
 class Mutation(graphene.ObjectType):
     # Organization mutations
     create_organization = CreateOrganization.Field()
@@ -774,6 +1239,79 @@ class Mutation(graphene.ObjectType):
     # Comment mutations (multi-tenant)
     add_comment = AddComment.Field()
 
+    # Bulk mutations (multi-tenant)
+    bulk_create_tasks = BulkCreateTasks.Field()
+    bulk_update_tasks = BulkUpdateTasks.Field()
+    bulk_add_comments = BulkAddComments.Field()
+
+
+# ==================== SUBSCRIPTIONS ====================
+
+def publish_task_change(action, task_id, project_id):
+    """Notify taskChanged subscribers of the project once the write commits."""
+    publish_on_commit(task_channel(project_id), {'action': action, 'task_id': task_id})
+
+
+def publish_comment_added(comment):
+    """Notify commentAdded subscribers of the task once the write commits."""
+    publish_on_commit(comment_channel(comment.task_id), {'comment_id': comment.id})
+
+
+class TaskChangeAction(graphene.Enum):
+    CREATED = 'CREATED'
+    UPDATED = 'UPDATED'
+    DELETED = 'DELETED'
+
+
+class TaskChangedEvent(graphene.ObjectType):
+    """A task was created, updated or deleted."""
+    action = graphene.Field(TaskChangeAction)
+    task_id = graphene.ID()
+    task = graphene.Field(TaskType, description="Current state of the task; null once deleted")
+
+    def resolve_task(self, info):
+        if self.action == TaskChangeAction.DELETED.value:
+            return None
+        return get_loaders(info).fetch_one(optimize(Task.objects.filter(id=self.task_id), selected_fields(info)))
+
+
+class Subscription(graphene.ObjectType):
+    """Served over WebSocket by config.subscriptions (graphql-transport-ws protocol)."""
+    task_changed = graphene.Field(
+        TaskChangedEvent,
+        organization_slug=graphene.String(required=True),
+        project_id=graphene.Int(required=True),
+        description="Tasks created, updated or deleted in a project"
+    )
+    comment_added = graphene.Field(
+        TaskCommentType,
+        organization_slug=graphene.String(required=True),
+        task_id=graphene.Int(required=True),
+        description="Comments added to a task"
+    )
+
+    async def subscribe_task_changed(root, info, organization_slug, project_id):
+        # Multi-tenant validation
+        if not await sync_to_async(validate_project_in_org)(project_id, organization_slug):
+            raise GraphQLError("Project not found in this organization")
+        return get_broker().subscribe(task_channel(project_id))
+
+    def resolve_task_changed(event, info, organization_slug, project_id):
+        # Every event is a new execution: don't reuse rows loaded for earlier ones
+        info.context.loaders = AsyncRequestLoaders()
+        return TaskChangedEvent(action=event['action'], task_id=event['task_id'])
+
+    async def subscribe_comment_added(root, info, organization_slug, task_id):
+        # Multi-tenant validation
+        if not await sync_to_async(validate_task_in_org)(task_id, organization_slug):
+            raise GraphQLError("Task not found in this organization")
+        return get_broker().subscribe(comment_channel(task_id))
+
+    def resolve_comment_added(event, info, organization_slug, task_id):
+        info.context.loaders = AsyncRequestLoaders()
+        return get_loaders(info).fetch_one(
+            optimize(TaskComment.objects.filter(id=event['comment_id']), selected_fields(info))
+        )
 
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
+schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
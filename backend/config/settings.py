@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    "config.metrics.GraphQLMetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -76,9 +77,11 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# DB_ENGINE=django.db.backends.sqlite3 (with DB_NAME set to a file path) runs
+# against SQLite, e.g. for benchmarks/suite.py.
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": os.getenv("DB_ENGINE", "django.db.backends.postgresql"),
         "NAME": os.getenv("DB_NAME"),
         "USER": os.getenv("DB_USER"),
         "PASSWORD": os.getenv("DB_PASSWORD"),
@@ -87,6 +90,60 @@ DATABASES = {
     }
 }
 
+# Connection pool on PostgreSQL (psycopg 3), one per worker process and database:
+# requests borrow a connection and return it when they finish instead of opening
+# their own. Size it so that workers x DB_POOL_MAX_SIZE x (1 + replicas) stays
+# under the server's max_connections. DB_POOL_MAX_SIZE=0 disables the pool.
+# Requests wait up to DB_POOL_TIMEOUT seconds for a free connection, and each
+# connection is checked before it is handed out.
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql" and DB_POOL_MAX_SIZE:
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            "max_size": DB_POOL_MAX_SIZE,
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            "max_idle": 300,
+            "max_lifetime": 1800,
+        },
+    }
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+# Read replicas for GraphQL queries (see config/routers.py), as a comma-separated
+# list of host[:port][/name], e.g. DB_REPLICAS="replica-1,replica-2:6432/pms".
+# Each uses the primary's credentials and becomes the alias replica_<n>.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.getenv("DB_REPLICAS", "").split(","))):
+    address, _, name = replica.strip().partition("/")
+    host, _, port = address.partition(":")
+    alias = f"replica_{index + 1}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "NAME": name or DATABASES["default"]["NAME"],
+        # Tests run against the primary's test database
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['config.routers.PrimaryReplicaRouter']
+
+# After a write, queries reading that organization stay on the primary this many
+# seconds. Replicas are health-checked at most every REPLICA_HEALTH_CHECK_INTERVAL
+# seconds and skipped while more than REPLICA_MAX_LAG seconds behind (None: no limit).
+REPLICA_PIN_SECONDS = 5
+REPLICA_HEALTH_CHECK_INTERVAL = 10
+REPLICA_MAX_LAG = 5
+
+# Organization slug -> id lookups kept in memory per process (see config/tenants.py):
+# at most ORGANIZATION_ID_CACHE_SIZE slugs, each for ORGANIZATION_ID_CACHE_TIMEOUT
+# seconds. Renames and deletions in other processes are picked up within
+# ORGANIZATION_ID_CACHE_SYNC_INTERVAL seconds.
+ORGANIZATION_ID_CACHE_SIZE = 10000
+ORGANIZATION_ID_CACHE_TIMEOUT = 300
+ORGANIZATION_ID_CACHE_SYNC_INTERVAL = 1
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -129,6 +186,79 @@ GRAPHENE = {
     "SCHEMA": "config.schema.schema"
 }
 
+# Serve /graphql/ with the async view (config.views.AsyncGraphQLView).
+# Enable when running config.asgi:application under an ASGI server such as uvicorn.
+GRAPHQL_ASYNC = False
+
+# Parsed and validated GraphQL documents kept in memory per process: at most
+# GRAPHQL_DOCUMENT_CACHE_SIZE of them, whose query texts add up to at most
+# GRAPHQL_DOCUMENT_CACHE_MAX_QUERY_SIZE characters (a parsed document takes
+# roughly 100x its text)
+GRAPHQL_DOCUMENT_CACHE_SIZE = 256
+GRAPHQL_DOCUMENT_CACHE_MAX_QUERY_SIZE = 256 * 1024
+
+# How long (seconds) an Automatic Persisted Query hash stays registered
+GRAPHQL_PERSISTED_QUERY_TIMEOUT = 60 * 60 * 24
+
+# Tenant-scoped query result cache (see config/response_cache.py).
+# Disabled when None; set to a number of seconds to enable.
+GRAPHQL_RESPONSE_CACHE_TIMEOUT = None
+GRAPHQL_RESPONSE_CACHE_ALIAS = 'default'
+
+# Broker carrying subscription events from mutations to WebSocket clients.
+# InMemoryBroker only reaches subscribers in the same process; use
+# 'config.broker.RedisBroker' (with GRAPHQL_SUBSCRIPTION_REDIS_URL) for several.
+GRAPHQL_SUBSCRIPTION_BROKER = 'config.broker.InMemoryBroker'
+
+# Query depth and estimated cost limits (see config/query_cost.py); None disables
+# a limit. GRAPHQL_QUERY_LIMITS overrides them per organization slug, e.g.
+# {'acme': {'max_cost': 20000}}.
+GRAPHQL_MAX_QUERY_DEPTH = 10
+GRAPHQL_MAX_QUERY_COST = 5000
+GRAPHQL_QUERY_LIMITS = {}
+
+# Operations slower than this many seconds are logged as JSON, with their SQL
+# and resolver timings, on the 'config.tracing' logger. Off by default: while it
+# is set, every operation is traced and every resolver timed.
+# Clients get the same data in extensions.tracing by sending X-GraphQL-Trace,
+# with DEBUG on or when the header equals GRAPHQL_TRACING_TOKEN.
+GRAPHQL_SLOW_OPERATION_THRESHOLD = (
+    float(os.environ["GRAPHQL_SLOW_OPERATION_THRESHOLD"]) if os.getenv("GRAPHQL_SLOW_OPERATION_THRESHOLD") else None
+)
+GRAPHQL_TRACING_TOKEN = os.getenv("GRAPHQL_TRACING_TOKEN")
+
+# Prometheus metrics at /metrics (see config/metrics.py). With several worker
+# processes, point METRICS_MULTIPROCESS_DIR at a directory shared by them and
+# emptied on deploy. When METRICS_AUTH_TOKEN is set, scrapers must send it as
+# "Authorization: Bearer <token>".
+METRICS_MULTIPROCESS_DIR = os.getenv("METRICS_MULTIPROCESS_DIR")
+METRICS_FLUSH_INTERVAL = 1.0
+METRICS_AUTH_TOKEN = os.getenv("METRICS_AUTH_TOKEN")
+
+# Rows fetched per round trip by the /export/ endpoints (see config/export.py)
+EXPORT_CHUNK_SIZE = 2000
+
+# Bulk task import (manage.py import_tasks, POST /import/; see config/imports.py).
+# The endpoint is disabled unless IMPORT_AUTH_TOKEN is set, and then requires
+# "Authorization: Bearer <token>".
+IMPORT_BATCH_SIZE = 5000
+IMPORT_MAX_REPORTED_ERRORS = 100
+IMPORT_AUTH_TOKEN = os.getenv("IMPORT_AUTH_TOKEN")
+
+# Rows deleted per transaction by manage.py process_deletions (see config/deletion.py)
+DELETION_BATCH_SIZE = 1000
+
+# Largest list accepted by bulkCreateTasks / bulkUpdateTasks / bulkAddComments
+BULK_MUTATION_MAX_ITEMS = 5000
+
+# Use a shared backend (Redis, Memcached) in production so persisted queries,
+# cached results and organization versions are shared by all workers
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 CORS_ALLOW_CREDENTIALS = True
 
 CORS_ALLOWED_ORIGINS = [
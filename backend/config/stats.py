@@ -0,0 +1,68 @@
+"""
+Batched statistics for projects and organizations.
+
+Each function computes the counters for many parents at once. They return
+plain dicts keyed by parent id; the GraphQL layer turns them into
+``ProjectStatsType`` / ``OrganizationStatsType``.
+
+Task and comment totals come from the ``ProjectTaskStats`` counters, which
+the mutations keep exact, so reading them costs a primary key lookup per
+project rather than a count over its tasks. Only the overdue count depends
+on the current time and is still counted, from the partial index on open
+tasks' due dates.
+"""
+from django.db.models import Count, Q, Sum
+
+from projects.models import Project
+from tasks.models import Task, ProjectTaskStats
+
+
+def project_stats(project_ids, now):
+    """Task counters for each project: one counter-table read plus one overdue count."""
+    stats = {
+        counters.project_id: {field: getattr(counters, field) for field in ProjectTaskStats.COUNTER_FIELDS}
+        for counters in ProjectTaskStats.objects.filter(project_id__in=project_ids)
+    }
+    missing = set(project_ids) - stats.keys()
+    if missing:
+        stats.update(ProjectTaskStats.compute(missing))
+
+    overdue = Task.objects.filter(
+        project_id__in=project_ids,
+        due_date__lt=now
+    ).exclude(
+        status='DONE'
+    ).order_by().values('project_id').annotate(overdue_tasks=Count('id'))
+    for row in overdue:
+        stats.setdefault(row['project_id'], {})['overdue_tasks'] = row['overdue_tasks']
+    return stats
+
+
+def organization_stats(organization_ids):
+    """
+    Project and task counters for each organization, in a single GROUP BY
+    organization_id query. Projects without a counters row yet are counted
+    like ``project_stats()`` counts them, in one more query.
+    """
+    rows = Project.objects.filter(
+        organization_id__in=organization_ids
+    ).order_by().values('organization_id').annotate(
+        total_projects=Count('id'),
+        active_projects=Count('id', filter=Q(status='ACTIVE')),
+        completed_projects=Count('id', filter=Q(status='COMPLETED')),
+        total_tasks=Sum('task_stats__total_tasks'),
+        completed_tasks=Sum('task_stats__completed_tasks'),
+        uncounted_projects=Count('id', filter=Q(task_stats__isnull=True))
+    )
+    stats = {row.pop('organization_id'): row for row in rows}
+
+    uncounted = [organization_id for organization_id, row in stats.items() if row.pop('uncounted_projects')]
+    if uncounted:
+        projects = dict(Project.objects.filter(
+            organization_id__in=uncounted, task_stats__isnull=True
+        ).values_list('id', 'organization_id'))
+        for project_id, counters in ProjectTaskStats.compute(projects).items():
+            row = stats[projects[project_id]]
+            for field in ('total_tasks', 'completed_tasks'):
+                row[field] = (row[field] or 0) + counters[field]
+    return stats
@@ -0,0 +1,213 @@
+"""
+GraphQL subscriptions over WebSocket.
+
+Implements the ``graphql-transport-ws`` protocol (the one spoken by the
+``graphql-ws`` client and Apollo's ``GraphQLWsLink``) as a small ASGI app,
+mounted for WebSocket connections to /graphql/ in ``config.asgi``.
+
+Each subscription runs as its own task: events come from the broker
+(``config.broker``), are executed against the schema with fresh request
+loaders, and are sent to the client as ``next`` messages.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.db import connections
+from graphql import ExecutionResult, OperationType, get_operation_ast, subscribe
+
+from .views import GraphQLView
+
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL = 'graphql-transport-ws'
+
+# Close codes defined by the protocol
+BAD_REQUEST = 4400
+UNAUTHORIZED = 4401
+CONNECTION_INIT_TIMEOUT = 4408
+SUBSCRIBER_ALREADY_EXISTS = 4409
+TOO_MANY_INIT_REQUESTS = 4429
+
+
+class SubscriptionContext:
+    """``info.context`` for subscription operations (there is no HttpRequest)."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.loaders = None
+
+
+class GraphQLWebSocketConnection:
+    """One client connection and the subscriptions running on it."""
+
+    connection_init_timeout = 3
+
+    def __init__(self, view, scope, receive, send):
+        self.view = view
+        self.scope = scope
+        self.receive = receive
+        self._send = send
+        self._send_lock = asyncio.Lock()
+        self.acknowledged = False
+        self.operations = {}
+        self.closed = False
+
+    async def send(self, message):
+        async with self._send_lock:
+            if not self.closed:
+                await self._send(message)
+
+    async def send_json(self, message):
+        await self.send({'type': 'websocket.send', 'text': json.dumps(message)})
+
+    async def close(self, code, reason=''):
+        await self.send({'type': 'websocket.close', 'code': code, 'reason': reason})
+        self.closed = True
+
+    async def run(self):
+        message = await self.receive()
+        if message['type'] != 'websocket.connect':
+            return
+        if PROTOCOL not in self.scope.get('subprotocols', []):
+            await self.close(BAD_REQUEST, "Subprotocol not acceptable")
+            return
+        await self.send({'type': 'websocket.accept', 'subprotocol': PROTOCOL})
+
+        init_timeout = asyncio.ensure_future(self.close_unless_acknowledged())
+        try:
+            while not self.closed:
+                message = await self.receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                if message['type'] == 'websocket.receive':
+                    await self.handle(message.get('text') or message.get('bytes', b'').decode())
+        finally:
+            self.closed = True
+            init_timeout.cancel()
+            operations = list(self.operations.values())
+            for task in operations:
+                task.cancel()
+            await asyncio.gather(*operations, return_exceptions=True)
+
+    async def close_unless_acknowledged(self):
+        await asyncio.sleep(self.connection_init_timeout)
+        if not self.acknowledged:
+            await self.close(CONNECTION_INIT_TIMEOUT, "Connection initialisation timeout")
+
+    async def handle(self, text):
+        try:
+            message = json.loads(text)
+            message_type = message['type']
+        except (ValueError, TypeError, KeyError):
+            await self.close(BAD_REQUEST, "Invalid message received")
+            return
+
+        if message_type == 'connection_init':
+            if self.acknowledged:
+                await self.close(TOO_MANY_INIT_REQUESTS, "Too many initialisation requests")
+                return
+            self.acknowledged = True
+            await self.send_json({'type': 'connection_ack'})
+        elif message_type == 'ping':
+            await self.send_json({'type': 'pong'})
+        elif message_type == 'pong':
+            pass
+        elif message_type == 'subscribe':
+            if not self.acknowledged:
+                await self.close(UNAUTHORIZED, "Unauthorized")
+                return
+            id, payload = message.get('id'), message.get('payload')
+            if not isinstance(id, str) or not isinstance(payload, dict):
+                await self.close(BAD_REQUEST, "Invalid message received")
+                return
+            if id in self.operations:
+                await self.close(SUBSCRIBER_ALREADY_EXISTS, f"Subscriber for {id} already exists")
+                return
+            self.operations[id] = asyncio.ensure_future(self.run_operation(id, payload))
+        elif message_type == 'complete':
+            task = self.operations.pop(message.get('id'), None)
+            if task is not None:
+                task.cancel()
+        else:
+            await self.close(BAD_REQUEST, f"Unexpected message of type {message_type} received")
+
+    async def run_operation(self, id, payload):
+        # Like Django's ASGI handler: ORM calls for this operation share one thread
+        async with ThreadSensitiveContext():
+            try:
+                await self.execute(id, payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Subscription %s failed", id)
+                await self.send_error(id, [e])
+            finally:
+                self.operations.pop(id, None)
+                await sync_to_async(connections.close_all)()
+
+    async def execute(self, id, payload):
+        query = payload.get('query')
+        if not isinstance(query, str) or not query:
+            await self.send_error(id, [ValueError("Must provide query string.")])
+            return
+        document, errors = self.view.get_document(query)
+        if document is None or errors:
+            await self.send_error(id, errors)
+            return
+        operation_ast = get_operation_ast(document, payload.get('operationName'))
+        if operation_ast is None or operation_ast.operation != OperationType.SUBSCRIPTION:
+            await self.send_error(id, [ValueError("Only subscriptions are served over WebSocket; use POST /graphql/.")])
+            return
+
+        context = SubscriptionContext(self.scope)
+        errors = self.view.check_query_cost(context, document, operation_ast, payload.get('variables'))
+        if errors:
+            await self.send_error(id, errors)
+            return
+
+        result = await subscribe(
+            self.view.schema.graphql_schema,
+            document,
+            context_value=context,
+            variable_values=payload.get('variables'),
+            operation_name=payload.get('operationName'),
+        )
+        if isinstance(result, ExecutionResult):
+            await self.send_error(id, result.errors)
+            return
+
+        try:
+            async for item in result:
+                await self.send_json({'id': id, 'type': 'next', 'payload': self.payload(item)})
+                # Don't hold a database connection while waiting for the next event
+                await sync_to_async(connections.close_all)()
+        finally:
+            await result.aclose()
+        await self.send_json({'id': id, 'type': 'complete'})
+
+    def payload(self, result):
+        payload = {'data': result.data}
+        if result.errors:
+            payload['errors'] = [self.view.format_error(e) for e in result.errors]
+        return payload
+
+    async def send_error(self, id, errors):
+        await self.send_json({'id': id, 'type': 'error', 'payload': [self.view.format_error(e) for e in errors]})
+
+
+class GraphQLWebSocketApp:
+    """ASGI app for WebSocket connections; other paths are refused."""
+
+    def __init__(self, path='/graphql/'):
+        self.path = path
+        self.view = GraphQLView()
+
+    async def __call__(self, scope, receive, send):
+        if scope['path'] != self.path:
+            await receive()
+            await send({'type': 'websocket.close', 'code': 1000})
+            return
+        await GraphQLWebSocketConnection(self.view, scope, receive, send).run()
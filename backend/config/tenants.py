@@ -0,0 +1,163 @@
+"""
+Organization slug -> id, resolved once per process.
+
+Every tenant-scoped operation names its organization by slug. Filtering by
+``organization__slug`` joins the organizations table into each query (and
+tasks and comments join it through their projects); ``organization_id()``
+looks the slug up once and caches the id, so queries filter on
+``organization_id`` / ``project__organization_id`` instead.
+
+The cache is a process-local LRU of at most ``ORGANIZATION_ID_CACHE_SIZE``
+slugs, each kept for ``ORGANIZATION_ID_CACHE_TIMEOUT`` seconds. Unknown slugs
+aren't cached. Mutations that create, rename or hide an organization call
+``forget_organization()``, which drops the slugs in this process at once and,
+when the transaction commits, bumps a generation counter in the cache
+backend. Every process compares the counter at most every
+``ORGANIZATION_ID_CACHE_SYNC_INTERVAL`` seconds and empties its cache when it
+changed, so another worker can resolve a renamed slug to its old id for that
+long (like a replica lagging behind). Renames and deletions are rare, so one
+counter for all organizations is enough.
+
+Lookups always read the primary: a lagging replica could otherwise put a
+slug that was just renamed back into the cache.
+
+Resolvers run on the event loop under ``AsyncGraphQLView``, where the ORM
+can't be called. The view resolves the operation's slugs in a thread first
+and runs it within ``resolved()``; ``organization_id()`` then only answers
+from those ids.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from organizations.models import Organization
+
+from . import routers
+
+
+GENERATION_KEY = 'tenants:organization-ids:generation'
+
+# Slug -> id (or None) resolved ahead of the current operation, if any
+resolved_ids = ContextVar('resolved_ids', default=None)
+
+
+class OrganizationIdCache:
+    """Thread-safe LRU of ``slug -> (id, expires at)``."""
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.generation = None
+        self.synced_at = None
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, slug):
+        with self._lock:
+            entry = self._ids.get(slug)
+            if entry is None:
+                return None
+            organization_id, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._ids[slug]
+                return None
+            self._ids.move_to_end(slug)
+            return organization_id
+
+    def set(self, slug, organization_id, generation):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            # Don't keep what was read before an invalidation arrived
+            if generation != self.generation:
+                return
+            self._ids[slug] = (organization_id, time.monotonic() + self.timeout)
+            self._ids.move_to_end(slug)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+    def forget(self, *slugs):
+        with self._lock:
+            for slug in slugs:
+                self._ids.pop(slug, None)
+
+    def sync(self):
+        """Empty the cache if another process invalidated it; returns the current generation."""
+        now = time.monotonic()
+        with self._lock:
+            if self.synced_at is not None and now - self.synced_at < settings.ORGANIZATION_ID_CACHE_SYNC_INTERVAL:
+                return self.generation
+            # Other threads keep using the cache while this one checks
+            self.synced_at = now
+        generation = cache.get(GENERATION_KEY)
+        with self._lock:
+            if generation != self.generation:
+                self._ids.clear()
+                self.generation = generation
+            return self.generation
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+            self.synced_at = None
+
+
+organization_ids = OrganizationIdCache(settings.ORGANIZATION_ID_CACHE_SIZE, settings.ORGANIZATION_ID_CACHE_TIMEOUT)
+
+
+def organization_id(slug):
+    """Id of the (visible) organization with ``slug``, or None if there is none."""
+    ids = resolved_ids.get()
+    if ids is not None:
+        return ids.get(slug)
+    generation = organization_ids.sync()
+    cached = organization_ids.get(slug)
+    if cached is not None:
+        return cached
+    with routers.reading_from(None):
+        found = Organization.objects.filter(slug=slug).values_list('id', flat=True).first()
+    if found is not None:
+        organization_ids.set(slug, found, generation)
+    return found
+
+
+def resolve_organizations(slugs):
+    """``{slug: id or None}`` for ``slugs``, for ``resolved()``."""
+    return {slug: organization_id(slug) for slug in slugs}
+
+
+@contextmanager
+def resolved(ids):
+    """Answer ``organization_id()`` from ``ids`` alone, without querying."""
+    token = resolved_ids.set(ids)
+    try:
+        yield
+    finally:
+        resolved_ids.reset(token)
+
+
+def forget_organization(*slugs):
+    """
+    Stop resolving ``slugs`` to their cached ids: in this process now, and in
+    every process once the current transaction commits.
+    """
+    slugs = [slug for slug in slugs if slug]
+    organization_ids.forget(*slugs)
+
+    def committed():
+        # Lookups made while the transaction ran may have cached the old ids
+        organization_ids.forget(*slugs)
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            # Start from the clock, so a counter that was evicted never comes
+            # back at a value a process has already seen
+            cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+
+    transaction.on_commit(committed)
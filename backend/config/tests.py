@@ -0,0 +1,1836 @@
+import asyncio
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import Count, F
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from organizations.models import DeletionJob, Organization
+from projects.models import Project
+from tasks.models import Task, ProjectTaskStats
+from task_comments.models import TaskComment
+
+from . import routers, stats, tenants, writes
+from .broker import get_broker
+from .bulk import BatchWriter
+from .deletion import run_job
+from .loaders import RequestLoaders
+from .metrics import CACHE_REQUESTS, registry
+from .query_cost import LIST_SIZE
+from .tracing import OperationTrace, TracingMiddleware
+from .schema import schema
+from .subscriptions import GraphQLWebSocketApp
+from .views import AsyncGraphQLView, DocumentCache, GraphQLView, document_cache
+
+
+class ForgetOrganizationIds:
+    """Empties the organization id cache before each test: ids cached by earlier tests may have been rolled back."""
+
+    def setUp(self):
+        super().setUp()
+        tenants.organization_ids.clear()
+
+
+class QueryIndexUsageTests(ForgetOrganizationIds, TestCase):
+    """Every root Query resolver should be served by an index, not a full table scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        statuses = ['TODO', 'IN_PROGRESS', 'DONE']
+        for o in range(3):
+            organization = Organization.objects.create(
+                name=f"Org {o}", slug=f"org-{o}", contact_email=f"admin@org{o}.com"
+            )
+            for p in range(4):
+                project = Project.objects.create(organization=organization, name=f"Project {p}")
+                tasks = Task.objects.bulk_create(
+                    Task(
+                        project=project,
+                        title=f"Task {t}",
+                        status=statuses[t % 3],
+                        due_date=now + timedelta(days=t - 10),
+                    )
+                    for t in range(25)
+                )
+                TaskComment.objects.bulk_create(
+                    TaskComment(task=task, content="Looks good", author_email="dev@example.com")
+                    for task in tasks
+                )
+        cls.project = Project.objects.filter(organization__slug='org-0').first()
+        cls.task = cls.project.tasks.first()
+        # Give the planner real statistics, as it would have in production
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        super().setUp()
+        # As in a warm worker, the slug is already resolved to its id
+        tenants.organization_id('org-0')
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tiny test tables would otherwise always be read sequentially
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN {sql}")
+            else:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+    def assertUsesIndexes(self, query, index=None):
+        """Assert the resolver's own statement avoids full scans (and uses ``index`` if given)."""
+        with CaptureQueriesContext(connection) as ctx:
+            result = schema.execute(query, context_value=RequestFactory().post('/graphql/'))
+        self.assertIsNone(result.errors)
+        sql = ctx.captured_queries[0]['sql']
+        plan = self.explain(sql)
+        if index:
+            self.assertIn(index, plan, f"{sql}\n{plan}")
+        if connection.vendor == 'postgresql':
+            self.assertNotIn("Seq Scan", plan, f"{sql}\n{plan}")
+        else:
+            for line in plan.splitlines():
+                if line.startswith(("SCAN", "SEARCH")):
+                    self.assertIn("USING", line, f"{sql}\n{plan}")
+
+    def test_all_organizations(self):
+        self.assertUsesIndexes('{ allOrganizations(first: 2) { edges { node { id } } } }', 'org_created_idx')
+
+    def test_organization(self):
+        self.assertUsesIndexes('{ organization(slug: "org-1") { id } }')
+
+    def test_projects_by_organization(self):
+        self.assertUsesIndexes(
+            '{ projectsByOrganization(organizationSlug: "org-0", first: 2) { edges { node { id } } } }',
+            'project_org_created_idx'
+        )
+
+    def test_projects_by_organization_with_status(self):
+        self.assertUsesIndexes(
+            '{ projectsByOrganization(organizationSlug: "org-0", status: "ACTIVE", first: 2) { edges { node { id } } } }',
+            'project_org_status_idx'
+        )
+
+    def test_project(self):
+        self.assertUsesIndexes(f'{{ project(id: {self.project.id}, organizationSlug: "org-0") {{ id }} }}')
+
+    def test_project_with_stats(self):
+        self.assertUsesIndexes(f'{{ projectWithStats(id: {self.project.id}, organizationSlug: "org-0") {{ id }} }}')
+
+    def test_tasks_by_project(self):
+        self.assertUsesIndexes(
+            f'{{ tasksByProject(projectId: {self.project.id}, organizationSlug: "org-0", first: 5) '
+            f'{{ edges {{ node {{ id }} }} }} }}',
+            'task_project_created_idx'
+        )
+
+    def test_tasks_by_project_with_status(self):
+        self.assertUsesIndexes(
+            f'{{ tasksByProject(projectId: {self.project.id}, organizationSlug: "org-0", status: "TODO", first: 5) '
+            f'{{ edges {{ node {{ id }} }} }} }}',
+            'task_project_status_idx'
+        )
+
+    def test_task(self):
+        self.assertUsesIndexes(f'{{ task(id: {self.task.id}, organizationSlug: "org-0") {{ id }} }}')
+
+    def test_overdue_tasks(self):
+        self.assertUsesIndexes(
+            '{ overdueTasks(organizationSlug: "org-0", first: 5) { edges { node { id } } } }',
+            'task_open_due_date_idx'
+        )
+
+    def test_comments_by_task(self):
+        self.assertUsesIndexes(
+            f'{{ commentsByTask(taskId: {self.task.id}, organizationSlug: "org-0", first: 5) '
+            f'{{ edges {{ node {{ id }} }} }} }}',
+            'comment_task_created_idx'
+        )
+
+
+class BatchLoaderTests(ForgetOrganizationIds, TestCase):
+    """Nested fields cost a fixed number of queries, however many rows they return."""
+
+    overdue = (
+        '{ overdueTasks(organizationSlug: "acme", first: 100) { edges { node { '
+        'title project { name organization { slug } } comments { content } commentCount } } } }'
+    )
+    nested = (
+        '{ projectsByOrganization(organizationSlug: "acme", first: 100) { edges { node { '
+        'name tasks { title comments { content } } } } } }'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        cls.add_rows(projects=1, tasks=1, comments=1)
+
+    @classmethod
+    def add_rows(cls, projects, tasks, comments):
+        for p in range(projects):
+            project = Project.objects.create(organization=cls.organization, name=f"Project {p}")
+            for t in range(tasks):
+                task = Task.objects.create(
+                    project=project, title=f"Task {t}", due_date=timezone.now() - timedelta(days=t + 1)
+                )
+                TaskComment.objects.bulk_create(
+                    TaskComment(task=task, content=f"Comment {c}", author_email="dev@acme.com")
+                    for c in range(comments)
+                )
+
+    def setUp(self):
+        super().setUp()
+        tenants.organization_id('acme')
+
+    def execute(self, query):
+        with CaptureQueriesContext(connection) as ctx:
+            result = schema.execute(query, context_value=RequestFactory().post('/graphql/'))
+        self.assertIsNone(result.errors)
+        return result.data, len(ctx.captured_queries)
+
+    def assertQueriesIndependentOfRows(self, query, expected):
+        _, queries = self.execute(query)
+        self.assertEqual(queries, expected)
+        self.add_rows(projects=3, tasks=4, comments=3)
+        data, queries = self.execute(query)
+        self.assertEqual(queries, expected)
+        return data
+
+    def test_overdue_tasks(self):
+        # Tasks joined to their projects and organizations, then every task's comments
+        # (commentCount is counted from those)
+        data = self.assertQueriesIndependentOfRows(self.overdue, 2)
+        nodes = [edge['node'] for edge in data['overdueTasks']['edges']]
+        self.assertEqual(len(nodes), 13)
+        for node in nodes:
+            self.assertEqual(node['project']['organization'], {'slug': 'acme'})
+            self.assertEqual(len(node['comments']), node['commentCount'])
+
+    def test_projects_with_tasks_and_comments(self):
+        # Projects, then every project's tasks, then every task's comments
+        data = self.assertQueriesIndependentOfRows(self.nested, 3)
+        projects = [edge['node'] for edge in data['projectsByOrganization']['edges']]
+        self.assertEqual(len(projects), 4)
+        self.assertEqual(sum(len(task['comments']) for project in projects for task in project['tasks']), 37)
+
+    def test_one_query_per_relation(self):
+        self.add_rows(projects=3, tasks=4, comments=3)
+        loaders = RequestLoaders()
+        tasks = loaders.fetch(Task.objects.all())
+        with self.assertNumQueries(1):
+            comments = [loaders.comments_by_task.load(task.id) for task in tasks]
+        self.assertEqual(sum(map(len, comments)), 37)
+        with self.assertNumQueries(1):
+            projects = [loaders.related(task, 'project') for task in tasks]
+        with self.assertNumQueries(1):
+            organizations = {loaders.related(project, 'organization') for project in projects}
+        self.assertEqual(organizations, {self.organization})
+
+    def test_loaders_are_not_shared_between_requests(self):
+        first = RequestFactory().post('/graphql/')
+        schema.execute(self.nested, context_value=first)
+        TaskComment.objects.create(task=Task.objects.get(), content="Later", author_email="dev@acme.com")
+
+        second = RequestFactory().post('/graphql/')
+        result = schema.execute(self.nested, context_value=second)
+        self.assertIsNot(first.loaders, second.loaders)
+        task, = result.data['projectsByOrganization']['edges'][0]['node']['tasks']
+        self.assertEqual([comment['content'] for comment in task['comments']], ["Comment 0", "Later"])
+
+
+class LookaheadTests(ForgetOrganizationIds, TestCase):
+    """Root querysets join and prefetch only the relations the selection set asks for."""
+
+    @classmethod
+    def setUpTestData(cls):
+        organization = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        cls.project = Project.objects.create(organization=organization, name="Launch", description="Plan")
+        cls.task = Task.objects.create(project=cls.project, title="Draft", description="Long notes")
+        for n in range(2):
+            TaskComment.objects.create(task=cls.task, content=f"Comment {n}", author_email="dev@acme.com")
+
+    def setUp(self):
+        super().setUp()
+        tenants.organization_id('acme')
+
+    def execute(self, query, **variables):
+        with CaptureQueriesContext(connection) as ctx:
+            result = schema.execute(
+                query, variable_values={'id': self.task.id, **variables},
+                context_value=RequestFactory().post('/graphql/')
+            )
+        self.assertIsNone(result.errors)
+        return result.data, [query['sql'] for query in ctx.captured_queries]
+
+    def test_unrequested_relations_are_not_fetched(self):
+        data, queries = self.execute('query ($id: Int!) { task(id: $id, organizationSlug: "acme") { title } }')
+        self.assertEqual(data['task'], {'title': "Draft"})
+        self.assertEqual(len(queries), 1)
+        # The tenant filter joins projects, but no project columns are loaded
+        self.assertNotIn('"projects_project"."name"', queries[0])
+
+        _, queries = self.execute(
+            'query ($id: Int!) { task(id: $id, organizationSlug: "acme") { title project { name } } }'
+        )
+        # The project comes from a join, and the comments aren't touched
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"projects_project"."name"', queries[0])
+
+        data, queries = self.execute(
+            'query ($id: Int!) { task(id: $id, organizationSlug: "acme") { title comments { content } } }'
+        )
+        self.assertEqual(len(data['task']['comments']), 2)
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"projects_project"."name"', queries[0])
+        self.assertIn('task_comments_taskcomment', queries[1])
+
+    def test_fragments(self):
+        data, queries = self.execute(
+            'query ($id: Int!) { task(id: $id, organizationSlug: "acme") { ...TaskFields } } '
+            'fragment TaskFields on TaskType { title ... on TaskType { project { ...ProjectFields } } } '
+            'fragment ProjectFields on ProjectType { name }'
+        )
+        self.assertEqual(data['task'], {'title': "Draft", 'project': {'name': "Launch"}})
+        self.assertEqual(len(queries), 1)
+
+    def test_aliases(self):
+        data, queries = self.execute(
+            'query ($id: Int!) { task(id: $id, organizationSlug: "acme") { '
+            'heading: title latest: comments { body: content } authors: comments { authorEmail } } }'
+        )
+        self.assertEqual(data['task']['heading'], "Draft")
+        self.assertEqual(data['task']['latest'], [{'body': "Comment 0"}, {'body': "Comment 1"}])
+        self.assertEqual(data['task']['authors'], [{'authorEmail': "dev@acme.com"}] * 2)
+        # Both aliases share one prefetch
+        self.assertEqual(len(queries), 2)
+
+    def test_large_text_columns_are_deferred(self):
+        _, queries = self.execute(
+            'query ($id: Int!) { task(id: $id, organizationSlug: "acme") { '
+            'title project { name } comments { authorEmail } } }'
+        )
+        self.assertNotIn('"tasks_task"."description"', queries[0])
+        self.assertNotIn('"projects_project"."description"', queries[0])
+        self.assertNotIn('"task_comments_taskcomment"."content"', queries[1])
+
+        data, queries = self.execute(
+            'query ($id: Int!) { task(id: $id, organizationSlug: "acme") { '
+            'description project { description } comments { content } } }'
+        )
+        self.assertEqual(data['task']['description'], "Long notes")
+        self.assertEqual(data['task']['project'], {'description': "Plan"})
+        self.assertIn('"tasks_task"."description"', queries[0])
+        self.assertIn('"projects_project"."description"', queries[0])
+        self.assertIn('"task_comments_taskcomment"."content"', queries[1])
+        # Nothing is loaded lazily afterwards
+        self.assertEqual(len(queries), 2)
+
+    def test_deferred_columns_through_fragments(self):
+        data, queries = self.execute(
+            'query ($id: Int!) { task(id: $id, organizationSlug: "acme") { ...Notes isOverdue } } '
+            'fragment Notes on TaskType { notes: description }'
+        )
+        self.assertEqual(data['task'], {'notes': "Long notes", 'isOverdue': False})
+        self.assertEqual(len(queries), 1)
+        for column in ('description', 'due_date', 'status'):
+            self.assertIn(f'"tasks_task"."{column}"', queries[0])
+
+    def test_skipped_relations(self):
+        query = (
+            'query ($id: Int!, $skip: Boolean!) { task(id: $id, organizationSlug: "acme") { '
+            'title comments @skip(if: $skip) { content } } }'
+        )
+        _, queries = self.execute(query, skip=True)
+        self.assertEqual(len(queries), 1)
+        _, queries = self.execute(query, skip=False)
+        self.assertEqual(len(queries), 2)
+
+
+class BatchedStatsTests(ForgetOrganizationIds, TestCase):
+    """Batched statistics match counting each parent on its own, including parents with no children."""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.organizations = [
+            Organization.objects.create(name=slug.title(), slug=slug, contact_email=f"admin@{slug}.com")
+            for slug in ('acme', 'globex', 'initech')
+        ]
+        acme, globex, _ = cls.organizations
+        cls.projects = [
+            Project.objects.create(organization=acme, name="Launch", status='ACTIVE'),
+            Project.objects.create(organization=acme, name="Website", status='COMPLETED'),
+            Project.objects.create(organization=globex, name="Empty", status='ON_HOLD'),
+        ]
+        statuses = ['TODO', 'IN_PROGRESS', 'DONE']
+        for index, project in enumerate(cls.projects[:2]):
+            for t in range(7 + index):
+                task = Task.objects.create(
+                    project=project, title=f"Task {t}", status=statuses[(t + index) % 3],
+                    due_date=now + timedelta(days=t - 3) if t % 2 else None
+                )
+                TaskComment.objects.bulk_create(
+                    TaskComment(task=task, content="Note", author_email="dev@acme.com") for _ in range(t % 3)
+                )
+        # Counter rows for every project, the empty one included, as the mutations keep them
+        ProjectTaskStats.rebuild()
+        cls.now = now
+
+    def test_project_stats(self):
+        ids = [project.id for project in self.projects]
+        with CaptureQueriesContext(connection) as ctx:
+            computed = stats.project_stats(ids, self.now)
+        # The counters, then one GROUP BY project_id for the overdue counts
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertIn('GROUP BY', ctx.captured_queries[1]['sql'])
+
+        for project in self.projects:
+            tasks = Task.objects.filter(project=project)
+            expected = {
+                'total_tasks': tasks.count(),
+                'todo_tasks': tasks.filter(status='TODO').count(),
+                'in_progress_tasks': tasks.filter(status='IN_PROGRESS').count(),
+                'completed_tasks': tasks.filter(status='DONE').count(),
+                'total_comments': TaskComment.objects.filter(task__project=project).count(),
+                'overdue_tasks': tasks.filter(due_date__lt=self.now).exclude(status='DONE').count(),
+            }
+            values = computed.get(project.id, {})
+            self.assertEqual({field: values.get(field) or 0 for field in expected}, expected, project.name)
+        self.assertEqual(computed[self.projects[0].id]['total_tasks'], 7)
+
+    def assertOrganizationStatsExact(self, computed):
+        for organization in self.organizations:
+            projects = Project.objects.filter(organization=organization)
+            tasks = Task.objects.filter(project__organization=organization)
+            expected = {
+                'total_projects': projects.count(),
+                'active_projects': projects.filter(status='ACTIVE').count(),
+                'completed_projects': projects.filter(status='COMPLETED').count(),
+                'total_tasks': tasks.count(),
+                'completed_tasks': tasks.filter(status='DONE').count(),
+            }
+            values = computed.get(organization.id, {})
+            self.assertEqual({field: values.get(field) or 0 for field in expected}, expected, organization.name)
+            self.assertEqual(
+                expected['total_projects'],
+                Organization.objects.annotate(total=Count('projects')).get(pk=organization.pk).total
+            )
+
+    def test_organization_stats(self):
+        ids = [organization.id for organization in self.organizations]
+        with CaptureQueriesContext(connection) as ctx:
+            computed = stats.organization_stats(ids)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertIn('GROUP BY', ctx.captured_queries[0]['sql'])
+        self.assertOrganizationStatsExact(computed)
+
+    def test_missing_counter_rows(self):
+        # Projects whose counters were never written agree with project_stats()
+        ProjectTaskStats.objects.filter(project__in=self.projects[1:]).delete()
+        ids = [organization.id for organization in self.organizations]
+        with CaptureQueriesContext(connection) as ctx:
+            computed = stats.organization_stats(ids)
+        # The GROUP BY, then the projects without counters and ProjectTaskStats.compute() for them
+        self.assertEqual(len(ctx.captured_queries), 4)
+        self.assertOrganizationStatsExact(computed)
+
+        project_ids = [project.id for project in self.projects]
+        per_project = stats.project_stats(project_ids, self.now)
+        acme = computed[self.organizations[0].id]
+        self.assertEqual(acme['total_tasks'], sum(per_project[id]['total_tasks'] for id in project_ids[:2]))
+        self.assertEqual(acme['total_tasks'], 15)
+
+
+class IndexMigrationTests(ForgetOrganizationIds, TestCase):
+    """Indexes on the list tables are built without blocking writes on PostgreSQL."""
+
+    def forwards(self, vendor):
+        loader = MigrationLoader(connection)
+        migration = loader.get_migration('tasks', '0002_task_task_project_created_idx_and_more')
+        self.assertFalse(migration.atomic)
+        state = loader.project_state(('tasks', '0001_initial'))
+        schema_editor = mock.Mock()
+        schema_editor.connection.vendor = vendor
+        schema_editor.connection.in_atomic_block = False
+        schema_editor.connection.alias = 'default'
+        for operation in migration.operations:
+            to_state = state.clone()
+            operation.state_forwards('tasks', to_state)
+            operation.database_forwards('tasks', schema_editor, state, to_state)
+            state = to_state
+        return schema_editor.add_index.call_args_list
+
+    def test_concurrent_on_postgresql(self):
+        calls = self.forwards('postgresql')
+        self.assertEqual(
+            [call.args[1].name for call in calls],
+            ['task_project_created_idx', 'task_project_status_idx', 'task_open_due_date_idx']
+        )
+        self.assertTrue(all(call.kwargs == {'concurrently': True} for call in calls))
+
+    def test_plain_elsewhere(self):
+        calls = self.forwards('sqlite')
+        self.assertEqual(len(calls), 3)
+        self.assertTrue(all(call.kwargs == {} for call in calls))
+
+
+class KeysetPaginationTests(ForgetOrganizationIds, TestCase):
+    """Relay connections page by keyset in both directions, with stable cursors."""
+
+    tasks_query = (
+        'query ($projectId: Int!, $first: Int, $after: String, $last: Int, $before: String) { '
+        'tasksByProject(projectId: $projectId, organizationSlug: "acme", first: $first, after: $after, '
+        'last: $last, before: $before) { totalCount edges { cursor node { id } } '
+        'pageInfo { hasNextPage hasPreviousPage startCursor endCursor } } }'
+    )
+    overdue_query = (
+        'query ($first: Int, $after: String) { overdueTasks(organizationSlug: "acme", first: $first, after: $after) '
+        '{ edges { node { id } } pageInfo { hasNextPage endCursor } } }'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        organization = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        cls.project = Project.objects.create(organization=organization, name="Launch")
+        cls.tasks = [Task.objects.create(project=cls.project, title=f"Task {t}") for t in range(7)]
+        # Newest first, ties broken by id
+        cls.ordered = [task.id for task in sorted(cls.tasks, key=lambda task: (task.created_at, task.id), reverse=True)]
+
+    def page(self, query, **variables):
+        result = schema.execute(query, variable_values=variables, context_value=RequestFactory().post('/graphql/'))
+        if result.errors:
+            return result.errors
+        connection, = result.data.values()
+        return connection
+
+    def tasks_page(self, **variables):
+        return self.page(self.tasks_query, projectId=self.project.id, **variables)
+
+    @staticmethod
+    def ids(connection):
+        return [int(edge['node']['id']) for edge in connection['edges']]
+
+    def test_first_after(self):
+        seen, after, pages = [], None, []
+        while True:
+            connection = self.tasks_page(first=3, after=after)
+            pages.append(connection['pageInfo'])
+            seen += self.ids(connection)
+            after = connection['pageInfo']['endCursor']
+            if not connection['pageInfo']['hasNextPage']:
+                break
+        self.assertEqual(seen, self.ordered)
+        self.assertEqual(len(pages), 3)
+        self.assertFalse(pages[0]['hasPreviousPage'])
+        self.assertTrue(all(page['hasPreviousPage'] for page in pages[1:]))
+        self.assertTrue(all(page['hasNextPage'] for page in pages[:-1]))
+        self.assertEqual(self.tasks_page(first=3, after=after)['edges'], [])
+
+    def test_last_before(self):
+        seen, before, pages = [], None, []
+        while True:
+            connection = self.tasks_page(last=3, before=before)
+            pages.append(connection['pageInfo'])
+            seen = self.ids(connection) + seen
+            before = connection['pageInfo']['startCursor']
+            if not connection['pageInfo']['hasPreviousPage']:
+                break
+        self.assertEqual(seen, self.ordered)
+        self.assertEqual(len(pages), 3)
+        self.assertFalse(pages[0]['hasNextPage'])
+        self.assertTrue(all(page['hasNextPage'] for page in pages[1:]))
+        self.assertEqual(self.ids(self.tasks_page(last=2)), self.ordered[-2:])
+
+    def test_exact_fit(self):
+        connection = self.tasks_page(first=7)
+        self.assertEqual(connection['totalCount'], 7)
+        self.assertFalse(connection['pageInfo']['hasNextPage'])
+        self.assertFalse(connection['pageInfo']['hasPreviousPage'])
+
+    def test_malformed_cursors(self):
+        def encode(value):
+            return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+        for cursor in ("not a cursor", encode({'id': 1}), encode([1]), encode(["yesterday", 1]), encode([None, 1])):
+            with self.subTest(cursor=cursor):
+                errors = self.tasks_page(first=2, after=cursor)
+                self.assertEqual([error.message for error in errors], [f"Invalid cursor: {cursor}"])
+
+    def test_cursor_of_deleted_row(self):
+        connection = self.tasks_page(first=3)
+        Task.objects.filter(id=self.ids(connection)[-1]).delete()
+        self.assertEqual(self.ids(self.tasks_page(first=2, after=connection['pageInfo']['endCursor'])), self.ordered[3:5])
+        self.assertEqual(self.ids(self.tasks_page(last=5, before=connection['pageInfo']['endCursor'])), self.ordered[:2])
+
+    def test_due_date_ties_and_nulls(self):
+        now = timezone.now()
+        due_dates = [now - timedelta(days=2)] * 3 + [now - timedelta(days=1)] * 2 + [None, None]
+        for task, due_date in zip(self.tasks, due_dates):
+            task.due_date = due_date
+        Task.objects.bulk_update(self.tasks, ['due_date'])
+
+        seen, after = [], None
+        while True:
+            connection = self.page(self.overdue_query, first=2, after=after)
+            seen += self.ids(connection)
+            after = connection['pageInfo']['endCursor']
+            if not connection['pageInfo']['hasNextPage']:
+                break
+        # Oldest due date first, equal ones by id; tasks without a due date are never overdue
+        self.assertEqual(seen, [task.id for task in self.tasks[:5]])
+
+
+class PersistedQueryTests(ForgetOrganizationIds, TestCase):
+    """Automatic Persisted Queries on the /graphql/ endpoint."""
+
+    query = '{ allOrganizations(first: 1) { edges { node { name } } } }'
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        document_cache.clear()
+        self.sha256 = hashlib.sha256(self.query.encode()).hexdigest()
+
+    def post(self, body):
+        response = self.client.post('/graphql/', json.dumps(body), content_type='application/json')
+        return response.json()
+
+    def persisted(self, sha256, query=None):
+        body = {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': sha256}}}
+        if query is not None:
+            body['query'] = query
+        return self.post(body)
+
+    def test_unknown_hash(self):
+        result = self.persisted(self.sha256)
+        self.assertEqual(result['errors'][0]['extensions']['code'], 'PERSISTED_QUERY_NOT_FOUND')
+
+    def test_register_then_hash_only(self):
+        self.assertIn('data', self.persisted(self.sha256, self.query))
+        result = self.persisted(self.sha256)
+        self.assertNotIn('errors', result)
+        self.assertEqual(result['data'], {'allOrganizations': {'edges': []}})
+
+    def test_hash_mismatch(self):
+        result = self.persisted('0' * 64, self.query)
+        self.assertEqual(result['errors'][0]['extensions']['code'], 'PERSISTED_QUERY_HASH_MISMATCH')
+
+    def test_validation_errors_are_cached(self):
+        for _ in range(2):
+            result = self.post({'query': '{ bogus }'})
+            self.assertIn("Cannot query field 'bogus'", result['errors'][0]['message'])
+
+    def test_document_cache_is_bounded_by_query_size(self):
+        documents = DocumentCache(max_size=10, max_query_size=100)
+        for key in 'abc':
+            documents.set(key, key.upper(), 40)
+        # The oldest is evicted to keep the texts within 100 characters
+        self.assertIsNone(documents.get('a'))
+        self.assertEqual((documents.get('b'), documents.get('c'), documents.query_size), ('B', 'C', 80))
+        documents.set('c', 'C', 40)
+        self.assertEqual(documents.query_size, 80)
+        documents.set('huge', 'HUGE', 101)
+        self.assertIsNone(documents.get('huge'))
+        self.assertEqual(documents.get('b'), 'B')
+
+    def test_long_queries_are_not_cached(self):
+        with mock.patch.object(document_cache, 'max_query_size', len(self.query) - 1):
+            self.assertIn('data', self.post({'query': self.query}))
+            self.assertIsNone(document_cache.get(self.sha256))
+        self.assertIn('data', self.post({'query': self.query}))
+        self.assertIsNotNone(document_cache.get(self.sha256))
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE_TIMEOUT=60)
+class ResponseCacheTests(ForgetOrganizationIds, TestCase):
+    """Query results are cached per organization and dropped by that organization's mutations."""
+
+    query = 'query ($slug: String!) { projectsByOrganization(organizationSlug: $slug) { edges { node { name } } } }'
+
+    @classmethod
+    def setUpTestData(cls):
+        for slug in ('acme', 'globex'):
+            organization = Organization.objects.create(
+                name=slug.title(), slug=slug, contact_email=f"admin@{slug}.com"
+            )
+            Project.objects.create(organization=organization, name=f"{slug} project")
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        # Count the query alone: the slugs are already resolved to ids
+        for slug in ('acme', 'globex'):
+            tenants.organization_id(slug)
+
+    def post(self, query, **variables):
+        response = self.client.post(
+            '/graphql/', json.dumps({'query': query, 'variables': variables}), content_type='application/json'
+        )
+        return response.json()
+
+    def project_names(self, slug):
+        with CaptureQueriesContext(connection) as ctx:
+            result = self.post(self.query, slug=slug)
+        names = [edge['node']['name'] for edge in result['data']['projectsByOrganization']['edges']]
+        return names, len(ctx.captured_queries)
+
+    def create_project(self, slug, name):
+        # Versions are bumped on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.post(
+                'mutation ($slug: String!, $name: String!) '
+                '{ createProject(organizationSlug: $slug, name: $name) { success } }',
+                slug=slug, name=name
+            )
+        self.assertTrue(result['data']['createProject']['success'])
+
+    def test_repeated_query_is_served_from_cache(self):
+        self.assertEqual(self.project_names('acme'), (['acme project'], 1))
+        self.assertEqual(self.project_names('acme'), (['acme project'], 0))
+
+    def test_organizations_are_cached_separately(self):
+        self.project_names('acme')
+        self.assertEqual(self.project_names('globex'), (['globex project'], 1))
+
+    def test_mutation_invalidates_only_its_organization(self):
+        self.project_names('acme')
+        self.project_names('globex')
+        self.create_project('acme', 'second')
+        self.assertEqual(self.project_names('acme'), (['second', 'acme project'], 1))
+        self.assertEqual(self.project_names('globex'), (['globex project'], 0))
+
+    def test_mutation_invalidates_cross_organization_queries(self):
+        query = '{ allOrganizations { edges { node { projectCount } } } }'
+        self.post(query)
+        self.create_project('globex', 'second')
+        counts = [edge['node']['projectCount'] for edge in self.post(query)['data']['allOrganizations']['edges']]
+        self.assertEqual(sorted(counts), [1, 2])
+
+
+class BulkMutationTests(ForgetOrganizationIds, TestCase):
+    """Bulk task and comment mutations validate every item and write in one transaction."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        cls.project = Project.objects.create(organization=cls.organization, name="Launch")
+        ProjectTaskStats.objects.create(project=cls.project)
+        other = Organization.objects.create(name="Globex", slug="globex", contact_email="admin@globex.com")
+        cls.other_project = Project.objects.create(organization=other, name="Other")
+
+    def execute(self, query, **variables):
+        result = schema.execute(query, variable_values=variables, context_value=RequestFactory().post('/graphql/'))
+        self.assertIsNone(result.errors)
+        return result.data
+
+    def create_tasks(self, tasks):
+        return self.execute(
+            'mutation ($tasks: [TaskInput!]!) { bulkCreateTasks(organizationSlug: "acme", tasks: $tasks) '
+            '{ success errors { field message } tasks { id status } } }',
+            tasks=tasks
+        )['bulkCreateTasks']
+
+    def assertCountersExact(self):
+        stats = ProjectTaskStats.objects.get(project=self.project)
+        expected = ProjectTaskStats.compute([self.project.id])[self.project.id]
+        self.assertEqual({field: getattr(stats, field) for field in ProjectTaskStats.COUNTER_FIELDS}, expected)
+
+    def test_bulk_create_and_update(self):
+        created = self.create_tasks([
+            {'projectId': self.project.id, 'title': f"Task {i}", 'status': 'TODO'} for i in range(10)
+        ])
+        self.assertTrue(created['success'])
+        self.assertEqual(len(created['tasks']), 10)
+
+        updated = self.execute(
+            'mutation ($tasks: [TaskUpdateInput!]!) { bulkUpdateTasks(organizationSlug: "acme", tasks: $tasks) '
+            '{ success errors { field message } } }',
+            tasks=[{'id': task['id'], 'status': 'DONE'} for task in created['tasks'][:4]]
+        )['bulkUpdateTasks']
+        self.assertTrue(updated['success'])
+        self.assertEqual(Task.objects.filter(project=self.project, status='DONE').count(), 4)
+
+        comments = self.execute(
+            'mutation ($comments: [CommentInput!]!) { bulkAddComments(organizationSlug: "acme", comments: $comments) '
+            '{ success comments { id } } }',
+            comments=[
+                {'taskId': int(task['id']), 'content': "Done", 'authorEmail': "dev@acme.com"}
+                for task in created['tasks']
+            ]
+        )['bulkAddComments']
+        self.assertEqual(len(comments['comments']), 10)
+        self.assertCountersExact()
+
+    def test_invalid_items_write_nothing(self):
+        result = self.create_tasks([
+            {'projectId': self.project.id, 'title': "Valid"},
+            {'projectId': self.other_project.id, 'title': "Other tenant"},
+            {'projectId': self.project.id, 'title': "Bad status", 'status': 'BLOCKED'},
+        ])
+        self.assertFalse(result['success'])
+        self.assertEqual(
+            [error['field'] for error in result['errors']],
+            ['tasks[1].project_id', 'tasks[2].status']
+        )
+        self.assertFalse(Task.objects.exists())
+
+    def test_update_rejects_other_tenants_tasks(self):
+        task = Task.objects.create(project=self.other_project, title="Theirs")
+        result = self.execute(
+            'mutation ($tasks: [TaskUpdateInput!]!) { bulkUpdateTasks(organizationSlug: "acme", tasks: $tasks) '
+            '{ success errors { field message } } }',
+            tasks=[{'id': task.id, 'title': "Mine now"}]
+        )['bulkUpdateTasks']
+        self.assertFalse(result['success'])
+        self.assertEqual(result['errors'][0]['field'], 'tasks[0].id')
+        task.refresh_from_db()
+        self.assertEqual(task.title, "Theirs")
+
+
+@override_settings(GRAPHQL_MAX_QUERY_COST=None)
+class AsyncViewTests(ForgetOrganizationIds, TestCase):
+    """AsyncGraphQLView returns exactly what the sync view does."""
+
+    queries = [
+        '{ allOrganizations { totalCount edges { node { name projectCount stats { totalTasks } '
+        'projects { name stats { completedTasks overdueTasks } } } } } }',
+        '{ organization(slug: "acme") { projects { tasks { title comments { content } } } } }',
+        '{ tasksByProject(projectId: %(project)d, organizationSlug: "acme", first: 3) '
+        '{ totalCount pageInfo { hasNextPage } edges { node { title isOverdue commentCount project { name } } } } }',
+        '{ commentsByTask(taskId: %(task)d, organizationSlug: "acme") { edges { node { content task { title } } } } }',
+        '{ task(id: %(task)d, organizationSlug: "globex") { id } }',
+        '{ deletionJob(id: %(job)d, organizationSlug: "acme") { name status progress } }',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        organization = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        Organization.objects.create(name="Globex", slug="globex", contact_email="admin@globex.com")
+        cls.project = Project.objects.create(organization=organization, name="Launch")
+        for t in range(5):
+            task = Task.objects.create(
+                project=cls.project, title=f"Task {t}", status=['TODO', 'DONE'][t % 2],
+                due_date=timezone.now() + timedelta(days=t - 2)
+            )
+            for c in range(2):
+                TaskComment.objects.create(task=task, content=f"Comment {c}", author_email="dev@acme.com")
+        cls.task = task
+        cls.job = DeletionJob.objects.create(
+            organization_id=organization.id, organization_slug="acme", project_id=cls.project.id, name="Archive",
+            total_tasks=4, deleted_tasks=1
+        )
+
+    def body(self, query):
+        return json.dumps({'query': query % {'project': self.project.id, 'task': self.task.id, 'job': self.job.id}})
+
+    def sync_result(self, query):
+        request = RequestFactory().post('/graphql/', self.body(query), content_type='application/json')
+        return json.loads(GraphQLView.as_view()(request).content)
+
+    async def async_result(self, query):
+        request = AsyncRequestFactory().post('/graphql/', self.body(query), content_type='application/json')
+        return json.loads((await AsyncGraphQLView.as_view()(request)).content)
+
+    async def test_queries_match_sync_view(self):
+        for query in self.queries:
+            expected = await sync_to_async(self.sync_result)(query)
+            self.assertNotIn('errors', expected)
+            self.assertEqual(await self.async_result(query), expected)
+
+    async def test_cold_organization_id_cache(self):
+        # Nothing resolved yet: the slugs are looked up in a thread, not on the event loop
+        tenants.organization_ids.clear()
+        await cache.adelete(tenants.GENERATION_KEY)
+        for query in self.queries[2:]:
+            result = await self.async_result(query)
+            self.assertNotIn('errors', result)
+        self.assertEqual(
+            (await self.async_result(self.queries[2]))['data']['tasksByProject']['totalCount'], 5
+        )
+
+        # Slugs behind a fragment can't be resolved up front; the query runs in a thread
+        tenants.organization_ids.clear()
+        result = await self.async_result(
+            'query { ...Task } fragment Task on Query { task(id: %(task)d, organizationSlug: "acme") { title } }'
+        )
+        self.assertEqual(result['data'], {'task': {'title': self.task.title}})
+
+    async def test_mutation(self):
+        result = await self.async_result(
+            'mutation { addComment(organizationSlug: "acme", taskId: %(task)d, content: "Async", '
+            'authorEmail: "dev@acme.com") { success comment { task { title } } } }'
+        )
+        self.assertEqual(
+            result['data']['addComment'],
+            {'success': True, 'comment': {'task': {'title': self.task.title}}}
+        )
+        self.assertEqual(await TaskComment.objects.filter(task=self.task).acount(), 3)
+
+
+@override_settings(GRAPHQL_MAX_QUERY_DEPTH=7, GRAPHQL_MAX_QUERY_COST=1000, GRAPHQL_QUERY_LIMITS={'big': {'max_cost': 100000}})
+class QueryCostTests(ForgetOrganizationIds, TestCase):
+    """Operations are rejected past the depth and cost limits, and report their cost."""
+
+    cyclic = '{ commentsByTask(taskId: 1, organizationSlug: "%s", first: 100) { edges { node { task { project { tasks { title } } } } } } }'
+
+    def post(self, query, **variables):
+        return self.client.post(
+            '/graphql/', json.dumps({'query': query, 'variables': variables}), content_type='application/json'
+        )
+
+    def test_cost_is_reported(self):
+        response = self.post(
+            'query ($slug: String!, $n: Int) { overdueTasks(organizationSlug: $slug, first: $n) '
+            '{ totalCount edges { node { title project { name } } } } }',
+            slug="acme", n=5
+        )
+        self.assertEqual(response.status_code, 200)
+        # totalCount, 5 tasks and their 5 projects
+        self.assertEqual(
+            response.json()['extensions']['cost'],
+            {'requested': 11, 'maximum': 1000, 'depth': 5, 'maximumDepth': 7}
+        )
+
+    def test_unpaginated_lists_and_fragments_are_counted(self):
+        response = self.post(
+            'query { organization(slug: "acme") { ...Projects } } '
+            'fragment Projects on OrganizationType { projects { tasks { id } } }'
+        )
+        self.assertEqual(response.json()['extensions']['cost']['requested'], 1 + LIST_SIZE + LIST_SIZE ** 2)
+
+    def test_too_costly(self):
+        response = self.post(self.cyclic % "acme")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['extensions']['code'], 'QUERY_TOO_COSTLY')
+        self.assertNotIn('data', response.json())
+
+    def test_too_deep(self):
+        response = self.post('{ task(id: 1, organizationSlug: "acme") { project { organization { projects { tasks { comments { task { id } } } } } } } }')
+        codes = [error['extensions']['code'] for error in response.json()['errors']]
+        self.assertIn('QUERY_TOO_DEEP', codes)
+
+    def test_tenant_limits(self):
+        response = self.post(self.cyclic % "big")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['extensions']['cost']['maximum'], 100000)
+
+    def test_introspection_is_not_counted(self):
+        response = self.post('{ __schema { types { fields { type { ofType { ofType { ofType { name } } } } } } } }')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['extensions']['cost']['depth'], 0)
+
+
+@override_settings(GRAPHQL_SLOW_OPERATION_THRESHOLD=None, GRAPHQL_TRACING_TOKEN="s3cret", DEBUG=False)
+class TracingTests(ForgetOrganizationIds, TestCase):
+    """SQL and resolver timings in extensions.tracing and the slow-operation log."""
+
+    query = 'query Projects { organization(slug: "acme") { name projects { name taskCount } } }'
+
+    @classmethod
+    def setUpTestData(cls):
+        organization = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        for p in range(3):
+            Project.objects.create(organization=organization, name=f"Project {p}")
+
+    def post(self, **headers):
+        return self.client.post(
+            '/graphql/', json.dumps({'query': self.query, 'operationName': 'Projects'}),
+            content_type='application/json', headers=headers
+        )
+
+    def test_tracing_extension(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(**{'X-GraphQL-Trace': "s3cret"})
+        tracing = response.json()['extensions']['tracing']
+        self.assertEqual(tracing['operationName'], 'Projects')
+        self.assertEqual(tracing['sql']['count'], len(queries))
+        self.assertEqual(tracing['sql']['duplicates'], [])
+        paths = [resolver['path'] for resolver in tracing['resolvers']]
+        self.assertIn(['organization'], paths)
+        self.assertIn(['organization', 'projects', 2, 'taskCount'], paths)
+
+    def test_header_needs_token_or_debug(self):
+        self.assertNotIn('tracing', self.post(**{'X-GraphQL-Trace': "guess"}).json()['extensions'])
+        with self.settings(DEBUG=True):
+            self.assertIn('tracing', self.post(**{'X-GraphQL-Trace': "1"}).json()['extensions'])
+
+    def test_slow_operations_are_logged(self):
+        with self.settings(GRAPHQL_SLOW_OPERATION_THRESHOLD=0), self.assertLogs('config.tracing', 'WARNING') as logs:
+            response = self.post()
+        self.assertNotIn('tracing', response.json()['extensions'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['event'], 'slow_graphql_operation')
+        self.assertEqual(record['operationName'], 'Projects')
+        self.assertGreater(record['sql']['count'], 0)
+
+    def test_untraced_by_default(self):
+        with mock.patch.object(TracingMiddleware, 'resolve') as resolve:
+            response = self.post()
+        self.assertEqual(response.json()['data']['organization']['name'], "Acme")
+        self.assertNotIn('tracing', response.json()['extensions'])
+        resolve.assert_not_called()
+
+    def test_duplicate_statements(self):
+        trace = OperationTrace()
+        for _ in range(3):
+            trace.record_query('SELECT 1', 0.001)
+        trace.record_query('SELECT 2', 0.001)
+        trace.finish()
+        self.assertEqual(trace.as_dict()['sql']['duplicates'], [{'sql': 'SELECT 1', 'count': 3}])
+
+
+class MetricsTests(ForgetOrganizationIds, TestCase):
+    """/metrics exposes per-operation metrics, summed over threads and processes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        organization = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        cls.project = Project.objects.create(organization=organization, name="Launch")
+
+    def post(self, query):
+        return self.client.post('/graphql/', json.dumps({'query': query}), content_type='application/json')
+
+    def sample(self, line):
+        """Value of the sample starting with ``line``, 0 if absent."""
+        for text in self.client.get('/metrics').content.decode().splitlines():
+            if text.startswith(line + ' '):
+                return float(text.rsplit(' ', 1)[1])
+        return 0
+
+    def test_operation_metrics(self):
+        count = 'graphql_operation_duration_seconds_count{operation_name="Launch",operation_type="query"}'
+        queries = 'graphql_operation_sql_queries_sum{operation_name="Launch",operation_type="query"}'
+        tenants.organization_id('acme')
+        before = self.sample(count), self.sample(queries)
+        self.post(f'query Launch {{ project(id: {self.project.id}, organizationSlug: "acme") {{ name }} }}')
+        self.assertEqual(self.sample(count), before[0] + 1)
+        self.assertEqual(self.sample(queries), before[1] + 1)
+
+    def test_resolver_errors(self):
+        errors = 'graphql_resolver_errors_total{field="tasksByProject"}'
+        before = self.sample(errors)
+        response = self.post(
+            f'{{ tasksByProject(projectId: {self.project.id}, organizationSlug: "acme", after: "bad") {{ totalCount }} }}'
+        )
+        self.assertIn('errors', response.json())
+        self.assertEqual(self.sample(errors), before + 1)
+
+    def test_cache_lookups(self):
+        hits = 'graphql_cache_requests_total{cache="document",result="hit"}'
+        query = '{ hello __typename }'
+        self.post(query)
+        before = self.sample(hits)
+        self.post(query)
+        self.assertEqual(self.sample(hits), before + 1)
+
+    def test_processes_are_summed(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_MULTIPROCESS_DIR=directory):
+            local = registry.collect()
+            hits = local.get((CACHE_REQUESTS.name, ('response', 'hit')), 0)
+            # A worker that has exited: its counters count, its gauges don't
+            with open(os.path.join(directory, 'metrics-4194305.json'), 'w') as f:
+                json.dump({'pid': 4194305, 'values': [
+                    [CACHE_REQUESTS.name, ['response', 'hit'], 5],
+                    ['graphql_requests_in_flight', [], 3],
+                ]}, f)
+            self.assertEqual(self.sample('graphql_cache_requests_total{cache="response",result="hit"}'), hits + 5)
+            self.assertEqual(self.sample('graphql_requests_in_flight'), 0)
+            self.assertTrue(os.path.exists(os.path.join(directory, f'metrics-{os.getpid()}.json')))
+
+    def test_connection_pool(self):
+        pool = mock.Mock()
+        pool.get_stats.return_value = {
+            'pool_min': 2, 'pool_max': 10, 'pool_size': 4, 'pool_available': 1,
+            'requests_num': 50, 'requests_wait_ms': 1500, 'connections_lost': 1,
+        }
+        with mock.patch('config.metrics.database_pools', return_value=[('default', pool)]):
+            self.assertEqual(self.sample('db_pool_connections{database="default",state="in_use"}'), 3)
+            self.assertEqual(self.sample('db_pool_connections{database="default",state="idle"}'), 1)
+            self.assertEqual(self.sample('db_pool_max_connections{database="default"}'), 10)
+            self.assertEqual(self.sample('db_pool_wait_seconds_total{database="default"}'), 1.5)
+            self.assertEqual(self.sample('db_pool_timeouts_total{database="default"}'), 0)
+            self.assertEqual(self.sample('db_pool_bad_connections_total{database="default"}'), 1)
+
+    def test_auth_token(self):
+        with self.settings(METRICS_AUTH_TOKEN="s3cret"):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            response = self.client.get('/metrics', headers={'Authorization': "Bearer s3cret"})
+            self.assertEqual(response.status_code, 200)
+
+
+class SubscriptionTests(ForgetOrganizationIds, TransactionTestCase):
+    """Mutations reach WebSocket subscribers once committed (TransactionTestCase, so commits happen)."""
+
+    def setUp(self):
+        super().setUp()
+        organization = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        self.project = Project.objects.create(organization=organization, name="Launch")
+        self.task = Task.objects.create(project=self.project, title="Design")
+
+    async def connect(self):
+        self.incoming, self.outgoing = asyncio.Queue(), asyncio.Queue()
+        scope = {'type': 'websocket', 'path': '/graphql/', 'subprotocols': ['graphql-transport-ws']}
+        self.connection = asyncio.ensure_future(GraphQLWebSocketApp()(scope, self.incoming.get, self.outgoing.put))
+        await self.incoming.put({'type': 'websocket.connect'})
+        self.assertEqual((await self.receive())['subprotocol'], 'graphql-transport-ws')
+        await self.send({'type': 'connection_init'})
+        self.assertEqual(await self.receive(), {'type': 'connection_ack'})
+
+    async def disconnect(self):
+        await self.incoming.put({'type': 'websocket.disconnect'})
+        await self.connection
+
+    async def send(self, message):
+        await self.incoming.put({'type': 'websocket.receive', 'text': json.dumps(message)})
+
+    async def receive(self):
+        message = await asyncio.wait_for(self.outgoing.get(), 5)
+        return json.loads(message['text']) if 'text' in message else message
+
+    async def subscribe(self, id, query, channel):
+        await self.send({'id': id, 'type': 'subscribe', 'payload': {'query': query}})
+        for _ in range(100):
+            if channel in get_broker()._subscribers:
+                return
+            await asyncio.sleep(0.01)
+        self.fail(f"No subscriber on {channel}")
+
+    async def mutate(self, query):
+        result = await sync_to_async(schema.execute)(query)
+        self.assertIsNone(result.errors)
+
+    async def test_task_changed(self):
+        await self.connect()
+        await self.subscribe(
+            '1',
+            f'subscription {{ taskChanged(organizationSlug: "acme", projectId: {self.project.id}) '
+            f'{{ action task {{ title status }} }} }}',
+            f'tasks:{self.project.id}'
+        )
+        await self.mutate(f'mutation {{ updateTask(id: {self.task.id}, organizationSlug: "acme", status: "DONE") {{ success }} }}')
+        self.assertEqual(await self.receive(), {
+            'id': '1', 'type': 'next',
+            'payload': {'data': {'taskChanged': {'action': 'UPDATED', 'task': {'title': "Design", 'status': 'DONE'}}}}
+        })
+        await self.disconnect()
+        self.assertNotIn(f'tasks:{self.project.id}', get_broker()._subscribers)
+
+    async def test_comment_added(self):
+        await self.connect()
+        await self.subscribe(
+            '1',
+            f'subscription {{ commentAdded(organizationSlug: "acme", taskId: {self.task.id}) {{ content }} }}',
+            f'comments:{self.task.id}'
+        )
+        await self.mutate(
+            f'mutation {{ addComment(organizationSlug: "acme", taskId: {self.task.id}, content: "Ship it", '
+            f'authorEmail: "dev@acme.com") {{ success }} }}'
+        )
+        self.assertEqual(
+            (await self.receive())['payload'], {'data': {'commentAdded': {'content': "Ship it"}}}
+        )
+        await self.disconnect()
+
+    async def test_other_tenant_is_rejected(self):
+        await self.connect()
+        await self.send({'id': '1', 'type': 'subscribe', 'payload': {
+            'query': f'subscription {{ taskChanged(organizationSlug: "globex", projectId: {self.project.id}) {{ action }} }}'
+        }})
+        message = await self.receive()
+        self.assertEqual(message['type'], 'error')
+        self.assertEqual(message['payload'][0]['message'], "Project not found in this organization")
+        await self.disconnect()
+
+
+class BenchmarkBudgetTests(ForgetOrganizationIds, TestCase):
+    """Every operation in benchmarks/cases.py stays within its query-count budget."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_scale', organizations=3, projects=3, tasks=8, comments=2, seed=1, stdout=StringIO())
+
+    def test_every_field_has_a_case(self):
+        from benchmarks.suite import missing_cases
+        self.assertEqual(missing_cases(), [])
+
+    def test_budgets(self):
+        from benchmarks.cases import CASES, pick_fixtures
+        from benchmarks.suite import run_case
+
+        view = GraphQLView.as_view()
+        fixtures = pick_fixtures()
+        # benchmarks.suite measures warm workers, with the slug resolved
+        tenants.organization_id(fixtures['slug'])
+        for case in CASES:
+            with self.subTest(case.name):
+                _, counts, errors = run_case(view, case, fixtures)
+                self.assertEqual(errors, [])
+                self.assertLessEqual(counts.queries, case.budget)
+
+
+class SingleStatementWriteTests(ForgetOrganizationIds, TestCase):
+    """Update and delete mutations guard the tenant in the write itself and keep the counters exact."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        cls.globex = Organization.objects.create(name="Globex", slug="globex", contact_email="admin@globex.com")
+        cls.project = Project.objects.create(organization=cls.acme, name="Launch")
+        cls.task = Task.objects.create(project=cls.project, title="Draft", status='TODO')
+        TaskComment.objects.create(task=cls.task, content="Note", author_email="dev@acme.com")
+        ProjectTaskStats.rebuild()
+
+    def setUp(self):
+        super().setUp()
+        # Count the writes alone: the slugs are already resolved to ids
+        for slug in ('acme', 'globex'):
+            tenants.organization_id(slug)
+
+    def execute(self, query, **variables):
+        with CaptureQueriesContext(connection) as ctx:
+            result = schema.execute(query, variable_values=variables, context_value=RequestFactory().post('/graphql/'))
+        self.assertIsNone(result.errors)
+        queries = [query for query in ctx.captured_queries if 'SAVEPOINT' not in query['sql']]
+        return result.data, len(queries)
+
+    def update_task(self, slug, **fields):
+        arguments = ', '.join(f'{name}: {json.dumps(value)}' for name, value in fields.items())
+        data, queries = self.execute(
+            f'mutation ($id: ID!) {{ updateTask(id: $id, organizationSlug: "{slug}", {arguments}) '
+            '{ success task { title status project { name } } } }',
+            id=self.task.id
+        )
+        return data['updateTask'], queries
+
+    def stats(self):
+        return ProjectTaskStats.objects.values(*ProjectTaskStats.COUNTER_FIELDS).get(project=self.project)
+
+    def test_update_task(self):
+        result, queries = self.update_task('acme', title="Final")
+        self.assertEqual(result['task'], {'title': "Final", 'status': 'TODO', 'project': {'name': "Launch"}})
+        # The UPDATE, then the project for the response
+        self.assertEqual(queries, 2)
+
+        result, queries = self.update_task('acme', status="DONE")
+        self.assertEqual(result['task']['status'], 'DONE')
+        self.assertEqual(self.stats(), ProjectTaskStats.compute([self.project.id])[self.project.id])
+
+        result, _ = self.update_task('globex', title="Hijacked")
+        self.assertFalse(result['success'])
+        result, _ = self.update_task('globex', status="TODO")
+        self.assertFalse(result['success'])
+        self.assertEqual(Task.objects.get(id=self.task.id).title, "Final")
+
+    def test_delete_task(self):
+        mutation = 'mutation ($id: ID!, $slug: String!) { deleteTask(id: $id, organizationSlug: $slug) { success } }'
+        data, _ = self.execute(mutation, id=self.task.id, slug='globex')
+        self.assertFalse(data['deleteTask']['success'])
+        data, queries = self.execute(mutation, id=self.task.id, slug='acme')
+        self.assertTrue(data['deleteTask']['success'])
+        self.assertEqual(queries, 3)
+        self.assertFalse(TaskComment.objects.exists())
+        self.assertEqual(self.stats(), {field: 0 for field in ProjectTaskStats.COUNTER_FIELDS})
+
+    def test_delete_organization(self):
+        data, _ = self.execute(
+            'mutation ($id: ID!) { deleteOrganization(id: $id) { success message } }', id=self.acme.id
+        )
+        self.assertEqual(data['deleteOrganization']['message'], "Organization 'Acme' deleted successfully")
+        self.assertEqual(list(Organization.all_objects.values_list('slug', flat=True)), ['globex'])
+        for model in (Project, Task, TaskComment, ProjectTaskStats):
+            self.assertFalse(model._base_manager.exists())
+
+    def test_slugs_are_unique(self):
+        data, queries = self.execute(
+            'mutation { createOrganization(name: "Acme 2", slug: "acme", contactEmail: "a@acme.com") '
+            '{ success errors { field message } } }'
+        )
+        self.assertEqual(data['createOrganization'], {
+            'success': False, 'errors': [{'field': 'slug', 'message': "Organization with this slug already exists"}]
+        })
+        self.assertEqual(queries, 1)
+
+        mutation = 'mutation ($id: ID!, $slug: String!) { updateOrganization(id: $id, slug: $slug) ' \
+            '{ success errors { field } organization { slug } } }'
+        data, _ = self.execute(mutation, id=self.globex.id, slug='acme')
+        self.assertEqual(data['updateOrganization']['errors'], [{'field': 'slug'}])
+        data, _ = self.execute(mutation, id=self.globex.id, slug='initech')
+        self.assertEqual(data['updateOrganization']['organization'], {'slug': 'initech'})
+
+
+class OptimisticConcurrencyTests(ForgetOrganizationIds, TestCase):
+    """Updates with expectedVersion are compare-and-swap; a stale version is a conflict, not a lost update."""
+
+    @classmethod
+    def setUpTestData(cls):
+        organization = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        cls.project = Project.objects.create(organization=organization, name="Launch")
+        cls.task = Task.objects.create(project=cls.project, title="Draft", status='TODO')
+        ProjectTaskStats.rebuild()
+
+    def execute(self, query, **variables):
+        result = schema.execute(query, variable_values=variables, context_value=RequestFactory().post('/graphql/'))
+        self.assertIsNone(result.errors)
+        return result.data
+
+    def update_task(self, **arguments):
+        return self.execute(
+            'mutation ($id: ID!, $title: String, $status: String, $version: Int) { '
+            'updateTask(id: $id, organizationSlug: "acme", title: $title, status: $status, expectedVersion: $version) '
+            '{ success message errors { field } task { title status version } } }',
+            id=self.task.id, **arguments
+        )['updateTask']
+
+    def test_update_task(self):
+        result = self.update_task(title="Final", version=1)
+        self.assertEqual(result['task'], {'title': "Final", 'status': 'TODO', 'version': 2})
+
+        # A client still holding version 1 doesn't overwrite the change
+        result = self.update_task(title="Stale", status="DONE", version=1)
+        self.assertEqual(result['message'], "Version conflict")
+        self.assertEqual(result['errors'], [{'field': 'expected_version'}])
+        self.assertEqual(Task.objects.values_list('title', 'status').get(id=self.task.id), ("Final", 'TODO'))
+
+        result = self.update_task(status="DONE", version=2)
+        self.assertEqual(result['task']['version'], 3)
+        self.assertEqual(ProjectTaskStats.objects.get(project=self.project).completed_tasks, 1)
+
+    def test_status_change_retries_after_concurrent_update(self):
+        update_returning = writes.update_returning
+        attempts = []
+
+        def racing(queryset, **values):
+            if not attempts:
+                # Another request moves the task on between the read and the update
+                Task.objects.filter(id=self.task.id).update(status='IN_PROGRESS', version=F('version') + 1)
+                ProjectTaskStats.apply(self.project.id, todo_tasks=-1, in_progress_tasks=1)
+            attempts.append(values)
+            return update_returning(queryset, **values)
+
+        with mock.patch('config.schema.update_returning', racing):
+            result = self.update_task(status="DONE")
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(result['task'], {'title': "Draft", 'status': 'DONE', 'version': 3})
+        self.assertEqual(
+            ProjectTaskStats.objects.values(*ProjectTaskStats.COUNTER_FIELDS).get(project=self.project),
+            ProjectTaskStats.compute([self.project.id])[self.project.id]
+        )
+
+    def test_update_project(self):
+        mutation = (
+            'mutation ($id: ID!, $slug: String!, $version: Int) { updateProject(id: $id, organizationSlug: $slug, '
+            'name: "Renamed", expectedVersion: $version) { success message project { version } } }'
+        )
+        data = self.execute(mutation, id=self.project.id, slug='acme', version=1)
+        self.assertEqual(data['updateProject']['project'], {'version': 2})
+        data = self.execute(mutation, id=self.project.id, slug='acme', version=1)
+        self.assertEqual(data['updateProject']['message'], "Version conflict")
+        data = self.execute(mutation, id=self.project.id, slug='globex', version=2)
+        self.assertEqual(data['updateProject']['message'], "Project not found")
+
+    def test_bulk_update(self):
+        mutation = (
+            'mutation ($tasks: [TaskUpdateInput!]!) { bulkUpdateTasks(organizationSlug: "acme", tasks: $tasks) '
+            '{ success errors { field } tasks { version } } }'
+        )
+        data = self.execute(mutation, tasks=[{'id': self.task.id, 'title': "Bulk", 'expectedVersion': 1}])
+        self.assertEqual(data['bulkUpdateTasks']['tasks'], [{'version': 2}])
+        data = self.execute(mutation, tasks=[{'id': self.task.id, 'title': "Stale", 'expectedVersion': 1}])
+        self.assertEqual(data['bulkUpdateTasks']['errors'], [{'field': 'tasks[0].expected_version'}])
+
+
+class TaskStatsCounterTests(ForgetOrganizationIds, TestCase):
+    """Stored ProjectTaskStats always equal a fresh count, and rebuild_task_stats repairs them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        acme = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        cls.launch = Project.objects.create(organization=acme, name="Launch")
+        cls.docs = Project.objects.create(organization=acme, name="Docs")
+        cls.task = Task.objects.create(project=cls.launch, title="Draft", status='IN_PROGRESS')
+        TaskComment.objects.create(task=cls.task, content="Note", author_email="dev@acme.com")
+        ProjectTaskStats.rebuild()
+
+    def execute(self, mutation, **variables):
+        result = schema.execute(mutation, variable_values=variables, context_value=RequestFactory().post('/graphql/'))
+        self.assertIsNone(result.errors)
+        data, = result.data.values()
+        self.assertTrue(data['success'])
+        return data
+
+    def stored(self):
+        return {
+            row.pop('project_id'): row
+            for row in ProjectTaskStats.objects.values('project_id', *ProjectTaskStats.COUNTER_FIELDS)
+        }
+
+    def assertCountersExact(self):
+        self.assertEqual(self.stored(), ProjectTaskStats.compute())
+
+    def test_mutations_keep_counters_exact(self):
+        created = self.execute(
+            'mutation ($projectId: Int!) { createTask(organizationSlug: "acme", projectId: $projectId, '
+            'title: "Review", status: "TODO") { success task { id } } }',
+            projectId=self.launch.id
+        )
+        task_id = created['task']['id']
+        self.assertCountersExact()
+
+        for status in ('IN_PROGRESS', 'DONE', 'DONE', 'TODO'):
+            self.execute(
+                f'mutation ($id: ID!) {{ updateTask(id: $id, organizationSlug: "acme", status: "{status}") '
+                '{ success } }',
+                id=task_id
+            )
+            self.assertCountersExact()
+
+        for task in (task_id, self.task.id):
+            self.execute(
+                'mutation ($taskId: Int!) { addComment(organizationSlug: "acme", taskId: $taskId, '
+                'content: "Looks good", authorEmail: "qa@acme.com") { success } }',
+                taskId=int(task)
+            )
+            self.assertCountersExact()
+
+        for task in (task_id, self.task.id):
+            self.execute('mutation ($id: ID!) { deleteTask(id: $id, organizationSlug: "acme") { success } }', id=task)
+            self.assertCountersExact()
+        self.assertEqual(self.stored()[self.launch.id], dict.fromkeys(ProjectTaskStats.COUNTER_FIELDS, 0))
+
+    def test_first_task_creates_counters(self):
+        ProjectTaskStats.objects.filter(project=self.docs).delete()
+        self.execute(
+            'mutation ($projectId: Int!) { createTask(organizationSlug: "acme", projectId: $projectId, '
+            'title: "Outline", status: "DONE") { success } }',
+            projectId=self.docs.id
+        )
+        self.assertCountersExact()
+        self.assertEqual(self.stored()[self.docs.id]['completed_tasks'], 1)
+
+    def test_rebuild_repairs_drift(self):
+        ProjectTaskStats.objects.filter(project=self.launch).update(total_tasks=5, in_progress_tasks=0, total_comments=9)
+        ProjectTaskStats.objects.filter(project=self.docs).delete()
+
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "2 of 2 projects have drifted counters."):
+            call_command('rebuild_task_stats', '--verify', stdout=out)
+        self.assertIn(f"Project {self.launch.id}: total_tasks stored=5 actual=1", out.getvalue())
+        self.assertIn(f"Project {self.docs.id}: counters missing", out.getvalue())
+
+        call_command('rebuild_task_stats', '--project', str(self.launch.id), stdout=StringIO())
+        self.assertEqual(self.stored(), {self.launch.id: ProjectTaskStats.compute()[self.launch.id]})
+
+        out = StringIO()
+        call_command('rebuild_task_stats', stdout=out)
+        self.assertIn("Rebuilt counters for 2 projects.", out.getvalue())
+        self.assertCountersExact()
+        call_command('rebuild_task_stats', '--verify', stdout=StringIO())
+
+
+class ExportTests(ForgetOrganizationIds, TestCase):
+    """/export/ streams an organization's rows as CSV or NDJSON."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        cls.project = Project.objects.create(organization=cls.organization, name="Launch")
+        other_project = Project.objects.create(organization=cls.organization, name="Ops")
+        cls.tasks = Task.objects.bulk_create(
+            Task(project=cls.project, title=f"Task, \"{n}\"", status='DONE' if n % 2 else 'TODO') for n in range(5)
+        )
+        Task.objects.create(project=other_project, title="Other project")
+        TaskComment.objects.create(task=cls.tasks[0], content="Line one\nline two", author_email="dev@acme.com")
+        other = Organization.objects.create(name="Other", slug="other", contact_email="admin@other.com")
+        cls.other_project = Project.objects.create(organization=other, name="Secret")
+        Task.objects.create(project=cls.other_project, title="Secret")
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_csv(self):
+        response = self.client.get('/export/acme/tasks.csv', {'project': self.project.id})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('acme-tasks.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual([row['title'] for row in rows], [task.title for task in self.tasks])
+        self.assertEqual(rows[0]['project'], "Launch")
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_ndjson(self):
+        response = self.client.get('/export/acme/tasks.ndjson', {'status': 'done'})
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [task.id for task in self.tasks if task.status == 'DONE'])
+
+        response = self.client.get('/export/acme/comments.ndjson')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(rows[0]['content'], "Line one\nline two")
+        self.assertEqual(rows[0]['project_id'], self.project.id)
+
+    def test_tenant_isolation_and_validation(self):
+        titles = self.read(self.client.get('/export/acme/tasks.csv'))
+        self.assertIn("Other project", titles)
+        self.assertNotIn("Secret", titles)
+        self.assertEqual(self.client.get('/export/missing/tasks.csv').status_code, 404)
+        self.assertEqual(
+            self.client.get('/export/acme/tasks.csv', {'project': self.other_project.id}).status_code, 404
+        )
+        self.assertEqual(self.client.get('/export/acme/tasks.csv', {'status': 'LATE'}).status_code, 400)
+
+    async def test_asgi_streams_without_buffering(self):
+        response = await self.async_client.get('/export/acme/tasks.ndjson')
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).splitlines()
+        self.assertEqual(len(lines), 6)
+
+
+@override_settings(IMPORT_AUTH_TOKEN='secret')
+class ImportEndpointTests(ForgetOrganizationIds, TestCase):
+    """POST /import/ streams an uploaded file into the organization."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        cls.project = Project.objects.create(organization=cls.organization, name="Launch")
+
+    def post(self, body, url='/import/acme/tasks.ndjson', token='secret'):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return self.client.post(url, body, content_type='application/x-ndjson', headers=headers)
+
+    def test_import(self):
+        body = "".join(json.dumps(row) + "\n" for row in [
+            {'project_id': self.project.id, 'title': "One", 'comments': [{'content': "Hi", 'author_email': "a@acme.com"}]},
+            {'project_id': self.project.id, 'title': "Two", 'status': "blocked"},
+            {'project': "Launch", 'title': "Three"},
+        ])
+        response = self.post(body)
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report['processed'], report['tasks'], report['comments'], report['error_count']), (3, 2, 1, 1))
+        self.assertEqual(report['errors'][0]['row'], 2)
+        self.assertEqual(self.project.task_stats.total_tasks, 2)
+
+        # Resuming skips the rows already processed
+        response = self.post(body, url='/import/acme/tasks.ndjson?skip=2')
+        self.assertEqual(response.json()['tasks'], 1)
+        self.assertEqual(Task.objects.filter(title="Three").count(), 2)
+
+    def test_csv_header_and_auth(self):
+        self.assertEqual(self.post("title\n", token=None).status_code, 401)
+        self.assertEqual(self.post("title\n", token='wrong').status_code, 401)
+        with override_settings(IMPORT_AUTH_TOKEN=None):
+            self.assertEqual(self.post("title\n").status_code, 403)
+        self.assertEqual(self.post("title\n", url='/import/missing/tasks.csv').status_code, 404)
+        self.assertEqual(self.post("name\nOops\n", url='/import/acme/tasks.csv').status_code, 400)
+        self.assertFalse(Task.objects.exists())
+
+
+class BatchWriterTests(ForgetOrganizationIds, TestCase):
+    """COPY rows go through psycopg's write_row(), which escapes every value."""
+
+    def test_copy_writes_rows_unformatted(self):
+        raw = mock.MagicMock()
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.cursor = raw
+        writer = BatchWriter(TaskComment, ['task', 'content', 'author_email'], use_copy=True)
+        writer.add(1, "\\N", "dev@acme.com")
+        writer.add(2, "a,\"b\"\tc", None)
+        with mock.patch.object(connection, 'cursor', return_value=cursor):
+            writer.flush()
+        sql, = raw.copy.call_args.args
+        self.assertEqual(
+            sql, 'COPY "task_comments_taskcomment" ("task_id", "content", "author_email") FROM STDIN'
+        )
+        copy = raw.copy.return_value.__enter__.return_value
+        self.assertEqual(copy.write_row.call_args_list, [
+            mock.call((1, "\\N", "dev@acme.com")), mock.call((2, "a,\"b\"\tc", None)),
+        ])
+        self.assertEqual(writer.written, 2)
+
+
+class BackgroundDeletionTests(ForgetOrganizationIds, TestCase):
+    """Background deletes hide their target at once and remove it in batches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        cls.project = Project.objects.create(organization=cls.organization, name="Launch")
+        cls.kept = Project.objects.create(organization=cls.organization, name="Kept")
+        past = timezone.now() - timedelta(days=1)
+        for project in (cls.project, cls.kept):
+            tasks = Task.objects.bulk_create(
+                Task(project=project, title=f"{project.name} {n}", due_date=past) for n in range(5)
+            )
+            TaskComment.objects.bulk_create(
+                TaskComment(task=task, content="Note", author_email="dev@acme.com") for task in tasks
+            )
+        cls.task = Task.objects.filter(project=cls.project).first()
+        ProjectTaskStats.rebuild()
+
+    def execute(self, query, **variables):
+        result = schema.execute(query, variable_values=variables, context_value=RequestFactory().post('/graphql/'))
+        self.assertIsNone(result.errors)
+        return result.data
+
+    def visible(self):
+        return self.execute(
+            """query ($projectId: Int!, $taskId: Int!) {
+                organization(slug: "acme") { projects { name } stats { totalProjects totalTasks } }
+                project(id: $projectId, organizationSlug: "acme") { name }
+                task(id: $taskId, organizationSlug: "acme") { title }
+                overdueTasks(organizationSlug: "acme") { totalCount }
+                commentsByTask(taskId: $taskId, organizationSlug: "acme") { totalCount }
+            }""",
+            projectId=self.project.id, taskId=self.task.id
+        )
+
+    def job(self, job_id):
+        return self.execute(
+            'query ($id: Int!) { deletionJob(id: $id, organizationSlug: "acme") '
+            '{ status progress totalTasks totalComments deletedTasks deletedComments deletedProjects } }',
+            id=job_id
+        )['deletionJob']
+
+    def test_project(self):
+        result = self.execute(
+            'mutation ($id: ID!) { deleteProject(id: $id, organizationSlug: "acme", background: true) '
+            '{ success deletionJob { id status } } }',
+            id=self.project.id
+        )['deleteProject']
+        self.assertTrue(result['success'])
+        self.assertEqual(result['deletionJob']['status'], 'PENDING')
+        job_id = int(result['deletionJob']['id'])
+
+        data = self.visible()
+        self.assertEqual(data['organization']['projects'], [{'name': "Kept"}])
+        self.assertEqual(data['organization']['stats'], {'totalProjects': 1, 'totalTasks': 5})
+        self.assertIsNone(data['project'])
+        self.assertIsNone(data['task'])
+        self.assertEqual(data['overdueTasks']['totalCount'], 5)
+        self.assertEqual(data['commentsByTask']['totalCount'], 0)
+        # Nor can it be written to
+        result = self.execute(
+            'mutation ($id: Int!) { addComment(organizationSlug: "acme", taskId: $id, content: "x", '
+            'authorEmail: "a@acme.com") { success } }', id=self.task.id
+        )
+        self.assertFalse(result['addComment']['success'])
+
+        self.assertEqual(self.job(job_id)['progress'], 0)
+        with CaptureQueriesContext(connection) as ctx:
+            run_job(DeletionJob.objects.get(id=job_id), batch_size=2)
+        # Comments and tasks go three batches each, at most two rows at a time
+        deletes = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith('DELETE')]
+        self.assertGreaterEqual(len(deletes), 6)
+
+        self.assertEqual(self.job(job_id), {
+            'status': 'DONE', 'progress': 100.0, 'totalTasks': 5, 'totalComments': 5,
+            'deletedTasks': 5, 'deletedComments': 5, 'deletedProjects': 1,
+        })
+        self.assertFalse(Project.all_objects.filter(id=self.project.id).exists())
+        self.assertEqual(Task.objects.filter(project=self.kept).count(), 5)
+
+    def test_organization(self):
+        result = self.execute(
+            'mutation ($id: ID!) { deleteOrganization(id: $id, background: true) { success deletionJob { id } } }',
+            id=self.organization.id
+        )['deleteOrganization']
+        job_id = int(result['deletionJob']['id'])
+
+        data = self.visible()
+        self.assertIsNone(data['organization'])
+        self.assertEqual(data['overdueTasks']['totalCount'], 0)
+        self.assertEqual(self.execute('{ allOrganizations { totalCount } }')['allOrganizations']['totalCount'], 0)
+        # The slug stays taken until the data is gone
+        result = self.execute(
+            'mutation { createOrganization(name: "Acme", slug: "acme", contactEmail: "a@acme.com") { success } }'
+        )
+        self.assertFalse(result['createOrganization']['success'])
+
+        call_command('process_deletions', once=True, batch_size=3, stdout=StringIO())
+        job = self.job(job_id)
+        self.assertEqual((job['status'], job['deletedProjects'], job['deletedTasks']), ('DONE', 2, 10))
+        self.assertFalse(Organization.all_objects.exists() or Task.objects.exists() or TaskComment.objects.exists())
+
+
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReadReplicaTests(ForgetOrganizationIds, TestCase):
+    """Queries read from a replica, except for organizations that just wrote."""
+
+    query = 'query ($slug: String!) { projectsByOrganization(organizationSlug: $slug) { totalCount } }'
+
+    @classmethod
+    def setUpTestData(cls):
+        for slug in ('acme', 'globex'):
+            Organization.objects.create(name=slug.title(), slug=slug, contact_email=f"admin@{slug}.com")
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        routers._health.clear()
+        # Slugs are always resolved on the primary; only the operation's own reads go to a replica
+        for slug in ('acme', 'globex'):
+            tenants.organization_id(slug)
+
+    def reads(self, query, **variables):
+        """Databases the router picked for the operation's reads; None is the primary."""
+        picked = []
+        db_for_read = routers.PrimaryReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            picked.append(db_for_read(router, model, **hints))
+            return picked[-1]
+
+        with mock.patch.object(routers.PrimaryReplicaRouter, 'db_for_read', record):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    '/graphql/', json.dumps({'query': query, 'variables': variables}),
+                    content_type='application/json'
+                )
+        self.assertNotIn('errors', response.json())
+        return set(picked)
+
+    def test_queries_use_replica(self):
+        # The test database stands in for the replica
+        self.assertEqual(self.reads(self.query, slug='acme'), {'default'})
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.reads(self.query, slug='acme'), {None})
+
+    def test_write_pins_its_organization_to_primary(self):
+        self.assertNotIn('default', self.reads(
+            'mutation { createProject(organizationSlug: "acme", name: "Launch") { success } }'
+        ))
+        self.assertEqual(self.reads(self.query, slug='acme'), {None})
+        self.assertEqual(self.reads(self.query, slug='globex'), {'default'})
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        with override_settings(DATABASE_REPLICAS=['missing']), self.assertLogs('config.routers', 'WARNING'):
+            self.assertIsNone(routers.replica_for({'acme'}))
+            self.assertEqual(self.reads(self.query, slug='acme'), {None})
+        self.assertFalse(routers._health['missing'][1])
+
+    def test_failed_replica_query_is_retried_on_primary(self):
+        def unreachable(router, model, **hints):
+            if routers.current_replica.get() is not None:
+                raise OperationalError("server closed the connection unexpectedly")
+
+        with mock.patch.object(routers.PrimaryReplicaRouter, 'db_for_read', unreachable), \
+                self.assertLogs('config.routers', 'WARNING'):
+            response = self.client.post(
+                '/graphql/', json.dumps({'query': self.query, 'variables': {'slug': 'acme'}}),
+                content_type='application/json'
+            )
+        self.assertEqual(response.json()['data'], {'projectsByOrganization': {'totalCount': 0}})
+        self.assertFalse(routers.is_healthy('default'))
+
+
+class OrganizationIdCacheTests(ForgetOrganizationIds, TestCase):
+    """Slugs are resolved to ids once, and forgotten when organizations are renamed or deleted."""
+
+    query = 'query ($slug: String!) { projectsByOrganization(organizationSlug: $slug) { edges { node { name } } } }'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        Project.objects.create(organization=cls.acme, name="Launch")
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def project_names(self, slug):
+        with CaptureQueriesContext(connection) as ctx:
+            result = schema.execute(
+                self.query, variable_values={'slug': slug}, context_value=RequestFactory().post('/graphql/')
+            )
+        self.assertIsNone(result.errors)
+        names = [edge['node']['name'] for edge in result.data['projectsByOrganization']['edges']]
+        return names, [query['sql'] for query in ctx.captured_queries]
+
+    def execute(self, mutation, **variables):
+        # Other processes are told on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            result = schema.execute(
+                mutation, variable_values=variables, context_value=RequestFactory().post('/graphql/')
+            )
+        self.assertIsNone(result.errors)
+
+    def test_slug_is_resolved_once(self):
+        names, queries = self.project_names('acme')
+        self.assertEqual((names, len(queries)), (['Launch'], 2))
+        names, queries = self.project_names('acme')
+        self.assertEqual((names, len(queries)), (['Launch'], 1))
+        self.assertNotIn('organizations_organization', queries[0])
+
+    def test_unknown_slug_is_not_cached(self):
+        for _ in range(2):
+            self.assertEqual(self.project_names('initech'), ([], [mock.ANY]))
+
+    def test_rename_forgets_old_slug(self):
+        self.project_names('acme')
+        self.execute(
+            'mutation ($id: ID!) { updateOrganization(id: $id, slug: "acme-corp") { success } }', id=self.acme.id
+        )
+        self.assertEqual(self.project_names('acme')[0], [])
+        self.assertEqual(self.project_names('acme-corp')[0], ['Launch'])
+
+        # A new organization may take the freed slug
+        self.execute(
+            'mutation { createOrganization(name: "New", slug: "acme", contactEmail: "a@new.com") { success } }'
+        )
+        self.assertEqual(self.project_names('acme')[0], [])
+
+    def test_delete_forgets_slug(self):
+        for background in (True, False):
+            with self.subTest(background=background):
+                self.project_names('acme')
+                self.execute(
+                    'mutation ($id: ID!, $background: Boolean) '
+                    '{ deleteOrganization(id: $id, background: $background) { success } }',
+                    id=self.acme.id, background=background
+                )
+                self.assertIsNone(tenants.organization_id('acme'))
+                Organization.all_objects.filter(pk=self.acme.pk).update(deletion_requested_at=None)
+
+    def test_other_process_invalidation(self):
+        self.assertEqual(tenants.organization_id('acme'), self.acme.id)
+        # Another worker renamed an organization and bumped the generation
+        Organization.objects.filter(pk=self.acme.pk).update(slug='acme-corp')
+        cache.set(tenants.GENERATION_KEY, 1, timeout=None)
+        with self.assertNumQueries(0):
+            # Not noticed until the next sync
+            self.assertEqual(tenants.organization_id('acme'), self.acme.id)
+        with override_settings(ORGANIZATION_ID_CACHE_SYNC_INTERVAL=0):
+            self.assertIsNone(tenants.organization_id('acme'))
+
+    def test_entries_expire(self):
+        with mock.patch.object(tenants.organization_ids, 'timeout', 0):
+            tenants.organization_id('acme')
+        with self.assertNumQueries(1):
+            tenants.organization_id('acme')
+
+    def test_least_recently_used_is_evicted(self):
+        Organization.objects.create(name="Globex", slug="globex", contact_email="admin@globex.com")
+        with mock.patch.object(tenants.organization_ids, 'max_size', 1):
+            tenants.organization_id('acme')
+            tenants.organization_id('globex')
+        with self.assertNumQueries(0):
+            tenants.organization_id('globex')
+        with self.assertNumQueries(1):
+            tenants.organization_id('acme')
@@ -0,0 +1,185 @@
+"""
+Per-operation SQL and resolver instrumentation.
+
+While an operation is traced, every SQL statement run on its behalf (in the
+request thread, or in ``sync_to_async`` worker threads for the async view)
+is recorded by a database execute wrapper, and ``TracingMiddleware`` times
+every field resolver. The result is:
+
+- returned under ``extensions.tracing`` when the request carries the
+  ``X-GraphQL-Trace`` header (honoured with ``DEBUG`` on, or when it equals
+  ``GRAPHQL_TRACING_TOKEN``);
+- logged as one JSON object on the ``config.tracing`` logger when the
+  operation took longer than ``GRAPHQL_SLOW_OPERATION_THRESHOLD`` seconds.
+
+Operations that are neither requested nor eligible for the slow log are not
+traced at all.
+"""
+import hmac
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from inspect import isawaitable
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger(__name__)
+
+TRACE_HEADER = 'HTTP_X_GRAPHQL_TRACE'
+
+# Resolver timings kept in a trace; the slowest are kept beyond this
+MAX_RESOLVERS = 200
+
+current_trace = ContextVar('graphql_trace', default=None)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+class OperationTrace:
+    """SQL statements and resolver timings recorded for one GraphQL operation."""
+
+    def __init__(self, exposed=False):
+        self.exposed = exposed
+        self.operation_name = None
+        self.started = time.perf_counter()
+        self.duration = None
+        self.queries = []
+        self.resolvers = []
+
+    def record_query(self, sql, duration):
+        # list.append is atomic, so worker threads can record without a lock
+        self.queries.append((sql, duration))
+
+    def record_resolver(self, info, start, duration):
+        self.resolvers.append((info.path.as_list(), info.parent_type.name, info.field_name, start, duration))
+
+    def finish(self, operation_name=None):
+        self.operation_name = operation_name
+        self.duration = time.perf_counter() - self.started
+
+    def as_dict(self):
+        statements = Counter(sql for sql, _ in self.queries)
+        resolvers = sorted(self.resolvers, key=lambda resolver: resolver[4], reverse=True)[:MAX_RESOLVERS]
+        return {
+            'operationName': self.operation_name,
+            'durationMs': _ms(self.duration or 0),
+            'sql': {
+                'count': len(self.queries),
+                'durationMs': _ms(sum(duration for _, duration in self.queries)),
+                'duplicates': [
+                    {'sql': sql, 'count': count}
+                    for sql, count in statements.most_common() if count > 1
+                ],
+            },
+            'resolvers': [
+                {
+                    'path': path,
+                    'parentType': parent_type,
+                    'fieldName': field_name,
+                    'startOffsetMs': _ms(start - self.started),
+                    'durationMs': _ms(duration),
+                }
+                for path, parent_type, field_name, start, duration in sorted(resolvers, key=lambda r: r[3])
+            ],
+        }
+
+
+# ==================== STARTING AND FINISHING ====================
+
+def is_requested(request):
+    """Whether the client asked for ``extensions.tracing`` and may see it."""
+    value = request.META.get(TRACE_HEADER)
+    if not value:
+        return False
+    if settings.DEBUG:
+        return True
+    token = getattr(settings, 'GRAPHQL_TRACING_TOKEN', None)
+    return bool(token) and hmac.compare_digest(value.encode(), token.encode())
+
+
+def get_slow_threshold():
+    return getattr(settings, 'GRAPHQL_SLOW_OPERATION_THRESHOLD', None)
+
+
+def start(request):
+    """
+    Start tracing the operation ``request`` is about to run, if needed.
+    Returns ``(trace, token)``; pass the token to ``stop``.
+    """
+    requested = is_requested(request)
+    if not requested and get_slow_threshold() is None:
+        return None, None
+    trace = OperationTrace(exposed=requested)
+    return trace, current_trace.set(trace)
+
+
+def stop(trace, token, operation_name=None):
+    """Finish ``trace`` and log it if the operation was slow."""
+    if trace is None:
+        return
+    current_trace.reset(token)
+    trace.finish(operation_name)
+    threshold = get_slow_threshold()
+    if threshold is not None and trace.duration >= threshold:
+        logger.warning(json.dumps({'event': 'slow_graphql_operation', **trace.as_dict()}))
+
+
+# ==================== DATABASE ====================
+
+def record_queries(execute, sql, params, many, context):
+    trace = current_trace.get()
+    if trace is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        trace.record_query(sql, time.perf_counter() - start)
+
+
+def install_query_recorder(connection):
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+def install_query_recorders():
+    """Add the execute wrapper to this thread's open connections (new ones get it on creation)."""
+    for alias in connections:
+        install_query_recorder(connections[alias])
+
+
+def _connection_created(sender, connection, **kwargs):
+    install_query_recorder(connection)
+
+
+connection_created.connect(_connection_created, dispatch_uid='config.tracing')
+
+
+# ==================== RESOLVERS ====================
+
+class TracingMiddleware:
+    """Graphene middleware timing every resolver of a traced operation."""
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def resolve(self, next, root, info, **args):
+        start = time.perf_counter()
+        result = next(root, info, **args)
+        if isawaitable(result):
+            return self._resolve_async(result, info, start)
+        self.trace.record_resolver(info, start, time.perf_counter() - start)
+        return result
+
+    async def _resolve_async(self, result, info, start):
+        try:
+            return await result
+        finally:
+            self.trace.record_resolver(info, start, time.perf_counter() - start)
@@ -1,9 +1,20 @@
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 from django.views.decorators.csrf import csrf_exempt
-from graphene_django.views import GraphQLView
+
+from .export import export_comments, export_tasks
+from .imports import import_tasks_view
+from .metrics import metrics_view
+from .views import AsyncGraphQLView, GraphQLView
+
+graphql_view = AsyncGraphQLView if settings.GRAPHQL_ASYNC else GraphQLView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path("graphql/", csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path("graphql/", csrf_exempt(graphql_view.as_view(graphiql=True))),
+    path("metrics", metrics_view),
+    re_path(r"^export/(?P<org_slug>[-\w]+)/tasks\.(?P<format>csv|ndjson)$", export_tasks),
+    re_path(r"^export/(?P<org_slug>[-\w]+)/comments\.(?P<format>csv|ndjson)$", export_comments),
+    re_path(r"^import/(?P<org_slug>[-\w]+)/tasks\.(?P<format>csv|ndjson)$", import_tasks_view),
 ]
@@ -0,0 +1,517 @@
+"""
+GraphQL endpoint for the API.
+
+Extends graphene-django's ``GraphQLView`` with:
+
+- an LRU cache of parsed and validated documents keyed by the SHA-256 of the
+  query text, so the handful of operations the frontend sends are parsed and
+  validated once per process instead of on every request;
+- Automatic Persisted Queries (APQ): clients may send only
+  ``extensions.persistedQuery.sha256Hash`` and fall back to sending the full
+  query once when the server answers ``PersistedQueryNotFound``;
+- the opt-in, tenant-scoped result cache in ``config.response_cache``;
+- per-request query cost and depth limits (``config.query_cost``), with the
+  estimate reported in the response's ``extensions.cost``;
+- SQL and resolver tracing (``config.tracing``) under ``extensions.tracing``
+  and in the slow-operation log;
+- Prometheus metrics (``config.metrics``) for every operation;
+- queries on read replicas, with read-your-writes (``config.routers``).
+
+``AsyncGraphQLView`` serves the same schema on graphql-core's async executor
+for deployments running ``config.asgi`` under an ASGI server.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.http.response import HttpResponseBadRequest
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
+from graphene_django.views import GraphQLView as BaseGraphQLView, HttpError
+from graphql import ExecutionResult, OperationType, execute, get_operation_ast, parse, validate_schema
+from graphql.execution.middleware import MiddlewareManager
+from graphql.error import GraphQLError
+from graphql.validation import validate
+
+from . import metrics, query_cost, response_cache, routers, tenants, tracing
+from .loaders import AsyncRequestLoaders
+
+
+PERSISTED_QUERY_CACHE_PREFIX = 'graphql:apq:'
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+class DocumentCache:
+    """
+    Thread-safe LRU of ``sha256 -> (document, validation errors)``.
+
+    Bounded by entry count and by the total length of the cached query texts:
+    a parsed document takes about a hundred times the memory of its text, so
+    a few hundred large queries could otherwise pin hundreds of MB. A query
+    longer than the whole budget isn't cached.
+    """
+
+    def __init__(self, max_size, max_query_size):
+        self.max_size = max_size
+        self.max_query_size = max_query_size
+        self.query_size = 0
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            cached = self._documents.get(key)
+            if cached is None:
+                return None
+            self._documents.move_to_end(key)
+            return cached[0]
+
+    def set(self, key, entry, query_size):
+        if self.max_size <= 0 or query_size > self.max_query_size:
+            return
+        with self._lock:
+            previous = self._documents.pop(key, None)
+            if previous is not None:
+                self.query_size -= previous[1]
+            self._documents[key] = (entry, query_size)
+            self.query_size += query_size
+            while len(self._documents) > self.max_size or self.query_size > self.max_query_size:
+                _, (_, evicted_size) = self._documents.popitem(last=False)
+                self.query_size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+            self.query_size = 0
+
+
+document_cache = DocumentCache(
+    getattr(settings, 'GRAPHQL_DOCUMENT_CACHE_SIZE', 256),
+    getattr(settings, 'GRAPHQL_DOCUMENT_CACHE_MAX_QUERY_SIZE', 256 * 1024)
+)
+
+
+class PersistedQueryError(GraphQLError):
+    def __init__(self, message, code):
+        super().__init__(message, extensions={'code': code})
+
+
+class GraphQLView(BaseGraphQLView):
+    """GraphQL view with a parsed-document cache and Automatic Persisted Queries."""
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        stats, metrics_token = metrics.start_operation()
+        request.graphql_trace, token = tracing.start(request)
+        if request.graphql_trace is not None:
+            tracing.install_query_recorders()
+        execution_result = None
+        try:
+            execution_result = self.execute_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+
+            if getattr(request, MUTATION_ERRORS_FLAG, False) is True or (
+                execution_result and execution_result.errors
+            ):
+                set_rollback()
+        finally:
+            tracing.stop(request.graphql_trace, token, request.graphql_operation_name)
+            metrics.finish_operation(
+                stats, metrics_token, request.graphql_operation_name, request.graphql_operation_type,
+                execution_result
+            )
+
+        return self.encode_result(request, execution_result, id, show_graphiql)
+
+    def get_middleware(self, request):
+        middleware = super().get_middleware(request)
+        trace = getattr(request, 'graphql_trace', None)
+        if trace is None:
+            return middleware
+        if isinstance(middleware, MiddlewareManager):
+            middleware = middleware.middlewares
+        return [*(middleware or ()), tracing.TracingMiddleware(trace)]
+
+    def get_graphql_params(self, request, data):
+        query, variables, operation_name, id = super().get_graphql_params(request, data)
+        request.graphql_persisted_query_error = None
+        request.graphql_query_cost = None
+        request.graphql_operation_type = None
+        request.graphql_operation_name = operation_name
+        # Runs in the thread the operation's ORM calls use, for the async view too
+        metrics.install_query_counters()
+
+        extensions = request.GET.get('extensions') or data.get('extensions')
+        if extensions and isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+        persisted = (extensions or {}).get('persistedQuery')
+        if not persisted:
+            return query, variables, operation_name, id
+
+        sha256 = persisted.get('sha256Hash')
+        if persisted.get('version') != 1 or not sha256:
+            request.graphql_persisted_query_error = PersistedQueryError(
+                "Unsupported persisted query version", 'PERSISTED_QUERY_NOT_SUPPORTED'
+            )
+        elif query:
+            if query_hash(query) != sha256:
+                request.graphql_persisted_query_error = PersistedQueryError(
+                    "Provided sha does not match query", 'PERSISTED_QUERY_HASH_MISMATCH'
+                )
+            else:
+                cache.set(
+                    PERSISTED_QUERY_CACHE_PREFIX + sha256, query,
+                    getattr(settings, 'GRAPHQL_PERSISTED_QUERY_TIMEOUT', 60 * 60 * 24)
+                )
+        else:
+            query = cache.get(PERSISTED_QUERY_CACHE_PREFIX + sha256)
+            metrics.record_cache('persisted_query', query is not None)
+            if query is None:
+                request.graphql_persisted_query_error = PersistedQueryError(
+                    "PersistedQueryNotFound", 'PERSISTED_QUERY_NOT_FOUND'
+                )
+        return query, variables, operation_name, id
+
+    def get_document(self, query):
+        """Parse and validate ``query``, reusing earlier work for the same text."""
+        key = query_hash(query)
+        entry = document_cache.get(key)
+        metrics.record_cache('document', entry is not None)
+        if entry is None:
+            schema = self.schema.graphql_schema
+            try:
+                document = parse(query)
+            except GraphQLError as e:
+                # Syntax errors are cheap to reproduce and not worth a cache slot
+                return None, [e]
+            errors = validate(
+                schema,
+                document,
+                self.validation_rules,
+                graphene_settings.MAX_VALIDATION_ERRORS,
+            )
+            entry = (document, errors)
+            document_cache.set(key, entry, len(query))
+        return entry
+
+    def get_response_cache_key(self, query, operation_ast, variables, operation_name):
+        """Result cache key for a query operation, or None if it must not be cached."""
+        if not response_cache.get_timeout():
+            return None
+        if operation_ast is None or operation_ast.operation != OperationType.QUERY:
+            return None
+        scopes = response_cache.operation_scopes(operation_ast, variables)
+        if not scopes:
+            return None
+        return response_cache.response_key(query_hash(query), operation_name, variables, scopes)
+
+    def check_query_cost(self, request, document, operation_ast, variables):
+        """
+        Validation errors if the operation exceeds its organization's depth or
+        cost limits; the estimate is kept on the request for ``encode_result``.
+        """
+        max_depth, max_cost = query_cost.get_limits(
+            response_cache.operation_scopes(operation_ast, variables)
+        )
+
+        def report(cost, depth):
+            request.graphql_query_cost = {
+                'requested': cost, 'maximum': max_cost, 'depth': depth, 'maximumDepth': max_depth,
+            }
+
+        rule = query_cost.query_cost_validator(operation_ast, variables, max_depth, max_cost, report)
+        return validate(self.schema.graphql_schema, document, [rule])
+
+    def prepare_operation(self, request, query, variables, operation_name, show_graphiql=False):
+        """
+        Everything before execution: persisted-query errors, parsing and
+        validation (cached), the GET-only-queries check and the query cost
+        limits (per request).
+
+        Returns ``(document, operation_ast, None)`` when the operation should be
+        executed, or ``(None, None, result)`` with the result to return as is.
+        """
+        persisted_query_error = getattr(request, 'graphql_persisted_query_error', None)
+        if persisted_query_error is not None:
+            return None, None, ExecutionResult(data=None, errors=[persisted_query_error])
+
+        if not query:
+            if show_graphiql:
+                return None, None, None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema_validation_errors = validate_schema(self.schema.graphql_schema)
+        if schema_validation_errors:
+            return None, None, ExecutionResult(data=None, errors=schema_validation_errors)
+
+        document, validation_errors = self.get_document(query)
+        if document is None:
+            return None, None, ExecutionResult(errors=validation_errors)
+
+        operation_ast = get_operation_ast(document, operation_name)
+        if operation_ast is not None:
+            request.graphql_operation_type = operation_ast.operation.value
+            if operation_ast.name is not None:
+                request.graphql_operation_name = operation_ast.name.value
+
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None, None, None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(
+                        operation_ast.operation.value
+                    ),
+                )
+            )
+
+        if validation_errors:
+            return None, None, ExecutionResult(data=None, errors=validation_errors)
+
+        if operation_ast is not None:
+            cost_errors = self.check_query_cost(request, document, operation_ast, variables)
+            if cost_errors:
+                return None, None, ExecutionResult(data=None, errors=cost_errors)
+
+        return document, operation_ast, None
+
+    def get_read_replica(self, operation_ast, variables):
+        """Replica to run a query on, or None for the primary (see ``config.routers``)."""
+        if operation_ast is None or operation_ast.operation != OperationType.QUERY:
+            return None
+        return routers.replica_for(response_cache.operation_scopes(operation_ast, variables))
+
+    def get_execute_options(self, request, variables, operation_name):
+        execute_options = {
+            "root_value": self.get_root_value(request),
+            "context_value": self.get_context(request),
+            "variable_values": variables,
+            "operation_name": operation_name,
+            "middleware": self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            execute_options["execution_context_class"] = self.execution_context_class
+        return execute_options
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        document, operation_ast, result = self.prepare_operation(
+            request, query, variables, operation_name, show_graphiql
+        )
+        if document is None:
+            return result
+
+        schema = self.schema.graphql_schema
+        try:
+            execute_options = self.get_execute_options(request, variables, operation_name)
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            cache_key = self.get_response_cache_key(query, operation_ast, variables, operation_name)
+            if cache_key is not None:
+                data = response_cache.get_cache().get(cache_key)
+                metrics.record_cache('response', data is not None)
+                if data is not None:
+                    return ExecutionResult(data=data)
+
+            replica = self.get_read_replica(operation_ast, variables)
+            with routers.reading_from(replica):
+                result = execute(schema, document, **execute_options)
+            if replica is not None and routers.failed_on_replica(result):
+                routers.mark_unhealthy(replica)
+                request.loaders = None
+                result = execute(schema, document, **execute_options)
+            if cache_key is not None and not result.errors:
+                response_cache.get_cache().set(cache_key, result.data, response_cache.get_timeout())
+            return result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+    def encode_result(self, request, execution_result, id=None, show_graphiql=False):
+        """``(body, status)`` for an execution result, as graphene-django's ``get_response`` builds it."""
+        if not execution_result:
+            return None, 200
+
+        status_code = 200
+        response = {}
+        if execution_result.errors:
+            response["errors"] = [self.format_error(e) for e in execution_result.errors]
+
+        if execution_result.errors and any(
+            not getattr(e, "path", None) for e in execution_result.errors
+        ):
+            status_code = 400
+        else:
+            response["data"] = execution_result.data
+
+        extensions = {}
+        cost = getattr(request, 'graphql_query_cost', None)
+        if cost is not None:
+            extensions["cost"] = cost
+        trace = getattr(request, 'graphql_trace', None)
+        if trace is not None and trace.exposed:
+            extensions["tracing"] = trace.as_dict()
+        if extensions:
+            response["extensions"] = extensions
+
+        if self.batch:
+            response["id"] = id
+            response["status"] = status_code
+
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+
+class AsyncGraphQLView(GraphQLView):
+    """
+    GraphQL view for the ASGI app.
+
+    Queries run on graphql-core's async executor: root resolvers use Django's
+    async ORM API and nested fields go through ``AsyncRequestLoaders``, so a
+    request waiting on the database does not hold a worker thread. The
+    organization slugs a query names are resolved to ids before it runs (see
+    config/tenants.py). Mutations are still synchronous code and run in a
+    thread via ``sync_to_async``, as do queries whose slugs can't be read from
+    the document.
+    """
+
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if request.method.lower() not in ("get", "post"):
+                raise HttpError(
+                    HttpResponseNotAllowed(
+                        ["GET", "POST"], "GraphQL only supports GET and POST requests."
+                    )
+                )
+
+            data = self.parse_body(request)
+            if self.graphiql and self.can_display_graphiql(request, data):
+                # Renders the GraphiQL page; no database access
+                return super().dispatch(request, *args, **kwargs)
+
+            if self.batch:
+                responses = [await self.get_response(request, entry) for entry in data]
+                result = "[{}]".format(",".join([response[0] for response in responses]))
+                status_code = responses and max(responses, key=lambda response: response[1])[1] or 200
+            else:
+                result, status_code = await self.get_response(request, data)
+
+            return HttpResponse(status=status_code, content=result, content_type="application/json")
+
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(request, {"errors": [self.format_error(e)]})
+            return response
+
+    async def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = await sync_to_async(self.get_graphql_params)(request, data)
+
+        stats, metrics_token = metrics.start_operation()
+        request.graphql_trace, token = tracing.start(request)
+        if request.graphql_trace is not None:
+            # The thread the ORM calls of this request run in
+            await sync_to_async(tracing.install_query_recorders)()
+        execution_result = None
+        try:
+            execution_result = await self.execute_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+        finally:
+            tracing.stop(request.graphql_trace, token, request.graphql_operation_name)
+            metrics.finish_operation(
+                stats, metrics_token, request.graphql_operation_name, request.graphql_operation_type,
+                execution_result
+            )
+        return self.encode_result(request, execution_result, id, show_graphiql)
+
+    async def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        document, operation_ast, result = self.prepare_operation(
+            request, query, variables, operation_name, show_graphiql
+        )
+        if document is None:
+            return result
+
+        # Resolvers can't look up organization slugs on the event loop; an
+        # operation whose slugs can't be read from the document runs in a thread
+        scopes = None
+        if operation_ast is not None and operation_ast.operation == OperationType.QUERY:
+            scopes = response_cache.operation_scopes(operation_ast, variables)
+        if scopes is None:
+            return await sync_to_async(super().execute_graphql_request)(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+        organization_ids = await sync_to_async(tenants.resolve_organizations)(
+            scopes - {response_cache.ALL_ORGANIZATIONS}
+        )
+
+        request.loaders = AsyncRequestLoaders()
+        try:
+            execute_options = self.get_execute_options(request, variables, operation_name)
+
+            cache_key = await sync_to_async(self.get_response_cache_key)(
+                query, operation_ast, variables, operation_name
+            )
+            if cache_key is not None:
+                data = await response_cache.get_cache().aget(cache_key)
+                metrics.record_cache('response', data is not None)
+                if data is not None:
+                    return ExecutionResult(data=data)
+
+            replica = await sync_to_async(self.get_read_replica)(operation_ast, variables)
+            with tenants.resolved(organization_ids):
+                result = await self.execute_on(replica, document, execute_options)
+                if replica is not None and routers.failed_on_replica(result):
+                    routers.mark_unhealthy(replica)
+                    request.loaders = AsyncRequestLoaders()
+                    result = await self.execute_on(None, document, execute_options)
+            if cache_key is not None and not result.errors:
+                await response_cache.get_cache().aset(cache_key, result.data, response_cache.get_timeout())
+            return result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+    async def execute_on(self, replica, document, execute_options):
+        with routers.reading_from(replica):
+            result = execute(self.schema.graphql_schema, document, **execute_options)
+            if isawaitable(result):
+                result = await result
+        return result
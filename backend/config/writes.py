@@ -0,0 +1,60 @@
+"""
+Single-statement writes for the mutations.
+
+``update_returning()`` and ``delete_returning()`` run a queryset's UPDATE or
+DELETE with a RETURNING clause. A mutation can then guard a write by tenant
+(``filter(id=..., project__organization_id=...)``), apply it, and read back
+what it needs in one round trip, instead of loading the row first. A filter
+across relations becomes an ``id IN (subquery)`` in the same statement, and an
+update only sets the columns it is given.
+
+``delete_returning()`` doesn't cascade like ``QuerySet.delete()``; the caller
+deletes the dependent rows itself, in the same transaction. Foreign keys are
+only checked when the transaction commits, so the order doesn't matter.
+
+An empty queryset (``none()``) writes nothing and runs no query.
+
+Needs UPDATE/DELETE ... RETURNING: PostgreSQL, or SQLite 3.35 and later.
+"""
+from django.db import NotSupportedError, connections
+from django.db.models import sql
+
+
+def update_returning(queryset, **values):
+    """Set ``values`` on the rows of ``queryset``; returns the updated instances."""
+    model = queryset.model
+    if not values or queryset.query.is_empty():
+        return list(queryset)
+    query = queryset.query.chain(sql.UpdateQuery)
+    query.add_update_values(values)
+    query.annotations = {}
+    fields = model._meta.concrete_fields
+    rows = _execute(query, queryset.db, fields)
+    return [model.from_db(queryset.db, [field.attname for field in fields], row) for row in rows]
+
+
+def delete_returning(queryset, *field_names):
+    """Delete the rows of ``queryset`` (without cascading); returns their ``field_names`` (default: pk)."""
+    meta = queryset.model._meta
+    fields = [meta.get_field(name) for name in field_names] or [meta.pk]
+    if queryset.query.is_empty():
+        return []
+    query = queryset.query.chain(sql.DeleteQuery)
+    return _execute(query, queryset.db, fields)
+
+
+def _execute(query, using, fields):
+    connection = connections[using]
+    if not connection.features.can_return_columns_from_insert:
+        raise NotSupportedError(f"{connection.display_name} can't return rows from UPDATE or DELETE.")
+    compiler = query.get_compiler(using)
+    statement, params = compiler.as_sql()
+    quote = connection.ops.quote_name
+    statement += ' RETURNING ' + ', '.join(quote(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(statement, params)
+        rows = cursor.fetchall()
+    converters = compiler.get_converters([field.get_col(query.model._meta.db_table) for field in fields])
+    if converters:
+        rows = list(compiler.apply_converters(rows, converters))
+    return rows
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from config.deletion import pending_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker for background deletions (deleteOrganization / deleteProject with background: true). "
+        "Runs until interrupted unless --once is given; run a single worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Process the pending jobs, then exit.")
+        parser.add_argument('--batch-size', type=int, help="Rows per transaction (default DELETION_BATCH_SIZE).")
+        parser.add_argument('--pause', type=float, default=0, help="Seconds to sleep between batches.")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds between polls for new jobs.")
+
+    def handle(self, *args, **options):
+        while True:
+            for job in pending_jobs():
+                started = time.perf_counter()
+                job = run_job(job, batch_size=options['batch_size'], pause=options['pause'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"Deleted {job.name}: {job.deleted_projects} projects, {job.deleted_tasks} tasks, "
+                    f"{job.deleted_comments} comments in {time.perf_counter() - started:.1f}s."
+                ))
+            if options['once']:
+                return
+            time.sleep(options['interval'])
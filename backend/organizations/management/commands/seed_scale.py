@@ -0,0 +1,279 @@
+import random
+import time
+from bisect import bisect
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from config.bulk import BatchWriter
+from organizations.models import Organization
+from projects.models import Project
+from task_comments.models import TaskComment
+from tasks.models import ProjectTaskStats, Task
+
+
+class Weighted:
+    """Draws from ``(value, weight)`` choices with one ``random()`` call."""
+
+    def __init__(self, choices):
+        self.values = [value for value, _ in choices]
+        total = 0
+        self.bounds = []
+        for _, weight in choices:
+            total += weight
+            self.bounds.append(total)
+        self.total = total
+
+    def draw(self, rng):
+        return self.values[min(bisect(self.bounds, rng.random() * self.total), len(self.values) - 1)]
+
+
+def pick(rng, values):
+    # rng.choice() is several times slower than indexing with random()
+    return values[int(rng.random() * len(values))]
+
+
+WORDS = (
+    "alpha", "beacon", "cobalt", "delta", "ember", "falcon", "granite", "harbor", "indigo", "juniper",
+    "keystone", "lumen", "meridian", "nimbus", "orchid", "pioneer", "quartz", "raven", "summit", "tundra",
+)
+TASK_VERBS = ("Design", "Implement", "Review", "Test", "Document", "Migrate", "Refactor", "Deploy", "Audit", "Plan")
+TASK_OBJECTS = (
+    "login flow", "billing page", "search index", "onboarding emails", "API client", "dashboard",
+    "export job", "permissions model", "audit log", "release notes", "mobile layout", "cache layer",
+)
+COMMENTS = (
+    "Looks good to me.", "Can we split this into smaller pieces?", "Blocked on the API changes.",
+    "Moved to the next sprint.", "Done, please review.", "Added tests for the edge cases.",
+    "Needs design sign-off first.", "Reproduced locally, investigating.",
+)
+PEOPLE = ("alex", "sam", "jordan", "taylor", "morgan", "casey", "riley", "jamie", "drew", "quinn")
+
+PROJECT_STATUSES = Weighted((
+    (Project.Status.ACTIVE, 0.7), (Project.Status.COMPLETED, 0.2), (Project.Status.ON_HOLD, 0.1),
+))
+# Task status mix by project status
+TASK_STATUSES = {
+    Project.Status.ACTIVE: Weighted((
+        (Task.Status.TODO, 0.4), (Task.Status.IN_PROGRESS, 0.25), (Task.Status.DONE, 0.35),
+    )),
+    Project.Status.COMPLETED: Weighted((
+        (Task.Status.TODO, 0.02), (Task.Status.IN_PROGRESS, 0.03), (Task.Status.DONE, 0.95),
+    )),
+    Project.Status.ON_HOLD: Weighted((
+        (Task.Status.TODO, 0.6), (Task.Status.IN_PROGRESS, 0.2), (Task.Status.DONE, 0.2),
+    )),
+}
+TASK_TITLES = tuple(f"{verb} {thing}" for verb in TASK_VERBS for thing in TASK_OBJECTS)
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create() store the generated created_at/updated_at values instead of now()."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic dataset of organizations x projects x tasks x comments with skewed "
+        "tenant sizes and realistic status mixes. The same --seed always builds the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organizations', type=int, default=100, help="Organizations to create.")
+        parser.add_argument('--projects', type=int, default=20, help="Average projects per organization.")
+        parser.add_argument('--tasks', type=int, default=50, help="Average tasks per project.")
+        parser.add_argument('--comments', type=int, default=2, help="Average comments per task.")
+        parser.add_argument(
+            '--skew', type=float, default=1.0,
+            help="Zipf exponent for organization sizes (0 gives every organization the same size)."
+        )
+        parser.add_argument('--overdue-ratio', type=float, default=0.15, help="Share of open tasks that are overdue.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed.")
+        parser.add_argument('--prefix', default='seed', help="Slug prefix of the generated organizations.")
+        parser.add_argument('--clear', action='store_true', help="Delete organizations with this prefix first.")
+        parser.add_argument('--batch-size', type=int, default=10000, help="Rows buffered per insert.")
+        parser.add_argument(
+            '--no-copy', action='store_true', help="Use bulk_create() on PostgreSQL too, instead of COPY."
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        prefix = options['prefix']
+        # Dates are relative to the start of today, so a seed gives the same data all day
+        self.today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            existing = Organization.all_objects.filter(slug__startswith=f"{prefix}-")
+            if options['clear']:
+                existing.delete()
+            elif existing.exists():
+                raise CommandError(f"Organizations with the '{prefix}-' slug prefix exist; use --clear or --prefix.")
+
+            use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+            self.writers = {
+                Organization: BatchWriter(
+                    Organization, ['id', 'name', 'slug', 'contact_email', 'created_at', 'updated_at'], use_copy
+                ),
+                Project: BatchWriter(
+                    Project, ['id', 'organization', 'name', 'description', 'status', 'due_date', 'created_at'],
+                    use_copy
+                ),
+                ProjectTaskStats: BatchWriter(
+                    ProjectTaskStats, ['project', *ProjectTaskStats.COUNTER_FIELDS, 'updated_at'], use_copy
+                ),
+                Task: BatchWriter(
+                    Task,
+                    ['id', 'project', 'title', 'description', 'status', 'assignee_email', 'due_date', 'created_at'],
+                    use_copy
+                ),
+                TaskComment: BatchWriter(
+                    TaskComment, ['id', 'task', 'content', 'author_email', 'created_at'], use_copy
+                ),
+            }
+            # Ids are assigned here so children can reference parents without a round trip
+            self.next_ids = {
+                model: (model._base_manager.aggregate(Max('id'))['id__max'] or 0) + 1
+                for model in (Organization, Project, Task, TaskComment)
+            }
+
+            with explicit_timestamps(*self.writers):
+                for index, projects in enumerate(self.organization_sizes()):
+                    self.create_organization(index, projects)
+                self.flush()
+
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [Organization, Project, Task, TaskComment]):
+                    cursor.execute(sql)
+
+        elapsed = time.perf_counter() - started
+        counts = ", ".join(
+            f"{self.writers[model].written} {model._meta.verbose_name_plural}"
+            for model in (Organization, Project, Task, TaskComment)
+        )
+        rows = sum(writer.written for writer in self.writers.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {counts} in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s, "
+            f"{'COPY' if use_copy else 'bulk_create'})."
+        ))
+
+    # ==================== DISTRIBUTIONS ====================
+
+    def organization_sizes(self):
+        """Projects per organization: Zipf-distributed, averaging --projects."""
+        count = self.options['organizations']
+        weights = [1 / (rank + 1) ** self.options['skew'] for rank in range(count)]
+        total = self.options['projects'] * count
+        sizes = [max(1, round(total * weight / sum(weights))) for weight in weights]
+        self.rng.shuffle(sizes)
+        return sizes
+
+    def next_id(self, model):
+        value = self.next_ids[model]
+        self.next_ids[model] = value + 1
+        return value
+
+    def add(self, model, *row):
+        writer = self.writers[model]
+        writer.add(*row)
+        if len(writer.rows) >= self.options['batch_size']:
+            self.flush()
+
+    def flush(self):
+        # Parents before children
+        for writer in self.writers.values():
+            writer.flush()
+
+    # ==================== ROWS ====================
+
+    def create_organization(self, index, projects):
+        rng = self.rng
+        slug = f"{self.options['prefix']}-{index}"
+        created_at = self.today - timedelta(days=rng.randint(30, 3 * 365), seconds=rng.randint(0, 86399))
+        organization_id = self.next_id(Organization)
+        self.add(
+            Organization, organization_id, f"{pick(rng, WORDS).title()} {pick(rng, WORDS).title()} {index}",
+            slug, f"admin@{slug}.example.com", created_at, created_at
+        )
+        self.emails = [f"{person}@{slug}.example.com" for person in PEOPLE]
+        for _ in range(projects):
+            self.create_project(organization_id, created_at)
+
+    def create_project(self, organization_id, organization_created_at):
+        rng = self.rng
+        status = PROJECT_STATUSES.draw(rng)
+        created_at = self.random_time_after(organization_created_at)
+        due_date = (created_at + timedelta(days=rng.randint(14, 365))).date() if rng.random() < 0.8 else None
+        project_id = self.next_id(Project)
+        self.add(
+            Project, project_id, organization_id, f"{pick(rng, WORDS).title()} {pick(rng, TASK_OBJECTS)}",
+            "", status, due_date, created_at
+        )
+
+        counters = dict.fromkeys(ProjectTaskStats.COUNTER_FIELDS, 0)
+        # Exponential: most projects are small, a few are very large
+        tasks = int(rng.expovariate(1 / self.options['tasks'])) if self.options['tasks'] else 0
+        for _ in range(tasks):
+            task_status, comments = self.create_task(project_id, status, created_at)
+            counters['total_tasks'] += 1
+            counters[ProjectTaskStats.STATUS_FIELDS[task_status]] += 1
+            counters['total_comments'] += comments
+        self.add(ProjectTaskStats, project_id, *counters.values(), self.today)
+
+    def create_task(self, project_id, project_status, project_created_at):
+        # The hot loop: rows are appended to the writers' buffers directly
+        rng = self.rng
+        random = rng.random
+        status = TASK_STATUSES[project_status].draw(rng)
+        created_at = self.random_time_after(project_created_at)
+        if status != Task.Status.DONE and random() < self.options['overdue_ratio']:
+            due_date = self.today - timedelta(seconds=int(random() * 30 * 86400) + 3600)
+        elif random() < 0.8:
+            due_date = max(created_at, self.today) + timedelta(seconds=int(random() * 60 * 86400) + 3600)
+        else:
+            due_date = None
+        task_id = self.next_id(Task)
+        self.writers[Task].rows.append((
+            task_id, project_id, pick(rng, TASK_TITLES), "", status,
+            pick(rng, self.emails) if random() < 0.7 else "", due_date, created_at
+        ))
+
+        average = self.options['comments']
+        comments = int(random() * (2 * average + 1))
+        if comments:
+            rows = self.writers[TaskComment].rows
+            comment_id = self.next_ids[TaskComment]
+            self.next_ids[TaskComment] = comment_id + comments
+            span = max((self.today - created_at).total_seconds(), 1)
+            for offset in range(comments):
+                rows.append((
+                    comment_id + offset, task_id, pick(rng, COMMENTS), pick(rng, self.emails),
+                    created_at + timedelta(seconds=int(random() * span))
+                ))
+            if len(rows) >= self.options['batch_size']:
+                self.flush()
+        if len(self.writers[Task].rows) >= self.options['batch_size']:
+            self.flush()
+        return status, comments
+
+    def random_time_after(self, moment):
+        span = max((self.today - moment).total_seconds(), 1)
+        return moment + timedelta(seconds=int(self.rng.random() * span))
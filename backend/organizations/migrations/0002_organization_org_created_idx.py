@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-17 07:12
+
+from django.db import migrations, models
+
+from config.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('organizations', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='organization',
+            index=models.Index(fields=['-created_at', '-id'], name='org_created_idx'),
+        ),
+    ]
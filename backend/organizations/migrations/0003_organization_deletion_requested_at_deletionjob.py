@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-17 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0002_organization_org_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='deletion_requested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('organization_id', models.IntegerField()),
+                ('organization_slug', models.SlugField()),
+                ('project_id', models.IntegerField(blank=True, null=True)),
+                ('name', models.CharField(max_length=200)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done')], default='PENDING', max_length=20)),
+                ('total_tasks', models.IntegerField(default=0)),
+                ('total_comments', models.IntegerField(default=0)),
+                ('deleted_tasks', models.IntegerField(default=0)),
+                ('deleted_comments', models.IntegerField(default=0)),
+                ('deleted_projects', models.IntegerField(default=0)),
+                ('requested_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='deletion_job_status_idx')],
+            },
+        ),
+    ]
@@ -1,5 +1,13 @@
 from django.db import models
 
+
+class VisibleManager(models.Manager):
+    """Default manager that hides rows waiting for background deletion (see config/deletion.py)."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deletion_requested_at=None)
+
+
 # Create your models here.
 class Organization(models.Model):
     name = models.CharField(max_length=100)
@@ -7,6 +15,54 @@ class Organization(models.Model):
     contact_email = models.EmailField() 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    deletion_requested_at = models.DateTimeField(null=True, blank=True)
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            # allOrganizations pages newest first
+            models.Index(fields=['-created_at', '-id'], name='org_created_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class DeletionJob(models.Model):
+    """
+    Background deletion of an organization, or of one of its projects.
+
+    The target is hidden as soon as the job is created; the worker
+    (manage.py process_deletions) then removes its comments, tasks and
+    projects in batches, counting what it has deleted so far.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        DONE = 'DONE', 'Done'
+
+    # Plain ids rather than foreign keys: the job outlives what it deletes
+    organization_id = models.IntegerField()
+    organization_slug = models.SlugField()
+    project_id = models.IntegerField(null=True, blank=True)
+    name = models.CharField(max_length=200)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    total_tasks = models.IntegerField(default=0)
+    total_comments = models.IntegerField(default=0)
+    deleted_tasks = models.IntegerField(default=0)
+    deleted_comments = models.IntegerField(default=0)
+    deleted_projects = models.IntegerField(default=0)
+    requested_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker picks up unfinished jobs oldest first
+            models.Index(fields=['status', 'id'], name='deletion_job_status_idx'),
+        ]
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"Deletion of {self.name} ({self.status})"
@@ -1,3 +1,61 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
 from django.test import TestCase
 
-# Create your tests here.
+from organizations.models import Organization
+from projects.models import Project
+from task_comments.models import TaskComment
+from tasks.models import Task
+
+
+class SeedScaleTests(TestCase):
+    """manage.py seed_scale builds consistent, reproducible datasets."""
+
+    def seed(self, **options):
+        options = {'organizations': 4, 'projects': 3, 'tasks': 10, 'comments': 2, 'seed': 7, **options}
+        call_command('seed_scale', stdout=StringIO(), **options)
+
+    def snapshot(self, prefix):
+        return [
+            (task.project.organization.slug.split('-', 1)[1], task.project.name, task.title, task.status,
+             task.due_date, task.comments.count())
+            for task in Task.objects.filter(project__organization__slug__startswith=f"{prefix}-")
+            .select_related('project__organization').order_by('id')
+        ]
+
+    def test_counts_and_counters(self):
+        self.seed()
+        self.assertEqual(Organization.objects.count(), 4)
+        self.assertGreaterEqual(Project.objects.count(), 4)
+        self.assertTrue(Task.objects.exists())
+        self.assertTrue(TaskComment.objects.exists())
+        # The per-project counters are written along with the rows
+        call_command('rebuild_task_stats', verify=True, stdout=StringIO())
+
+    def test_same_seed_same_data(self):
+        self.seed(prefix='a')
+        self.seed(prefix='b')
+        self.assertEqual(self.snapshot('a'), self.snapshot('b'))
+        self.seed(prefix='c', seed=8)
+        self.assertNotEqual(self.snapshot('a'), self.snapshot('c'))
+
+    def test_tenant_sizes_are_skewed(self):
+        self.seed(organizations=10, projects=5, tasks=0)
+        projects = sorted(
+            (Project.objects.filter(organization=organization).count() for organization in Organization.objects.all()),
+            reverse=True
+        )
+        self.assertGreater(projects[0], 3 * projects[-1])
+
+    def test_existing_prefix(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed(clear=True)
+        self.assertEqual(Organization.objects.count(), 4)
+
+    def test_new_rows_get_fresh_ids(self):
+        self.seed()
+        organization = Organization.objects.create(name="New", slug="new", contact_email="admin@new.com")
+        self.assertGreater(organization.id, Organization.objects.exclude(id=organization.id).latest('id').id)
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-17 07:12
+
+from django.db import migrations, models
+
+from config.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('organizations', '0002_organization_org_created_idx'),
+        ('projects', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='project',
+            index=models.Index(fields=['organization', '-created_at', '-id'], name='project_org_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='project',
+            index=models.Index(fields=['organization', 'status', '-created_at', '-id'], name='project_org_status_idx'),
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.db import models
-from organizations.models import Organization
+from organizations.models import Organization, VisibleManager
 
 
 class Project(models.Model):
@@ -24,9 +24,20 @@ class Project(models.Model):
     )
     due_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    deletion_requested_at = models.DateTimeField(null=True, blank=True)
+    # Bumped by every update; updates may pass the version they read (expectedVersion)
+    version = models.PositiveIntegerField(default=1, db_default=1)
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # projectsByOrganization, with and without a status filter
+            models.Index(fields=['organization', '-created_at', '-id'], name='project_org_created_idx'),
+            models.Index(fields=['organization', 'status', '-created_at', '-id'], name='project_org_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.organization.name})"
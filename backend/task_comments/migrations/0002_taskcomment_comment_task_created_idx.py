@@ -0,0 +1,22 @@
+# Generated by Django 6.0.1 on 2026-10-17 07:12
+
+from django.db import migrations, models
+
+from config.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('task_comments', '0001_initial'),
+        ('tasks', '0002_task_task_project_created_idx_and_more'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='taskcomment',
+            index=models.Index(fields=['task', 'created_at', 'id'], name='comment_task_created_idx'),
+        ),
+    ]
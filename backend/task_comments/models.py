@@ -16,6 +16,9 @@ class TaskComment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['task', 'created_at', 'id'], name='comment_task_created_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author_email} on {self.task.title}"
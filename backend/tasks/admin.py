@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Task
+from .models import Task, ProjectTaskStats
 
 
 @admin.register(Task)
@@ -9,3 +9,10 @@ class TaskAdmin(admin.ModelAdmin):
     search_fields = ('title', 'description', 'assignee_email', 'project__name')
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
+
+
+@admin.register(ProjectTaskStats)
+class ProjectTaskStatsAdmin(admin.ModelAdmin):
+    list_display = ('project', 'total_tasks', 'todo_tasks', 'in_progress_tasks', 'completed_tasks', 'total_comments', 'updated_at')
+    readonly_fields = ('project', 'total_tasks', 'todo_tasks', 'in_progress_tasks', 'completed_tasks', 'total_comments', 'updated_at')
+    search_fields = ('project__name',)
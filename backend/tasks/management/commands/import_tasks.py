@@ -0,0 +1,93 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from config.imports import ImportFormatError, TaskImporter
+from organizations.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Import tasks (and, from NDJSON, their comments) into an organization from a CSV or NDJSON file. "
+        "Progress is checkpointed after every batch; rerun with --resume after an interruption."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('organization', help="Slug of the organization to import into.")
+        parser.add_argument('path', help="CSV or NDJSON file; see config/imports.py for the columns.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, help="Tasks per transaction (default IMPORT_BATCH_SIZE).")
+        parser.add_argument(
+            '--no-copy', action='store_true', help="Use bulk_create() on PostgreSQL too, instead of COPY."
+        )
+        parser.add_argument('--checkpoint', help="Checkpoint file (default <path>.checkpoint).")
+        parser.add_argument('--resume', action='store_true', help="Skip the rows recorded in the checkpoint.")
+        parser.add_argument('--errors', help="Rejected rows are written here as NDJSON (default <path>.errors.ndjson).")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if format not in ('csv', 'ndjson'):
+            raise CommandError("Can't tell the format from the file name; pass --format csv or --format ndjson.")
+        try:
+            organization = Organization.objects.get(slug=options['organization'])
+        except Organization.DoesNotExist:
+            raise CommandError(f"Organization '{options['organization']}' not found.")
+
+        checkpoint_path = options['checkpoint'] or f"{path}.checkpoint"
+        errors_path = options['errors'] or f"{path}.errors.ndjson"
+        checkpoint = {'processed': 0, 'tasks': 0, 'comments': 0, 'rejected': 0}
+        if options['resume']:
+            try:
+                with open(checkpoint_path) as f:
+                    checkpoint = json.load(f)
+            except FileNotFoundError:
+                raise CommandError(f"No checkpoint at {checkpoint_path}.")
+            self.stdout.write(f"Resuming after row {checkpoint['processed']}.")
+
+        use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        started = time.perf_counter()
+        with open(errors_path, 'a' if options['resume'] else 'w') as errors_file:
+            def on_batch(importer, errors):
+                for error in errors:
+                    errors_file.write(json.dumps(error) + '\n')
+                errors_file.flush()
+                self.save_checkpoint(checkpoint_path, {
+                    'processed': importer.processed,
+                    'tasks': checkpoint['tasks'] + importer.tasks,
+                    'comments': checkpoint['comments'] + importer.comments,
+                    'rejected': checkpoint['rejected'] + importer.rejected,
+                })
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"  {importer.processed} rows")
+
+            importer = TaskImporter(
+                organization, batch_size=options['batch_size'], use_copy=use_copy,
+                skip=checkpoint['processed'], on_batch=on_batch
+            )
+            try:
+                with open(path, newline='', encoding='utf-8-sig') as f:
+                    importer.run(f, format)
+            except (ImportFormatError, UnicodeDecodeError) as exc:
+                raise CommandError(str(exc))
+        os.remove(checkpoint_path)
+
+        elapsed = time.perf_counter() - started
+        rows = importer.processed - checkpoint['processed']
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {checkpoint['tasks'] + importer.tasks} tasks and {checkpoint['comments'] + importer.comments} "
+            f"comments into {organization.slug} in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s, "
+            f"{'COPY' if use_copy else 'bulk_create'})."
+        ))
+        rejected = checkpoint['rejected'] + importer.rejected
+        if rejected:
+            self.stdout.write(self.style.WARNING(f"{rejected} rows were rejected; see {errors_path}."))
+
+    def save_checkpoint(self, path, checkpoint):
+        # Replace the file in one step, so an interruption never leaves half a checkpoint
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(f"{path}.tmp", path)
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from projects.models import Project
+from tasks.models import ProjectTaskStats
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the denormalized per-project task counters (ProjectTaskStats)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Only compare stored counters with the real counts; exit non-zero on drift."
+        )
+        parser.add_argument('--organization', help="Limit to projects of this organization slug.")
+        parser.add_argument('--project', type=int, action='append', help="Limit to this project id (repeatable).")
+        parser.add_argument('--batch-size', type=int, default=500, help="Projects per transaction.")
+
+    def handle(self, *args, **options):
+        projects = Project.objects.order_by('id')
+        if options['organization']:
+            projects = projects.filter(organization__slug=options['organization'])
+        if options['project']:
+            projects = projects.filter(id__in=options['project'])
+        project_ids = list(projects.values_list('id', flat=True))
+
+        batch_size = options['batch_size']
+        mismatched = rebuilt = 0
+        for start in range(0, len(project_ids), batch_size):
+            batch = project_ids[start:start + batch_size]
+            if options['verify']:
+                mismatched += self.verify(batch)
+            else:
+                with transaction.atomic():
+                    rebuilt += ProjectTaskStats.rebuild(batch)
+
+        if options['verify']:
+            if mismatched:
+                raise CommandError(f"{mismatched} of {len(project_ids)} projects have drifted counters.")
+            self.stdout.write(self.style.SUCCESS(f"All {len(project_ids)} project counters are exact."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt counters for {rebuilt} projects."))
+
+    def verify(self, project_ids):
+        stored = {
+            stats.project_id: stats
+            for stats in ProjectTaskStats.objects.filter(project_id__in=project_ids)
+        }
+        mismatched = 0
+        for project_id, expected in ProjectTaskStats.compute(project_ids).items():
+            stats = stored.get(project_id)
+            if stats is None:
+                mismatched += 1
+                self.stdout.write(self.style.WARNING(f"Project {project_id}: counters missing"))
+                continue
+            drift = {
+                field: (getattr(stats, field), value)
+                for field, value in expected.items()
+                if getattr(stats, field) != value
+            }
+            if drift:
+                mismatched += 1
+                details = ", ".join(f"{field} stored={got} actual={want}" for field, (got, want) in drift.items())
+                self.stdout.write(self.style.WARNING(f"Project {project_id}: {details}"))
+        return mismatched
@@ -0,0 +1,51 @@
+# Generated by Django 6.0.1 on 2026-10-17 07:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_task_stats(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Task = apps.get_model('tasks', 'Task')
+    TaskComment = apps.get_model('task_comments', 'TaskComment')
+    ProjectTaskStats = apps.get_model('tasks', 'ProjectTaskStats')
+
+    stats = {
+        project_id: ProjectTaskStats(project_id=project_id)
+        for project_id in Project.objects.values_list('id', flat=True)
+    }
+    status_fields = {'TODO': 'todo_tasks', 'IN_PROGRESS': 'in_progress_tasks', 'DONE': 'completed_tasks'}
+    for row in Task.objects.order_by().values('project_id', 'status').annotate(total=models.Count('id')):
+        counters = stats[row['project_id']]
+        counters.total_tasks += row['total']
+        field = status_fields.get(row['status'])
+        if field:
+            setattr(counters, field, getattr(counters, field) + row['total'])
+    for row in TaskComment.objects.order_by().values('task__project_id').annotate(total=models.Count('id')):
+        stats[row['task__project_id']].total_comments = row['total']
+    ProjectTaskStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_project_project_org_created_idx_and_more'),
+        ('tasks', '0002_task_task_project_created_idx_and_more'),
+        ('task_comments', '0002_taskcomment_comment_task_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectTaskStats',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_stats', serialize=False, to='projects.project')),
+                ('total_tasks', models.IntegerField(default=0)),
+                ('todo_tasks', models.IntegerField(default=0)),
+                ('in_progress_tasks', models.IntegerField(default=0)),
+                ('completed_tasks', models.IntegerField(default=0)),
+                ('total_comments', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_task_stats, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from projects.models import Project
 
 
@@ -25,9 +25,110 @@ class Task(models.Model):
     assignee_email = models.EmailField(blank=True)
     due_date = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped by every update; updates may pass the version they read (expectedVersion)
+    version = models.PositiveIntegerField(default=1, db_default=1)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # tasksByProject, with and without a status filter
+            models.Index(fields=['project', '-created_at', '-id'], name='task_project_created_idx'),
+            models.Index(fields=['project', 'status', '-created_at', '-id'], name='task_project_status_idx'),
+            # overdueTasks only ever looks at open tasks
+            models.Index(
+                fields=['due_date', 'id'],
+                condition=~models.Q(status='DONE'),
+                name='task_open_due_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.project.name})"
+
+
+class ProjectTaskStats(models.Model):
+    """
+    Denormalized task and comment counters for a project.
+
+    Kept exact by the task and comment mutations, which apply F() deltas in
+    the same transaction as the write, so reading project statistics is a
+    primary key lookup instead of a count over every task.
+    """
+
+    # Task.Status value -> counter column
+    STATUS_FIELDS = {
+        Task.Status.TODO: 'todo_tasks',
+        Task.Status.IN_PROGRESS: 'in_progress_tasks',
+        Task.Status.DONE: 'completed_tasks',
+    }
+    COUNTER_FIELDS = ('total_tasks', 'todo_tasks', 'in_progress_tasks', 'completed_tasks', 'total_comments')
+
+    project = models.OneToOneField(
+        Project,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='task_stats'
+    )
+    total_tasks = models.IntegerField(default=0)
+    todo_tasks = models.IntegerField(default=0)
+    in_progress_tasks = models.IntegerField(default=0)
+    completed_tasks = models.IntegerField(default=0)
+    total_comments = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Task stats for project {self.project_id}"
+
+    @classmethod
+    def status_deltas(cls, status, delta):
+        """Counter deltas for adding (delta=1) or removing (delta=-1) a task with ``status``."""
+        return {'total_tasks': delta, cls.STATUS_FIELDS[status]: delta}
+
+    @classmethod
+    def apply(cls, project_id, **deltas):
+        """Add ``deltas`` to a project's counters; call inside the write's transaction."""
+        updates = {}
+        for field, delta in deltas.items():
+            if delta:
+                updates[field] = models.F(field) + delta
+        if not updates:
+            return
+        if cls.objects.filter(project_id=project_id).update(**updates):
+            return
+        # No counters yet: count from scratch, which already includes this write.
+        # If another transaction created the row first, its count can't see this
+        # (uncommitted) write, so add the deltas to its row instead.
+        _, created = cls.objects.get_or_create(project_id=project_id, defaults=cls.compute([project_id])[project_id])
+        if not created:
+            cls.objects.filter(project_id=project_id).update(**updates)
+
+    @classmethod
+    def compute(cls, project_ids=None):
+        """Count the true values from the task and comment tables, keyed by project id."""
+        tasks = Task.objects.all() if project_ids is None else Task.objects.filter(project_id__in=project_ids)
+        rows = tasks.order_by().values('project_id').annotate(
+            total_tasks=models.Count('id', distinct=True),
+            todo_tasks=models.Count('id', filter=models.Q(status=Task.Status.TODO), distinct=True),
+            in_progress_tasks=models.Count('id', filter=models.Q(status=Task.Status.IN_PROGRESS), distinct=True),
+            completed_tasks=models.Count('id', filter=models.Q(status=Task.Status.DONE), distinct=True),
+            total_comments=models.Count('comments')
+        )
+        computed = {row.pop('project_id'): row for row in rows}
+        projects = Project.objects.all() if project_ids is None else Project.objects.filter(id__in=project_ids)
+        empty = dict.fromkeys(cls.COUNTER_FIELDS, 0)
+        return {project_id: computed.get(project_id, empty) for project_id in projects.values_list('id', flat=True)}
+
+    @classmethod
+    def rebuild(cls, project_ids=None):
+        """Recompute counters from scratch and store them; returns the number of projects rebuilt."""
+        with transaction.atomic():
+            # Lock the counters before counting: writes committing in between
+            # wait in apply() and add their deltas to the rebuilt values
+            stored = cls.objects.select_for_update()
+            if project_ids is not None:
+                stored = stored.filter(project_id__in=project_ids)
+            list(stored.order_by('project_id').values_list('project_id', flat=True))
+            computed = cls.compute(project_ids)
+            for project_id, counters in computed.items():
+                cls.objects.update_or_create(project_id=project_id, defaults=counters)
+        return len(computed)
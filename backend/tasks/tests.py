@@ -1,3 +1,96 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
 from django.test import TestCase
 
-# Create your tests here.
+from organizations.models import Organization
+from projects.models import Project
+from task_comments.models import TaskComment
+from tasks.models import Task
+
+
+class ImportTasksTests(TestCase):
+    """manage.py import_tasks loads CSV/NDJSON files in checkpointed batches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name="Acme", slug="acme", contact_email="admin@acme.com")
+        cls.project = Project.objects.create(organization=cls.organization, name="Launch")
+        other = Organization.objects.create(name="Other", slug="other", contact_email="admin@other.com")
+        cls.other_project = Project.objects.create(organization=other, name="Secret")
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def run_import(self, path, **options):
+        call_command('import_tasks', 'acme', path, stdout=StringIO(), **options)
+
+    def errors(self, path):
+        with open(f"{path}.errors.ndjson") as f:
+            return [json.loads(line) for line in f]
+
+    def test_csv(self):
+        path = self.write('tasks.csv', (
+            "project,title,status,assignee_email,due_date,created_at\n"
+            "Launch,\"Write, \"\"docs\"\"\",done,dev@acme.com,2030-01-31,2020-05-01T10:00:00Z\n"
+            "Launch,Plan,,,,\n"
+            "Launch,Bad status,LATE,,,\n"
+            "Secret,Other tenant,,,,\n"
+        ))
+        self.run_import(path, batch_size=1)
+
+        tasks = Task.objects.filter(project=self.project).order_by('id')
+        self.assertEqual([(task.title, task.status) for task in tasks], [('Write, "docs"', 'DONE'), ('Plan', 'TODO')])
+        self.assertEqual(tasks[0].created_at.year, 2020)
+        self.assertEqual(tasks[0].due_date.date().isoformat(), '2030-01-31')
+        self.assertEqual([(error['row'], error['field']) for error in self.errors(path)], [(3, 'status'), (4, 'project')])
+        self.assertFalse(os.path.exists(f"{path}.checkpoint"))
+        call_command('rebuild_task_stats', verify=True, organization='acme', stdout=StringIO())
+
+    def test_ndjson_with_comments(self):
+        rows = [
+            {'project_id': self.project.id, 'title': "First", 'comments': [
+                {'content': "Hello", 'author_email': "a@acme.com"}, {'content': "Again", 'author_email': "b@acme.com"},
+            ]},
+            {'project_id': self.other_project.id, 'title': "Cross tenant"},
+            {'project_id': self.project.id, 'title': "Bad comment", 'comments': [{'content': "x", 'author_email': "no"}]},
+        ]
+        path = self.write('tasks.ndjson', "\n".join(json.dumps(row) for row in rows) + "\nnot json\n")
+        self.run_import(path)
+
+        task = Task.objects.get(project=self.project)
+        self.assertEqual(list(task.comments.values_list('content', flat=True)), ["Hello", "Again"])
+        self.assertEqual(
+            [(error['row'], error['field']) for error in self.errors(path)],
+            [(2, 'project_id'), (3, 'comments[0].author_email'), (4, None)]
+        )
+        self.assertEqual(self.project.task_stats.total_comments, 2)
+
+    def test_resume_from_checkpoint(self):
+        path = self.write('tasks.ndjson', "".join(
+            json.dumps({'project': "Launch", 'title': f"Task {n}"}) + "\n" for n in range(5)
+        ))
+        with open(f"{path}.checkpoint", 'w') as f:
+            json.dump({'processed': 3, 'tasks': 3, 'comments': 0, 'rejected': 0}, f)
+        self.run_import(path, resume=True)
+        self.assertEqual(list(Task.objects.values_list('title', flat=True).order_by('id')), ["Task 3", "Task 4"])
+
+        with self.assertRaises(CommandError):
+            self.run_import(path, resume=True)
+
+    def test_missing_title_column(self):
+        path = self.write('tasks.csv', "project,name\nLaunch,Oops\n")
+        with self.assertRaises(CommandError):
+            self.run_import(path)
+        self.assertFalse(TaskComment.objects.exists() or Task.objects.exists())
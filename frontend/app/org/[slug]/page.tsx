@@ -32,7 +32,8 @@ export default function OrganizationDashboard({ params }: { params: Promise<{ sl
     if (orgError) return <ErrorMessage message={orgError.message} />;
 
     const org = orgData?.organization;
-    const overdueTasks = overdueData?.overdueTasks || [];
+    const overdueTasks = overdueData?.overdueTasks?.edges.map((edge: any) => edge.node) || [];
+    const overdueCount = overdueData?.overdueTasks?.totalCount ?? 0;
 
     return (
         <div className="space-y-8">
@@ -63,7 +64,7 @@ export default function OrganizationDashboard({ params }: { params: Promise<{ sl
                 />
                 <StatCard
                     label="Overdue Tasks"
-                    value={overdueTasks.length}
+                    value={overdueCount}
                     color="red"
                     icon="⚠️"
                 />
@@ -79,7 +80,7 @@ export default function OrganizationDashboard({ params }: { params: Promise<{ sl
                         </div>
                     ) : (
                         <div className="space-y-3">
-                            {overdueTasks.slice(0, 5).map((task: any) => (
+                            {overdueTasks.map((task: any) => (
                                 <div key={task.id} className="flex items-center justify-between p-3 bg-slate-800 rounded-lg border border-slate-700/50">
                                     <div>
                                         <div className="font-medium text-slate-200">{task.title}</div>
@@ -92,10 +93,10 @@ export default function OrganizationDashboard({ params }: { params: Promise<{ sl
                                     </div>
                                 </div>
                             ))}
-                            {overdueTasks.length > 5 && (
+                            {overdueCount > 5 && (
                                 <div className="text-center pt-2">
                                     <Link href={`/org/${slug}/tasks?filter=overdue`} className="text-sm text-indigo-400 hover:text-indigo-300">
-                                        View all {overdueTasks.length} overdue tasks
+                                        View all {overdueCount} overdue tasks
                                     </Link>
                                 </div>
                             )}
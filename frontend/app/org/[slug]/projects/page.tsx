@@ -8,6 +8,7 @@ import { LoadingPage } from "@/components/ui/Loading";
 import { ErrorMessage, EmptyState } from "@/components/ui/Error";
 import { Badge } from "@/components/ui/Badge";
 import { ProgressBar } from "@/components/ui/Stats";
+import { LoadMore } from "@/components/ui/LoadMore";
 import Link from "next/link";
 import { useRouter } from "next/navigation";
 
@@ -19,12 +20,13 @@ export default function ProjectsPage({ params }: { params: Promise<{ slug: strin
     // Create Project State
     const [isCreating, setIsCreating] = useState(false);
     const [newProjectName, setNewProjectName] = useState("");
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         setSlug(resolvedParams.slug);
     }, [resolvedParams]);
 
-    const { data, loading, error } = useQuery<any>(GET_PROJECTS_BY_ORGANIZATION, {
+    const { data, loading, error, fetchMore } = useQuery<any>(GET_PROJECTS_BY_ORGANIZATION, {
         variables: { organizationSlug: slug },
         skip: !slug,
     });
@@ -54,17 +56,28 @@ export default function ProjectsPage({ params }: { params: Promise<{ slug: strin
         });
     };
 
-    if (!slug || loading) return <LoadingPage />;
+    const handleLoadMore = async () => {
+        setLoadingMore(true);
+        try {
+            await fetchMore({ variables: { after: data.projectsByOrganization.pageInfo.endCursor } });
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
+    // Keep showing the list while more pages load
+    if (!slug || (loading && !data)) return <LoadingPage />;
     if (error) return <ErrorMessage message={error.message} />;
 
-    const projects = data?.projectsByOrganization || [];
+    const projects = data?.projectsByOrganization?.edges.map((edge: any) => edge.node) || [];
+    const totalProjects = data?.projectsByOrganization?.totalCount ?? projects.length;
 
     return (
         <div className="space-y-6">
             <div className="flex justify-between items-center">
                 <div>
                     <h1 className="text-3xl font-bold text-white mb-1">Projects</h1>
-                    <p className="text-slate-400">Manage your projects ({projects.length})</p>
+                    <p className="text-slate-400">Manage your projects ({totalProjects})</p>
                 </div>
                 <button
                     onClick={() => setIsCreating(true)}
@@ -168,6 +181,14 @@ export default function ProjectsPage({ params }: { params: Promise<{ slug: strin
                     ))}
                 </div>
             )}
+
+            <LoadMore
+                shown={projects.length}
+                total={totalProjects}
+                hasMore={data?.projectsByOrganization?.pageInfo.hasNextPage ?? false}
+                loading={loadingMore}
+                onLoadMore={handleLoadMore}
+            />
         </div>
     );
 }
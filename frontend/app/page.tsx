@@ -8,11 +8,13 @@ import { useState } from "react";
 import { LoadingPage } from "@/components/ui/Loading";
 import { ErrorMessage } from "@/components/ui/Error";
 import { Badge } from "@/components/ui/Badge";
+import { LoadMore } from "@/components/ui/LoadMore";
 import { useRouter } from "next/navigation";
 
 export default function HomePage() {
   const router = useRouter();
-  const { data, loading, error, refetch } = useQuery<any>(GET_ALL_ORGANIZATIONS);
+  const { data, loading, error, refetch, fetchMore } = useQuery<any>(GET_ALL_ORGANIZATIONS);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [formData, setFormData] = useState({ name: "", slug: "", contactEmail: "" });
 
@@ -42,7 +44,17 @@ export default function HomePage() {
     setFormData({ ...formData, name, slug });
   };
 
-  if (loading) return <LoadingPage />;
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    try {
+      await fetchMore({ variables: { after: data.allOrganizations.pageInfo.endCursor } });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Keep showing the list while more pages load
+  if (loading && !data) return <LoadingPage />;
   if (error) return <ErrorMessage message={error.message} />;
 
   return (
@@ -88,7 +100,7 @@ export default function HomePage() {
             <span className="text-sm text-slate-600 mt-2 relative z-10">Start a new workspace</span>
           </button>
 
-          {data?.allOrganizations?.slice().reverse().map((org: any) => (
+          {data?.allOrganizations?.edges.map(({ node: org }: any) => (
             <Link
               key={org.id}
               href={`/org/${org.slug}`}
@@ -133,6 +145,14 @@ export default function HomePage() {
             </Link>
           ))}
         </div>
+
+        <LoadMore
+          shown={data?.allOrganizations?.edges.length ?? 0}
+          total={data?.allOrganizations?.totalCount}
+          hasMore={data?.allOrganizations?.pageInfo.hasNextPage ?? false}
+          loading={loadingMore}
+          onLoadMore={handleLoadMore}
+        />
       </div>
 
       {/* Create Organization Modal */}
@@ -0,0 +1,29 @@
+interface LoadMoreProps {
+    shown: number;
+    total?: number;
+    hasMore: boolean;
+    loading?: boolean;
+    onLoadMore: () => void;
+}
+
+// Footer for paginated lists: how much of the list is shown, and a button for the next page
+export function LoadMore({ shown, total, hasMore, loading = false, onLoadMore }: LoadMoreProps) {
+    if (!hasMore) return null;
+
+    return (
+        <div className="flex flex-col items-center gap-3 pt-6">
+            {total !== undefined && (
+                <p className="text-sm text-slate-500">
+                    Showing {shown} of {total}
+                </p>
+            )}
+            <button
+                onClick={onLoadMore}
+                disabled={loading}
+                className="px-6 py-2 bg-slate-800 hover:bg-slate-700 border border-slate-700 text-slate-300 rounded-lg font-medium transition-colors disabled:opacity-50"
+            >
+                {loading ? "Loading..." : "Load more"}
+            </button>
+        </div>
+    );
+}
@@ -2,12 +2,24 @@
 
 import { ApolloClient, InMemoryCache, HttpLink, from } from "@apollo/client";
 import { onError } from "@apollo/client/link/error";
+import { PersistedQueryLink } from "@apollo/client/link/persisted-queries";
+import { relayStylePagination } from "@apollo/client/utilities";
 
 const httpLink = new HttpLink({
     uri: process.env.NEXT_PUBLIC_GRAPHQL_URL || "http://127.0.0.1:8000/graphql/",
     credentials: "include",
 });
 
+async function sha256(query: string): Promise<string> {
+    const digest = await crypto.subtle.digest("SHA-256", new TextEncoder().encode(query));
+    return Array.from(new Uint8Array(digest))
+        .map((byte) => byte.toString(16).padStart(2, "0"))
+        .join("");
+}
+
+// Send only the query hash; the full query is sent once if the server doesn't know it yet
+const persistedQueryLink = new PersistedQueryLink({ sha256 });
+
 const errorLink = onError(({ graphQLErrors, networkError }: any) => {
     if (graphQLErrors) {
         graphQLErrors.forEach(({ message, locations, path }: any) => {
@@ -22,21 +34,17 @@ const errorLink = onError(({ graphQLErrors, networkError }: any) => {
 });
 
 export const apolloClient = new ApolloClient({
-    link: from([errorLink, httpLink]),
+    link: from([errorLink, persistedQueryLink, httpLink]),
     cache: new InMemoryCache({
         typePolicies: {
             Query: {
                 fields: {
-                    projectsByOrganization: {
-                        merge(existing, incoming) {
-                            return incoming;
-                        },
-                    },
-                    tasksByProject: {
-                        merge(existing, incoming) {
-                            return incoming;
-                        },
-                    },
+                    // Connections: pages fetched with fetchMore({ variables: { after } }) are
+                    // appended; fetching without `after` (e.g. a refetch) starts over
+                    allOrganizations: relayStylePagination(),
+                    projectsByOrganization: relayStylePagination(["organizationSlug", "status"]),
+                    tasksByProject: relayStylePagination(["projectId", "organizationSlug", "status"]),
+                    commentsByTask: relayStylePagination(["taskId", "organizationSlug"]),
                 },
             },
         },
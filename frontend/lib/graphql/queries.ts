@@ -3,19 +3,28 @@ import { gql } from "@apollo/client";
 // ==================== ORGANIZATION QUERIES ====================
 
 export const GET_ALL_ORGANIZATIONS = gql`
-  query GetAllOrganizations {
-    allOrganizations {
-      id
-      name
-      slug
-      contactEmail
-      projectCount
-      stats {
-        totalProjects
-        activeProjects
-        completedProjects
-        totalTasks
-        completedTasks
+  query GetAllOrganizations($first: Int = 50, $after: String) {
+    allOrganizations(first: $first, after: $after) {
+      totalCount
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      edges {
+        node {
+          id
+          name
+          slug
+          contactEmail
+          projectCount
+          stats {
+            totalProjects
+            activeProjects
+            completedProjects
+            totalTasks
+            completedTasks
+          }
+        }
       }
     }
   }
@@ -43,22 +52,31 @@ export const GET_ORGANIZATION = gql`
 // ==================== PROJECT QUERIES ====================
 
 export const GET_PROJECTS_BY_ORGANIZATION = gql`
-  query GetProjectsByOrganization($organizationSlug: String!, $status: String) {
-    projectsByOrganization(organizationSlug: $organizationSlug, status: $status) {
-      id
-      name
-      description
-      status
-      dueDate
-      createdAt
-      taskCount
-      stats {
-        totalTasks
-        completedTasks
-        inProgressTasks
-        todoTasks
-        overdueTasks
-        completionPercentage
+  query GetProjectsByOrganization($organizationSlug: String!, $status: String, $first: Int = 50, $after: String) {
+    projectsByOrganization(organizationSlug: $organizationSlug, status: $status, first: $first, after: $after) {
+      totalCount
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      edges {
+        node {
+          id
+          name
+          description
+          status
+          dueDate
+          createdAt
+          taskCount
+          stats {
+            totalTasks
+            completedTasks
+            inProgressTasks
+            todoTasks
+            overdueTasks
+            completionPercentage
+          }
+        }
       }
     }
   }
@@ -105,17 +123,38 @@ export const GET_PROJECT = gql`
 // ==================== TASK QUERIES ====================
 
 export const GET_TASKS_BY_PROJECT = gql`
-  query GetTasksByProject($projectId: Int!, $organizationSlug: String!, $status: String) {
-    tasksByProject(projectId: $projectId, organizationSlug: $organizationSlug, status: $status) {
-      id
-      title
-      description
-      status
-      assigneeEmail
-      dueDate
-      createdAt
-      commentCount
-      isOverdue
+  query GetTasksByProject(
+    $projectId: Int!
+    $organizationSlug: String!
+    $status: String
+    $first: Int = 50
+    $after: String
+  ) {
+    tasksByProject(
+      projectId: $projectId
+      organizationSlug: $organizationSlug
+      status: $status
+      first: $first
+      after: $after
+    ) {
+      totalCount
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      edges {
+        node {
+          id
+          title
+          description
+          status
+          assigneeEmail
+          dueDate
+          createdAt
+          commentCount
+          isOverdue
+        }
+      }
     }
   }
 `;
@@ -142,13 +181,18 @@ export const GET_TASK = gql`
 
 export const GET_OVERDUE_TASKS = gql`
   query GetOverdueTasks($organizationSlug: String!) {
-    overdueTasks(organizationSlug: $organizationSlug) {
-      id
-      title
-      dueDate
-      project {
-        id
-        name
+    overdueTasks(organizationSlug: $organizationSlug, first: 5) {
+      totalCount
+      edges {
+        node {
+          id
+          title
+          dueDate
+          project {
+            id
+            name
+          }
+        }
       }
     }
   }
@@ -157,12 +201,21 @@ export const GET_OVERDUE_TASKS = gql`
 // ==================== COMMENT QUERIES ====================
 
 export const GET_COMMENTS_BY_TASK = gql`
-  query GetCommentsByTask($taskId: Int!, $organizationSlug: String!) {
-    commentsByTask(taskId: $taskId, organizationSlug: $organizationSlug) {
-      id
-      content
-      authorEmail
-      createdAt
+  query GetCommentsByTask($taskId: Int!, $organizationSlug: String!, $first: Int = 50, $after: String) {
+    commentsByTask(taskId: $taskId, organizationSlug: $organizationSlug, first: $first, after: $after) {
+      totalCount
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      edges {
+        node {
+          id
+          content
+          authorEmail
+          createdAt
+        }
+      }
     }
   }
 `;